@@ -1,22 +1,23 @@
 #!/usr/bin/env python
 import importlib
 import importlib.machinery
+import functools
 import io
-import json
 import logging
-import marshal
 import os
 import re
-import ssl
 import sys
-import tarfile
+import threading
+import time
 import types
-import zipfile
+import weakref
+from collections import OrderedDict
 from contextlib import contextmanager
-from configparser import ConfigParser, NoSectionError
+from types import MappingProxyType
 from urllib.error import HTTPError, URLError
-from urllib.request import (ProxyHandler, Request, build_opener,
-                            install_opener, urlopen)
+# Modules that are slow to import ('ssl', 'tarfile', 'zipfile', 'json', 'marshal',
+# 'urllib.request', 'http.client', 'configparser', ...) are imported where needed,
+# so that 'import httpimport' stays fast
 
 # ====================== Metadata ======================
 
@@ -27,6 +28,19 @@ __github__ = 'https://github.com/operatorequals/httpimport'
 # ====================== Constants ======================
 
 INSECURE = False
+# Set to True to never connect: responses are only served from the (on-disk) caches
+OFFLINE = False
+
+# The file with the URLs of the modules in a frozen ZIP (see 'freeze')
+FREEZE_METADATA = 'httpimport-freeze.json'
+# The file describing a repository created by 'publish'
+MANIFEST = 'httpimport-manifest.json'
+# The response header advertising the batch endpoint of a server (see 'serve')
+BATCH_HEADER = 'X-Httpimport-Batch'
+# The response header advertising the manifest of a repository (see 'serve')
+MANIFEST_HEADER = 'X-Httpimport-Manifest'
+# The path of the batch endpoint of the reference server
+BATCH_PATH = '_batch'
 
 __GIT_SERVICE_URLS = {
     'github': {
@@ -40,6 +54,32 @@ __GIT_SERVICE_URLS = {
         'domain': 'bitbucket.com'},
 }
 
+# The commit and archive endpoints of the Managed Git Services (see 'github_repo').
+# '{api}' is the API base URL of the service, or 'domain' + 'api_path' for other domains
+__GIT_SERVICE_ARCHIVES = {
+    'github': {
+        'commit': '{api}/repos/{user}/{repo}/commits/{ref}',
+        'archive': '{base}/{user}/{repo}/archive/{sha}.zip',
+        'sha_key': 'sha',
+        'api': 'https://api.github.com',
+        'api_path': '/api/v3',
+        'domain': 'github.com'},
+    'gitlab': {
+        'commit': '{api}/projects/{user}%2F{repo}/repository/commits/{ref}',
+        'archive': '{base}/{user}/{repo}/-/archive/{sha}/{repo}-{sha}.zip',
+        'sha_key': 'id',
+        'api': 'https://gitlab.com/api/v4',
+        'api_path': '/api/v4',
+        'domain': 'gitlab.com'},
+    'bitbucket': {
+        'commit': '{api}/repositories/{user}/{repo}/commit/{ref}',
+        'archive': '{base}/{user}/{repo}/get/{sha}.zip',
+        'sha_key': 'hash',
+        'api': 'https://api.bitbucket.org/2.0',
+        'api_path': '/!api/2.0',
+        'domain': 'bitbucket.org'},
+}
+
 # ====================== Configuration ======================
 
 _DEFAULT_INI_CONFIG = """
@@ -47,8 +87,67 @@ _DEFAULT_INI_CONFIG = """
 
 zip-password:
 
+# Decrypt all the '.py' files of an encrypted ZIP archive on a background
+# thread when it is opened, instead of on first use
+zip-decrypt-all: no
+
 proxy-url:
 
+# A multi-line list of base URLs serving the same content as the
+# profile URL. Requests go to the fastest healthy mirror.
+mirrors:
+
+# If a mirror does not respond within this percentile of the
+# observed latencies, a hedged request is sent to the next mirror
+hedge-percentile: 95
+
+# Bytes of source kept for modules found but not loaded (yet)
+module-cache-bytes: 16777216
+
+# Never connect: serve only cached responses (see 'cache-dir') and fail fast otherwise
+offline: no
+
+# Use the manifest of repositories created with 'python -m httpimport publish'.
+# 'auto' fetches it only if the server advertises it (the 'X-Httpimport-Manifest'
+# header or the directory listing), 'yes' always tries (one extra request)
+manifest: auto
+
+# Load precompiled '.pyc' files listed in manifests, when available
+# for the running interpreter
+allow-compiled: no
+
+# Use the directory listings (autoindex pages) of web directories, if the server
+# lists them, to find modules without probing for each one
+directory-listing: yes
+
+# List web directories through WebDAV 'PROPFIND' requests instead
+webdav: no
+
+# Fetch many modules in one request, if the server has a batch endpoint
+# (advertised by the manifest or the 'X-Httpimport-Batch' header)
+batch: yes
+
+# The transport of HTTP/S requests: 'urllib', or 'pooled' to keep connections
+# alive between requests. 'file://', 'http+unix://' URLs and the schemes
+# registered through 'register_transport()' always use their own
+transport: urllib
+
+# Seconds to wait for connecting to a host and for each read
+connect-timeout: 10
+read-timeout: 30
+
+# Seconds after which finding or loading a module fails (empty for no deadline)
+import-deadline:
+
+# Retries of failed requests, with jittered exponential backoff (seconds)
+retries: 2
+retry-backoff: 0.5
+
+# Consecutive failures of a host after which requests to it fail
+# fast for 'circuit-breaker-cooldown' seconds (0 disables it)
+circuit-breaker-threshold: 5
+circuit-breaker-cooldown: 30
+
 # Allowing HTTP can result in a Security Hazard
 allow-plaintext: no
 
@@ -59,10 +158,39 @@ headers:
 ca-verify: yes
 ca-file:
 
+# Directory for caching responses on disk.
+# Empty keeps everything in memory.
+cache-dir:
+
 # PyPI specific:
+# Seconds that PyPI API responses are used without revalidation
+pypi-cache-ttl: 600
+
+# Seconds during which stale cached responses are still served immediately,
+# while revalidated in the background for the next runs (needs 'cache-dir'
+# for web directories and archives, which are otherwise always revalidated)
+stale-while-revalidate: 0
+
+# Import from the single top-level directory of archives
+# (like the '<repo>-<commit>/' directory of the archives of git services)
+strip-prefix: no
+
+# The content of the URL never changes (e.g. an archive of a commit):
+# responses cached in 'cache-dir' are served without any request
+immutable: no
+
 # A multi-line with 'requirements.txt' syntax
 requirements:
 
+# Download all 'requirements' concurrently when the importer is created,
+# using 'preload-workers' threads
+preload: no
+preload-workers: 8
+
+# Also resolve (through the index metadata) and preload the dependencies
+# of the 'requirements'
+resolve-dependencies: no
+
 # Filepath of a 'requirements.txt' file
 requirements-file:
 
@@ -72,8 +200,6 @@ requirements-file:
 project-names:
 
 ### Not Implemented ###
-# allow-compiled: no
-
 # auth: username:password
 # auth-type: basic
 
@@ -86,8 +212,8 @@ __HOME_DIR = os.path.expanduser('~')
 _DEFAULT_INI_CONFIG_FILENAME = __HOME_DIR + os.sep + ".httpimport.ini"
 _DEFAULT_INI_CONFIG_DIR_NAME = __HOME_DIR + os.sep + ".httpimport"
 
-CONFIG = ConfigParser()
-CONFIG.read_string(_DEFAULT_INI_CONFIG)
+# 'CONFIG' (a 'ConfigParser') is created on first use, by '_config()'
+_CONFIG_LOCK = threading.RLock()
 
 # ====================== Logging ======================
 
@@ -101,10 +227,335 @@ log_formatter = logging.Formatter(log_format)
 log_handler.setFormatter(log_formatter)
 logger.addHandler(log_handler)
 
+# ====================== Fork safety ======================
+
+# Objects whose '_lock' gets replaced in forked children, mapped to
+# whether the lock is re-entrant
+_LOCK_OWNERS = weakref.WeakKeyDictionary()
+
+
+def _new_lock(owner, reentrant=False):
+    """ Returns a lock for `owner._lock`. The lock is replaced in children forked
+    while a thread of the parent process holds it, as it would never be released """
+    _LOCK_OWNERS[owner] = reentrant
+    return threading.RLock() if reentrant else threading.Lock()
+
+
+def _after_fork_in_child():
+    global _CIRCUIT_BREAKERS_LOCK, _CONFIG_LOCK
+    _CIRCUIT_BREAKERS_LOCK = threading.Lock()
+    _CONFIG_LOCK = threading.RLock()
+    owners = list(_LOCK_OWNERS.items())
+    # All locks are replaced before any hook runs, as hooks may take other owners' locks
+    # (e.g. through imports triggered by warnings)
+    for owner, reentrant in owners:
+        owner._lock = threading.RLock() if reentrant else threading.Lock()
+    for owner, _ in owners:
+        if hasattr(owner, '_after_fork'):
+            owner._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
 # ====================== HTTP abstraction ======================
 
 
-def http(url, headers={}, method='GET', proxy=None, ca_verify=True, ca_file=None):
+class CircuitOpenError(URLError):
+    """ Raised when requests to a host fail fast, as its circuit breaker is open """
+
+
+class DeadlineExceededError(URLError):
+    """ Raised when the deadline of the running import has been exceeded """
+
+
+class OfflineError(URLError):
+    """ Raised instead of connecting, in offline mode (`OFFLINE` or the `offline` option) """
+
+
+class DigestMismatchError(ValueError):
+    """ Raised when downloaded content does not match its expected digest """
+
+
+class ZipPasswordError(ImportError, RuntimeError):
+    """ Raised when the password of an encrypted ZIP archive is missing or wrong. A
+    `RuntimeError` too, like the password errors of `zipfile` """
+
+
+# HTTP Status Codes that are retried and count as host failures
+_RETRY_CODES = (429, 500, 502, 503, 504)
+
+# The keyword arguments of 'http()' that are configurable through profiles
+_HTTP_OPTIONS = ('offline', 'connect_timeout', 'read_timeout', 'retries',
+                 'retry_backoff', 'breaker_threshold', 'breaker_cooldown', 'transport')
+
+_DEADLINE = threading.local()
+
+
+@contextmanager
+def _deadline(seconds):
+    """ Context Manager that sets a deadline for all HTTP requests issued in the
+    current thread. Nested deadlines never extend an outer one.
+
+    Args:
+        seconds (float): Seconds from now until the deadline. `None` sets no deadline
+    """
+    previous = getattr(_DEADLINE, 'at', None)
+    if seconds:
+        deadline = time.monotonic() + seconds
+        _DEADLINE.at = deadline if previous is None else min(previous, deadline)
+    try:
+        yield
+    finally:
+        _DEADLINE.at = previous
+
+
+def _deadline_remaining():
+    """ Returns the seconds left until the current thread's deadline, or `None` """
+    deadline = getattr(_DEADLINE, 'at', None)
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class _CircuitBreaker(object):
+    """ Tracks consecutive failures of a host. After `threshold` failures requests
+    to the host fail fast for `cooldown` seconds, after which a single trial request
+    is let through to probe the host again.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.failures = 0
+        self.opened_at = None
+        self._lock = _new_lock(self)
+
+    def before_request(self, cooldown):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < cooldown:
+                raise CircuitOpenError(
+                    "Circuit breaker for host '%s' is open" % self.host)
+            # Half-open: let this request through as a trial,
+            # while the rest keep failing fast
+            logger.info(
+                "[*] Probing host '%s' after circuit breaker cooldown" % self.host)
+            self.opened_at = time.monotonic()
+
+    def record(self, failed, threshold):
+        with self._lock:
+            if not failed:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= threshold:
+                if self.opened_at is None:
+                    logger.warning(
+                        "[-] Host '%s' failed %d times in a row. Opening circuit breaker..." %
+                        (self.host, self.failures))
+                self.opened_at = time.monotonic()
+
+
+_CIRCUIT_BREAKERS = {}
+_CIRCUIT_BREAKERS_LOCK = threading.Lock()
+
+
+def _circuit_breaker(url):
+    """ Returns the `_CircuitBreaker` of the host of `url` """
+    host = url.split('://', 1)[-1].split('/', 1)[0]
+    with _CIRCUIT_BREAKERS_LOCK:
+        if host not in _CIRCUIT_BREAKERS:
+            _CIRCUIT_BREAKERS[host] = _CircuitBreaker(host)
+        return _CIRCUIT_BREAKERS[host]
+
+
+class _ReadTimeoutMixIn(object):
+    """ Sets the socket timeout to `read_timeout` once the connection is established.
+    The `timeout` argument of the connection is then only used for connecting. """
+
+    def __init__(self, *args, read_timeout=None, **kw):
+        super(_ReadTimeoutMixIn, self).__init__(*args, **kw)
+        self.read_timeout = read_timeout
+
+    def connect(self):
+        super(_ReadTimeoutMixIn, self).connect()
+        if self.read_timeout is not None:
+            self.sock.settimeout(self.read_timeout)
+
+
+# The HTTP and HTTPS handler classes, defined on first use
+_HANDLERS = []
+
+
+def _timeout_handlers():
+    """ Returns the `urllib` HTTP and HTTPS handler classes, that apply
+    the read timeout set on requests (as `read_timeout`) """
+    if not _HANDLERS:
+        from http.client import HTTPConnection, HTTPSConnection
+        from urllib.request import HTTPHandler, HTTPSHandler
+
+        class _HTTPConnection(_ReadTimeoutMixIn, HTTPConnection):
+            pass
+
+        class _HTTPSConnection(_ReadTimeoutMixIn, HTTPSConnection):
+            pass
+
+        class _HTTPHandler(HTTPHandler):
+
+            def http_open(self, req):
+                return self.do_open(_HTTPConnection, req,
+                                    read_timeout=getattr(req, 'read_timeout', None))
+
+        class _HTTPSHandler(HTTPSHandler):
+
+            def https_open(self, req):
+                return self.do_open(_HTTPSConnection, req, context=self._context,
+                                    read_timeout=getattr(req, 'read_timeout', None))
+
+        _HANDLERS[:] = [_HTTPHandler, _HTTPSHandler]
+    return _HANDLERS
+
+
+class _SingleFlight(object):
+    """ Makes concurrent calls with the same key share one execution and its outcome """
+
+    def __init__(self):
+        self._lock = _new_lock(self)
+        self._flights = {}
+
+    def do(self, key, function):
+        """ Calls `function`, unless a call with the same `key` is in flight.
+        Then waits for that call (within the import deadline) and returns its result.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = {
+                    'done': threading.Event(), 'result': None, 'error': None}
+
+        if not leader:
+            logger.debug("[*] Waiting for in-flight request: %s" % (key[0],))
+            if not flight['done'].wait(_deadline_remaining()):
+                raise DeadlineExceededError(
+                    "Import deadline exceeded while waiting for '%s'" % (key[0],))
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['result']
+
+        try:
+            flight['result'] = function()
+        except BaseException as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight['done'].set()
+        return flight['result']
+
+    def _after_fork(self):
+        # Requests of the parent's threads never complete in a child
+        self._flights = {}
+
+
+class _KeyedLocks(object):
+    """ Hands out one re-entrant lock per key (e.g. per module name) """
+
+    def __init__(self):
+        self._lock = _new_lock(self)
+        self._locks = {}
+
+    def __getitem__(self, key):
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.RLock()
+            return lock
+
+    def _after_fork(self):
+        self._locks = {}
+
+
+_SINGLE_FLIGHT = _SingleFlight()
+
+_OPENERS = {}
+
+
+def _ssl_context(ca_verify=True, ca_file=None):
+    """ Returns an SSL context for the given TLS settings """
+    import ssl
+
+    return ssl.create_default_context(cafile=ca_file) \
+        if ca_verify else ssl._create_unverified_context()
+
+
+def _opener(ca_verify=True, ca_file=None):
+    """ Returns a (cached) `urllib` opener for the given TLS settings """
+    key = (ca_verify, ca_file)
+    if key not in _OPENERS:
+        from urllib.request import build_opener
+
+        http_handler, https_handler = _timeout_handlers()
+        _OPENERS[key] = build_opener(
+            http_handler(), https_handler(context=_ssl_context(ca_verify, ca_file)))
+    return _OPENERS[key]
+
+
+def _read_verified(resp, url, sha256, chunk_size=64 * 1024):
+    """ Reads a response body in chunks, verifying its SHA256 digest while streaming """
+    import hashlib
+
+    hasher = hashlib.sha256()
+    chunks = []
+    chunk = resp.read(chunk_size)
+    while chunk:
+        hasher.update(chunk)
+        chunks.append(chunk)
+        chunk = resp.read(chunk_size)
+    if hasher.hexdigest() != sha256.lower():
+        raise DigestMismatchError(
+            "SHA256 digest of '%s' is '%s' instead of '%s'" %
+            (url, hasher.hexdigest(), sha256))
+    return b''.join(chunks)
+
+
+def _urllib_http(opener, url, headers, method, proxy,
+                 connect_timeout, read_timeout, sha256=None, data=None):
+    from urllib.request import Request
+
+    req = Request(url, data=data, headers=headers, method=method.upper())
+    req.read_timeout = read_timeout
+
+    if proxy:
+        scheme, host = proxy.split('://', 1)
+        req.set_proxy(host, scheme)
+
+    try:
+        if connect_timeout is None:
+            resp = opener.open(req)
+        else:
+            resp = opener.open(req, timeout=connect_timeout)
+        headers = {k.lower(): v for k, v in resp.getheaders()}
+        if sha256 is None:
+            body = resp.read()
+        else:
+            body = _read_verified(resp, url, sha256)
+        resp_dict = {'code': resp.code, 'body': body, 'headers': headers}
+        if resp.geturl() != url:
+            resp_dict['url'] = resp.geturl()
+        return resp_dict
+    except HTTPError as he:
+        headers = {k.lower(): v for k, v in he.headers.items()} if he.headers else {}
+        return {'code': he.code, 'body': b'', 'headers': headers}
+
+
+def http(url, headers={}, method='GET', proxy=None, ca_verify=True, ca_file=None,
+         connect_timeout=None, read_timeout=None, retries=0, retry_backoff=0.5,
+         breaker_threshold=0, breaker_cooldown=30, sha256=None, offline=False, data=None,
+         transport=None):
     """ Wraps HTTP/S calls in one place
 
     Args:
@@ -114,25 +565,1040 @@ def http(url, headers={}, method='GET', proxy=None, ca_verify=True, ca_file=None
         proxy (str):
         ca_verify (bool):
         ca-file (str):
+        connect_timeout (float): Seconds to wait for the connection to be established
+        read_timeout (float): Seconds to wait for each read from the established connection
+        retries (int): Retries of requests failing with connection errors or 5xx codes
+        retry_backoff (float): Base seconds of the (jittered, exponential) retry backoff
+        breaker_threshold (int): Consecutive failures of a host that open its circuit
+            breaker, making further requests fail fast. 0 disables the circuit breaker
+        breaker_cooldown (float): Seconds that an open circuit breaker fails requests
+        sha256 (str): The expected SHA256 hex digest of the response body,
+            verified while the body is streamed
+        offline (bool): Do not connect, raising `OfflineError` (as does the `OFFLINE` global)
+        data (bytes): The body of the request (e.g. of a 'POST')
+        transport (str): The name of the Transport of HTTP/S requests ('urllib' by default),
+            or a `Transport`. URL schemes with a registered Transport always use it
 
     Returns:
-        dict: A dict containing 'code', 'headers', 'body' of HTTP response
+        dict: A dict containing 'code', 'headers', 'body' of HTTP response, and 'url'
+            (the final URL) if redirects have been followed
+
+    Raises:
+        URLError: If the host cannot be reached. Specifically `CircuitOpenError` if
+            the host's circuit breaker is open, `DeadlineExceededError` if the
+            deadline of the running import has passed and `OfflineError` in offline mode.
+        DigestMismatchError: If the body does not match the `sha256` digest
     """
-    req = Request(url, headers=headers, method=method.upper())
+    if OFFLINE or offline:
+        raise OfflineError("Offline mode: not requesting '%s'" % url)
+    request = functools.partial(
+        _http_attempts, url, headers, method, proxy, ca_verify, ca_file,
+        connect_timeout, read_timeout, retries, retry_backoff,
+        breaker_threshold, breaker_cooldown, sha256, data, transport)
+    if method != 'GET':
+        return request()
+    # Concurrent identical GETs (e.g. threads importing the same module)
+    # share a single download
+    key = (url, tuple(sorted(headers.items())), proxy, ca_verify, ca_file, sha256, transport)
+    return dict(_SINGLE_FLIGHT.do(key, request))
+
+
+def _http_attempts(url, headers, method, proxy, ca_verify, ca_file,
+                   connect_timeout, read_timeout, retries, retry_backoff,
+                   breaker_threshold, breaker_cooldown, sha256, data=None, transport=None):
+    """ Issues a request (`http()`), retrying it and keeping its host's circuit breaker """
+    import random
+    import ssl
+    from http.client import HTTPException
+
+    transport = _transport(url, transport, ca_verify, ca_file, proxy)
+    breaker = _circuit_breaker(url) if breaker_threshold else None
+    attempt = 0
+    while True:
+        remaining = _deadline_remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceededError(
+                    "Import deadline exceeded while requesting '%s'" % url)
+            connect_timeout = min(connect_timeout or remaining, remaining)
+            read_timeout = min(read_timeout or remaining, remaining)
+        if breaker is not None:
+            breaker.before_request(breaker_cooldown)
+
+        resp, error = None, None
+        try:
+            resp = transport.request(url, headers, method, data, proxy,
+                                     connect_timeout, read_timeout, sha256)
+        except URLError as e:
+            # TLS verification failures are not transient
+            if isinstance(e.reason, ssl.SSLCertVerificationError):
+                raise
+            error = e
+        except (OSError, HTTPException) as e:
+            error = e
+        failed = error is not None or resp['code'] in _RETRY_CODES
+        if breaker is not None:
+            breaker.record(failed, breaker_threshold)
+        if not failed or attempt >= retries:
+            break
+
+        # Full jitter backoff, never sleeping past the deadline
+        delay = random.uniform(0, retry_backoff * 2 ** attempt)
+        remaining = _deadline_remaining()
+        if remaining is not None and delay >= remaining:
+            break
+        attempt += 1
+        logger.info(
+            "[*] Request to '%s' failed (%s). Retry %d/%d in %.2f seconds..." %
+            (url, error or resp['code'], attempt, retries, delay))
+        time.sleep(delay)
 
-    if proxy:
-        scheme, host = proxy.split('://', 1)
-        req.set_proxy(host, scheme)
+    if error is not None:
+        if isinstance(error, URLError):
+            raise error
+        raise URLError(error)
+    return resp
 
-    try:
-        resp = urlopen(req,
-            context=ssl.create_default_context(cafile=ca_file)
-                if ca_verify else ssl._create_unverified_context()
-                )
-        headers = {k.lower(): v for k, v in resp.getheaders()}
-        return {'code': resp.code, 'body': resp.read(), 'headers': headers}
-    except HTTPError as he:
-        return {'code': he.code, 'body': b'', 'headers': {}}
+# ====================== Transports ======================
+
+
+class Transport(object):
+    """ The interface of the backends issuing the requests of `http()`. Retries, circuit
+    breakers and import deadlines are applied by `http()`, on top of them.
+
+    Transports are selected by the scheme of the URL (see `register_transport()`), or,
+    for HTTP/S URLs, by name through the `transport` profile option ('urllib', 'pooled').
+    """
+
+    # Requests never leave the host, so plaintext URLs are allowed
+    local = False
+
+    def request(self, url, headers={}, method='GET', data=None, proxy=None,
+                connect_timeout=None, read_timeout=None, sha256=None):
+        """ Issues a single request
+
+        Args:
+            url (str): The URL to request
+            headers (dict): The HTTP Headers of the request
+            method (str): The HTTP method
+            data (bytes): The body of the request (e.g. of a 'POST')
+            proxy (str): The URL of the HTTP proxy to use
+            connect_timeout (float): Seconds to wait for the connection to be established
+            read_timeout (float): Seconds to wait for each read from the established connection
+            sha256 (str): The expected SHA256 hex digest of the response body
+
+        Returns:
+            dict: A dict containing 'code', 'headers' (lowercase) and 'body' of the response.
+                Responses that are not successful have an empty body
+
+        Raises:
+            URLError: If the server cannot be reached
+            DigestMismatchError: If the body does not match the `sha256` digest
+        """
+        raise NotImplementedError
+
+
+class UrllibTransport(Transport):
+    """ Issues requests through `urllib`, opening a connection per request """
+
+    def __init__(self, ca_verify=True, ca_file=None):
+        self.opener = _opener(ca_verify, ca_file)
+
+    def request(self, url, headers={}, method='GET', data=None, proxy=None,
+                connect_timeout=None, read_timeout=None, sha256=None):
+        return _urllib_http(self.opener, url, headers, method, proxy,
+                            connect_timeout, read_timeout, sha256=sha256, data=data)
+
+
+class PooledTransport(Transport):
+    """ Issues requests through `http.client`, keeping the connections alive in a pool
+    per host. Most requests then skip the TCP and TLS handshakes. Requests through
+    a cache server ('cache+http://' and 'cache+http+unix://' proxies, see `cache_server()`)
+    are sent to it as absolute URLs. Requests through other proxies are issued by `urllib`
+
+    Args:
+        ca_verify (bool): Verify the TLS certificates of the servers
+        ca_file (str): The CA bundle to verify the TLS certificates with
+        max_idle (int): The idle connections kept per host
+    """
+
+    max_redirects = 5
+
+    def __init__(self, ca_verify=True, ca_file=None, max_idle=8):
+        self.ca_verify = ca_verify
+        self.ca_file = ca_file
+        self.max_idle = max_idle
+        self._context = None
+        self._proxied = None
+        # (scheme, netloc) mapped to idle connections
+        self._idle = {}
+        self._lock = _new_lock(self)
+
+    def _after_fork(self):
+        # The sockets are shared with the parent. Their file descriptors are closed
+        # without any shutdown, and before the GC would warn about them
+        for connections in self._idle.values():
+            for conn in connections:
+                sock, conn.sock = conn.sock, None
+                if sock is not None:
+                    try:
+                        os.close(sock.detach())
+                    except OSError:
+                        pass
+        self._idle = {}
+
+    def _connect(self, scheme, netloc, timeout):
+        """ Returns a new (not yet connected) connection to `netloc` """
+        from http.client import HTTPConnection, HTTPSConnection
+        from urllib.parse import unquote
+
+        kw = {} if timeout is None else {'timeout': timeout}
+        if scheme == 'http+unix':
+            return _unix_connection()(unquote(netloc), **kw)
+        if scheme == 'https':
+            return HTTPSConnection(netloc, context=self._context, **kw)
+        return HTTPConnection(netloc, **kw)
+
+    def _acquire(self, key, timeout):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop(), True
+        return self._connect(key[0], key[1], timeout), False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _send(self, key, target, headers, method, data, connect_timeout, read_timeout):
+        """ Sends a request through a pooled connection, and returns it with the response """
+        while True:
+            conn, reused = self._acquire(key, connect_timeout)
+            try:
+                if conn.sock is None:
+                    conn.connect()
+                conn.sock.settimeout(read_timeout)
+                conn.request(method, target, body=data, headers=headers)
+                return conn, conn.getresponse()
+            except ConnectionError:
+                conn.close()
+                if not reused:
+                    raise
+                # The server closed the idle connection. Retry on another one
+                logger.debug("[*] Pooled connection to '%s' was closed. Reconnecting..." % key[1])
+            except BaseException:
+                conn.close()
+                raise
+
+    def request(self, url, headers={}, method='GET', data=None, proxy=None,
+                connect_timeout=None, read_timeout=None, sha256=None):
+        from urllib.parse import urljoin, urlsplit
+
+        cache_server = None
+        if proxy and proxy.lower().startswith('cache+'):
+            cache_server = urlsplit(proxy[len('cache+'):])
+        elif proxy:
+            if self._proxied is None:
+                self._proxied = UrllibTransport(self.ca_verify, self.ca_file)
+            return self._proxied.request(url, headers, method, data, proxy,
+                                         connect_timeout, read_timeout, sha256)
+        method = method.upper()
+        requested = url
+        for _ in range(self.max_redirects + 1):
+            scheme, netloc, path, query, _ = urlsplit(url)
+            if cache_server is not None:
+                key = (cache_server.scheme.lower(), cache_server.netloc)
+                target = url
+                headers = dict(headers, Host=netloc)
+            else:
+                key = (scheme.lower(), netloc)
+                target = (path or '/') + ('?' + query if query else '')
+            if key[0] == 'https' and self._context is None:
+                self._context = _ssl_context(self.ca_verify, self.ca_file)
+            try:
+                conn, resp = self._send(key, target, headers, method, data,
+                                        connect_timeout, read_timeout)
+                try:
+                    resp_headers = {k.lower(): v for k, v in resp.getheaders()}
+                    if resp.status >= 300:
+                        resp.read()
+                        body = b''
+                    elif sha256 is not None:
+                        body = _read_verified(resp, url, sha256)
+                    else:
+                        body = resp.read()
+                except BaseException:
+                    conn.close()
+                    raise
+            except OSError as e:
+                raise URLError(e)
+            if resp.will_close:
+                conn.close()
+            else:
+                self._release(key, conn)
+
+            location = resp_headers.get('location')
+            if resp.status not in (301, 302, 303, 307, 308) or not location:
+                resp_dict = {'code': resp.status, 'body': body, 'headers': resp_headers}
+                if url != requested:
+                    resp_dict['url'] = url
+                return resp_dict
+            url = scheme + '://' + netloc + location if location.startswith('/') \
+                else urljoin(url, location)
+            if resp.status == 303 or (resp.status in (301, 302) and method == 'POST'):
+                method, data = 'GET', None
+            logger.debug("[*] Following redirect to '%s'" % url)
+        raise URLError("Too many redirects while requesting '%s'" % url)
+
+
+# The 'http.client' connection class for Unix domain sockets, defined on first use
+_UNIX_CONNECTIONS = []
+
+
+def _unix_connection():
+    """ Returns the `http.client` connection class connecting to Unix domain sockets """
+    if not _UNIX_CONNECTIONS:
+        import socket
+        from http.client import HTTPConnection
+
+        class _UnixHTTPConnection(HTTPConnection):
+
+            def __init__(self, socket_path, **kw):
+                HTTPConnection.__init__(self, 'localhost', **kw)
+                self.socket_path = socket_path
+
+            def connect(self):
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                if self.timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                    sock.settimeout(self.timeout)
+                try:
+                    sock.connect(self.socket_path)
+                except OSError:
+                    sock.close()
+                    raise
+                self.sock = sock
+
+        _UNIX_CONNECTIONS.append(_UnixHTTPConnection)
+    return _UNIX_CONNECTIONS[0]
+
+
+class UnixSocketTransport(PooledTransport):
+    """ Issues requests of 'http+unix://' URLs to a server listening on a Unix domain
+    socket, keeping the connections alive. The host of the URLs is the percent-encoded
+    path of the socket, e.g. 'http+unix://%2Frun%2Fpackages.sock/test_package/__init__.py' """
+
+    local = True
+
+
+class FileTransport(Transport):
+    """ Reads 'file://' URLs from the local filesystem, answering conditional requests
+    ('If-Modified-Since'). Directories are served with an empty body """
+
+    local = True
+
+    def request(self, url, headers={}, method='GET', data=None, proxy=None,
+                connect_timeout=None, read_timeout=None, sha256=None):
+        import stat
+        from email.utils import formatdate, parsedate_to_datetime
+        from urllib.parse import urlsplit
+        from urllib.request import url2pathname
+
+        if method.upper() != 'GET':
+            return {'code': 405, 'body': b'', 'headers': {}}
+        path = url2pathname(urlsplit(url).path)
+        try:
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return {'code': 404, 'body': b'', 'headers': {}}
+        except PermissionError:
+            return {'code': 403, 'body': b'', 'headers': {}}
+        except OSError as e:
+            raise URLError(e)
+        resp_headers = {'last-modified': formatdate(st.st_mtime, usegmt=True)}
+        since = {k.lower(): v for k, v in headers.items()}.get('if-modified-since')
+        if since:
+            try:
+                if int(st.st_mtime) <= parsedate_to_datetime(since).timestamp():
+                    return {'code': 304, 'body': b'', 'headers': resp_headers}
+            except (TypeError, ValueError):
+                pass
+        if stat.S_ISDIR(st.st_mode):
+            body = b''
+        else:
+            with open(path, 'rb') as f:
+                body = f.read() if sha256 is None else _read_verified(f, url, sha256)
+        resp_headers['content-length'] = str(len(body))
+        return {'code': 200, 'body': body, 'headers': resp_headers}
+
+
+class MemoryTransport(Transport):
+    """ Serves files kept in memory, without any I/O. URLs that files are found under
+    are served as directories, with an empty body. Register it for a scheme of its own:
+
+    >>> httpimport.register_transport('memory', httpimport.MemoryTransport({
+    ...     'memory://packages/hello.py': b'print("Hello")'}))
+
+    Args:
+        files (dict): URLs mapped to the bytes served
+    """
+
+    local = True
+
+    def __init__(self, files=None):
+        self.files = dict(files or {})
+
+    def request(self, url, headers={}, method='GET', data=None, proxy=None,
+                connect_timeout=None, read_timeout=None, sha256=None):
+        import hashlib
+
+        if method.upper() != 'GET':
+            return {'code': 405, 'body': b'', 'headers': {}}
+        body = self.files.get(url)
+        if body is None:
+            prefix = url.rstrip('/') + '/'
+            if not any(name.startswith(prefix) for name in self.files):
+                return {'code': 404, 'body': b'', 'headers': {}}
+            body = b''
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        resp_headers = {'etag': etag, 'content-length': str(len(body))}
+        if {k.lower(): v for k, v in headers.items()}.get('if-none-match') == etag:
+            return {'code': 304, 'body': b'', 'headers': resp_headers}
+        if sha256 is not None:
+            body = _read_verified(io.BytesIO(body), url, sha256)
+        return {'code': 200, 'body': body, 'headers': resp_headers}
+
+
+# The Transports selectable by name (see the 'transport' profile option)
+_TRANSPORT_CLASSES = {
+    'urllib': UrllibTransport,
+    'pooled': PooledTransport,
+}
+# Named Transports, created on first use for each TLS setting
+_TRANSPORTS = {}
+# URL schemes mapped to the Transports issuing their requests
+_SCHEME_TRANSPORTS = {
+    'file': FileTransport(),
+    'http+unix': UnixSocketTransport(),
+}
+
+
+def register_transport(scheme, transport):
+    """ Sets the Transport issuing the requests of the URLs of a scheme
+
+    Args:
+        scheme (str): The URL scheme (e.g. 'memory')
+        transport (Transport): The Transport. `None` unregisters the scheme
+    """
+    if transport is None:
+        _SCHEME_TRANSPORTS.pop(scheme.lower(), None)
+    else:
+        _SCHEME_TRANSPORTS[scheme.lower()] = transport
+
+
+def _transport(url, transport=None, ca_verify=True, ca_file=None, proxy=None):
+    """ Returns the Transport issuing a request: the one registered for the scheme of `url`,
+    the pooled one for requests through a cache server (a 'cache+' `proxy`), or
+    `transport` (a `Transport` or the name of one, 'urllib' by default) """
+    scheme = url.split('://', 1)[0].lower()
+    if scheme in _SCHEME_TRANSPORTS:
+        return _SCHEME_TRANSPORTS[scheme]
+    if proxy and proxy.lower().startswith('cache+'):
+        transport = 'pooled'
+    elif isinstance(transport, Transport):
+        return transport
+    key = (transport or 'urllib', ca_verify, ca_file)
+    if key not in _TRANSPORTS:
+        if key[0] not in _TRANSPORT_CLASSES:
+            raise ValueError("Unknown transport '%s' (available: %s)" %
+                             (key[0], ', '.join(sorted(_TRANSPORT_CLASSES))))
+        _TRANSPORTS[key] = _TRANSPORT_CLASSES[key[0]](ca_verify=ca_verify, ca_file=ca_file)
+    return _TRANSPORTS[key]
+
+
+def _is_local(url):
+    """ Whether the requests of `url` never leave the host (see `Transport.local`) """
+    transport = _SCHEME_TRANSPORTS.get(url.split('://', 1)[0].lower())
+    return transport is not None and transport.local
+
+# ====================== Mirrors ======================
+
+
+class _MirrorSet(object):
+    """ Keeps latency and failure statistics for a set of equivalent base URLs
+    and ranks them, so that requests go to the fastest healthy mirror first.
+
+    Args:
+        urls (list): The base URLs serving the same content
+        hedge_percentile (float): The latency percentile after which a hedged
+            request is sent to the next mirror
+    """
+
+    # Latency samples kept per mirror
+    SAMPLES = 32
+    # Hedge delay (seconds) used until enough samples have been collected
+    DEFAULT_HEDGE_DELAY = 1.0
+    # Consecutive failures before a mirror gets demoted
+    MAX_FAILURES = 3
+    # Seconds a failing mirror stays demoted
+    DEMOTION_PERIOD = 60
+    # A mirror this many times slower than the fastest one gets demoted
+    SLOW_FACTOR = 4
+
+    def __init__(self, urls, hedge_percentile=95):
+        self.urls = list(urls)
+        self.hedge_percentile = hedge_percentile
+        self._lock = _new_lock(self)
+        self._latencies = {url: [] for url in self.urls}
+        self._failures = {url: 0 for url in self.urls}
+        self._demoted_until = {url: 0 for url in self.urls}
+
+    def _median(self, url):
+        samples = sorted(self._latencies[url])
+        if not samples:
+            # Unknown mirrors are tried early to collect statistics
+            return 0
+        return samples[len(samples) // 2]
+
+    def ranked(self):
+        """ Returns the mirror URLs, healthy ones first, ordered by median latency """
+        now = time.monotonic()
+        with self._lock:
+            return sorted(
+                self.urls,
+                key=lambda url: (self._demoted_until[url] > now,
+                                 self._median(url)))
+
+    def hedge_delay(self):
+        """ Returns the seconds to wait for a response before hedging """
+        with self._lock:
+            samples = sorted(
+                sample for url in self.urls for sample in self._latencies[url])
+        if len(samples) < 5:
+            return self.DEFAULT_HEDGE_DELAY
+        index = int(round((self.hedge_percentile / 100.0) * (len(samples) - 1)))
+        return samples[min(index, len(samples) - 1)]
+
+    def record(self, url, latency=None, failed=False):
+        """ Records the outcome of a request issued to a mirror """
+        with self._lock:
+            if failed:
+                self._failures[url] += 1
+                if self._failures[url] >= self.MAX_FAILURES:
+                    logger.warning(
+                        "[-] Mirror '%s' failed %d times in a row. Demoting..." %
+                        (url, self._failures[url]))
+                    self._demoted_until[url] = time.monotonic() + self.DEMOTION_PERIOD
+                    self._failures[url] = 0
+                return
+            self._failures[url] = 0
+            samples = self._latencies[url]
+            samples.append(latency)
+            del samples[:-self.SAMPLES]
+            medians = [self._median(u) for u in self.urls if self._latencies[u]]
+            if len(medians) > 1 and len(samples) >= 5 and \
+                    self._median(url) > self.SLOW_FACTOR * min(medians):
+                logger.warning(
+                    "[-] Mirror '%s' responds slowly. Demoting..." % url)
+                self._demoted_until[url] = time.monotonic() + self.DEMOTION_PERIOD
+                del samples[:]
+
+
+def _hedged_http(mirror_set, make_url, request=None, **http_kw):
+    """ Issues an HTTP request against a set of mirrors. The request is sent to
+    the best ranked mirror and, if no response arrives within the hedge delay,
+    a duplicate is sent to the next one. Failing mirrors are failed over immediately.
+
+    Args:
+        mirror_set (_MirrorSet): The mirrors to query
+        make_url (callable): Returns the URL to request given a mirror's base URL
+        request (callable): The function issuing the requests. Defaults to `http()`
+        **http_kw (dict): Parameters passed to `request`
+
+    Returns:
+        dict: The first non-failed response, as returned by `http()`
+
+    Raises:
+        DeadlineExceededError: If the deadline of the running import passes while
+            waiting for the mirrors
+    """
+    import queue
+
+    request = request or http
+    candidates = mirror_set.ranked()
+    if len(candidates) == 1:
+        return request(make_url(candidates[0]), **http_kw)
+    # Failing over to the next mirror replaces retrying
+    http_kw['retries'] = 0
+    # The deadline is thread-local, so it is passed on to the requesting threads
+    remaining = _deadline_remaining()
+    deadline = None if remaining is None else time.monotonic() + remaining
+
+    results = queue.Queue()
+
+    def _request(base):
+        url = make_url(base)
+        start = time.monotonic()
+        try:
+            if deadline is not None and deadline <= start:
+                raise DeadlineExceededError(
+                    "Import deadline exceeded while requesting '%s'" % url)
+            with _deadline(None if deadline is None else deadline - start):
+                resp = request(url, **http_kw)
+        except Exception as e:
+            if not isinstance(e, OfflineError):
+                mirror_set.record(base, failed=True)
+            results.put((base, None, e))
+            return
+        failed = resp['code'] >= 500
+        mirror_set.record(base, time.monotonic() - start, failed=failed)
+        results.put((base, resp, None))
+
+    pending = 0
+    last_resp, last_error = None, None
+    while candidates or pending:
+        if candidates:
+            thread = threading.Thread(target=_request, args=(candidates.pop(0),))
+            thread.daemon = True
+            thread.start()
+            pending += 1
+        # Wait for the hedge delay, unless there is nothing left to hedge with
+        timeout = mirror_set.hedge_delay() if candidates else None
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError(
+                    "Import deadline exceeded while waiting for the mirrors")
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        try:
+            base, resp, error = results.get(timeout=timeout)
+        except queue.Empty:
+            if candidates:
+                logger.info(
+                    "[*] No mirror responded in time. Hedging request to next mirror...")
+            continue
+        pending -= 1
+        if resp is not None and resp['code'] < 500:
+            logger.debug("[+] Mirror '%s' responded first" % base)
+            return resp
+        logger.info("[-] Mirror '%s' failed. Failing over..." % base)
+        # The loop fails over to the next mirror without waiting
+        last_resp, last_error = resp or last_resp, error or last_error
+    if last_resp is not None:
+        return last_resp
+    raise last_error
+
+# ====================== Caching ======================
+
+
+class _ResponseCache(object):
+    """ Caches HTTP responses in memory and, if a cache directory is given, on disk.
+    Entries keep the response validators ('etag', 'last-modified') for revalidation.
+    """
+
+    def __init__(self):
+        self._memory = {}
+        self._lock = _new_lock(self)
+        # URLs revalidated in the background mapped to their threads
+        self._revalidating = {}
+
+    @staticmethod
+    def _path(url, cache_dir):
+        import hashlib
+
+        return os.path.join(
+            cache_dir, 'http', hashlib.sha256(url.encode('utf8')).hexdigest())
+
+    def revalidate(self, url, entry, request, cache_dir=None, memory=True):
+        """ Revalidates a cached entry on a background thread, through a conditional
+        request, and stores the refreshed response for the next requests (or runs).
+        An entry is revalidated by one thread at a time.
+
+        Args:
+            url (str): The URL of the entry
+            entry (dict): The entry, as returned by `get()`
+            request (callable): Issues the request, given the headers of the conditional
+                request, and returns the response, as returned by `http()`
+            cache_dir (str): The directory of the on-disk cache
+            memory (bool): Also store the refreshed response in memory
+        """
+        def _revalidate():
+            try:
+                resp = request(_conditional_headers(entry['resp']['headers']))
+                if resp['code'] == 304:
+                    logger.debug("[+] Cached response of '%s' is still valid" % url)
+                    self.put(url, entry['resp'], cache_dir, memory=memory)
+                elif resp['code'] in (200, 404):
+                    logger.debug("[+] Cached response of '%s' refreshed" % url)
+                    self.put(url, resp, cache_dir, memory=memory)
+            except Exception as e:
+                logger.info("[-] Revalidating '%s' in the background failed: %s" % (url, e))
+            finally:
+                with self._lock:
+                    self._revalidating.pop(url, None)
+
+        with self._lock:
+            if url in self._revalidating:
+                return
+            thread = self._revalidating[url] = threading.Thread(
+                target=_revalidate, name='httpimport-revalidate', daemon=True)
+        logger.debug("[*] Serving '%s' from cache, while revalidating it" % url)
+        thread.start()
+
+    def wait(self, timeout=None):
+        """ Waits for the background revalidations to finish (e.g. before exiting,
+        so that the next run uses the refreshed responses) """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                threads = list(self._revalidating.values())
+            if not threads:
+                return
+            for thread in threads:
+                thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+
+    def _after_fork(self):
+        # Threads do not survive 'fork'
+        self._revalidating = {}
+
+    def get(self, url, cache_dir=None, memory=True):
+        """ Returns the cached entry of `url` (a dict containing 'resp' and 'stored') or `None`.
+        Entries read from disk are kept in memory too, unless `memory` is False """
+        import json
+
+        with self._lock:
+            entry = self._memory.get(url)
+        if entry is not None or not cache_dir:
+            return entry
+        try:
+            with open(self._path(url, cache_dir), 'rb') as f:
+                meta, body = f.read().split(b'\n', 1)
+        except (OSError, ValueError):
+            return None
+        meta = json.loads(meta)
+        entry = {
+            'resp': {'code': meta['code'], 'headers': meta['headers'], 'body': body},
+            'stored': meta['stored']}
+        if memory:
+            with self._lock:
+                self._memory[url] = entry
+        return entry
+
+    def put(self, url, resp, cache_dir=None, stored=None, memory=True):
+        """ Stores the response `resp` of `url`, in memory (unless `memory` is False)
+        and in `cache_dir` (if set) """
+        import json
+
+        entry = {'resp': resp, 'stored': stored or time.time()}
+        if memory:
+            with self._lock:
+                self._memory[url] = entry
+        if not cache_dir:
+            return
+        path = self._path(url, cache_dir)
+        meta = json.dumps({'code': resp['code'], 'headers': resp['headers'],
+                           'stored': entry['stored'], 'url': url})
+        tmp_path = '%s.%d.%d.tmp' % (path, os.getpid(), threading.get_ident())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(meta.encode('utf8') + b'\n' + resp['body'])
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("[-] Could not cache '%s' on disk: %s" % (url, e))
+
+    def clear(self):
+        """ Clears the in-memory entries """
+        with self._lock:
+            self._memory.clear()
+
+
+_RESPONSE_CACHE = _ResponseCache()
+
+
+def _conditional_headers(resp_headers):
+    """ Returns the headers of a conditional request ('If-None-Match', 'If-Modified-Since')
+    revalidating a response, given its (lowercase) headers """
+    headers = {}
+    if 'etag' in resp_headers:
+        headers['If-None-Match'] = resp_headers['etag']
+    if 'last-modified' in resp_headers:
+        headers['If-Modified-Since'] = resp_headers['last-modified']
+    return headers
+
+
+def _cached_http(url, ttl=0, cache_dir=None, headers={}, stale_while_revalidate=0,
+                 cache_key=None, memory=True, **http_kw):
+    """ Issues a GET request through the response cache. Entries younger than `ttl`
+    seconds are served without a request. Older ones are revalidated through
+    conditional requests ('If-None-Match', 'If-Modified-Since'), in the background
+    for `stale_while_revalidate` more seconds.
+
+    Args:
+        url (str): The URL to request
+        ttl (float): Seconds a cached response is served without revalidation
+        cache_dir (str): The directory of the on-disk cache. `None` caches in memory only
+        headers (dict): The HTTP Headers of the request
+        stale_while_revalidate (float): Seconds after `ttl` a cached response is still
+            served immediately, while revalidated in the background
+        cache_key (str): The key of the response in the cache. Defaults to `url`
+        memory (bool): Also keep the responses in memory. Only `cache_dir` is used otherwise
+        **http_kw (dict): Parameters passed to `http()`
+
+    Returns:
+        dict: The response, as returned by `http()`
+
+    Raises:
+        OfflineError: If `url` is not cached in offline mode
+    """
+    key = cache_key or url
+    entry = _RESPONSE_CACHE.get(key, cache_dir, memory=memory)
+    if OFFLINE or http_kw.get('offline'):
+        if entry is None:
+            raise OfflineError("Offline mode: '%s' is not cached" % url)
+        # Served however old it is
+        logger.debug("[+] Serving '%s' from cache (offline mode)" % url)
+        return entry['resp']
+    if entry is not None and time.time() - entry['stored'] < ttl:
+        logger.debug("[+] Serving '%s' from cache" % url)
+        return entry['resp']
+    if entry is not None and time.time() - entry['stored'] < ttl + stale_while_revalidate:
+        _RESPONSE_CACHE.revalidate(
+            key, entry, lambda conditional: http(url, headers=dict(headers, **conditional),
+                                                 **http_kw),
+            cache_dir, memory=memory)
+        return entry['resp']
+
+    headers = dict(headers)
+    if entry is not None:
+        headers.update(_conditional_headers(entry['resp']['headers']))
+
+    resp = http(url, headers=headers, **http_kw)
+    if resp['code'] == 304 and entry is not None:
+        logger.debug("[+] Cached response of '%s' is still valid" % url)
+        _RESPONSE_CACHE.put(key, entry['resp'], cache_dir, memory=memory)
+        return entry['resp']
+    if resp['code'] == 200:
+        _RESPONSE_CACHE.put(key, resp, cache_dir, memory=memory)
+    return resp
+
+
+class _ContentStore(object):
+    """ Content-addressed store of verified files (e.g. PyPI distributions), keyed
+    by their SHA256 digest. Files are kept on disk if a cache directory is given, and
+    the most recently used ones in memory, up to `max_bytes`. Stored files are
+    immutable, so they are never revalidated.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        # Digests mapped to the contents, least recent first
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = _new_lock(self)
+
+    @staticmethod
+    def _path(sha256, cache_dir):
+        return os.path.join(cache_dir, 'sha256', sha256[:2], sha256)
+
+    def get(self, sha256, cache_dir=None):
+        """ Returns the content with the `sha256` digest, or `None` if it is not stored """
+        import hashlib
+
+        sha256 = sha256.lower()
+        with self._lock:
+            content = self._memory.get(sha256)
+            if content is not None:
+                self._memory.move_to_end(sha256)
+        if content is not None or not cache_dir:
+            return content
+        try:
+            with open(self._path(sha256, cache_dir), 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+        # Files on disk could have been tampered with
+        if hashlib.sha256(content).hexdigest() != sha256:
+            logger.warning(
+                "[-] Stored file '%s' does not match its digest. Removing..." %
+                self._path(sha256, cache_dir))
+            try:
+                os.remove(self._path(sha256, cache_dir))
+            except OSError:
+                pass
+            return None
+        self._keep(sha256, content)
+        return content
+
+    def _keep(self, sha256, content):
+        with self._lock:
+            previous = self._memory.pop(sha256, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[sha256] = content
+            self._memory_bytes += len(content)
+            while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+                self._memory_bytes -= len(self._memory.popitem(last=False)[1])
+
+    def put(self, sha256, content, cache_dir=None):
+        """ Stores `content`, which must have already been verified against `sha256` """
+        sha256 = sha256.lower()
+        self._keep(sha256, content)
+        if not cache_dir:
+            return
+        path = self._path(sha256, cache_dir)
+        if os.path.exists(path):
+            return
+        tmp_path = '%s.%d.%d.tmp' % (path, os.getpid(), threading.get_ident())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("[-] Could not store '%s' on disk: %s" % (sha256, e))
+
+    def clear(self):
+        """ Clears the in-memory files """
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+
+_CONTENT_STORE = _ContentStore()
+
+
+class _SharedSource(object):
+    """ A module source, kept once however many module records reference it
+    (see `_SourceStore`) """
+
+    __slots__ = ('sha256', '_data', '__weakref__')
+
+    def __init__(self, sha256, content):
+        self.sha256 = sha256
+        # The content and whether it is compressed, replaced at once
+        self._data = (content, False)
+
+    @property
+    def content(self):
+        import zlib
+
+        data, compressed = self._data
+        return zlib.decompress(data) if compressed else data
+
+    @property
+    def compressed(self):
+        return self._data[1]
+
+    @property
+    def size(self):
+        return len(self._data[0])
+
+    def compress(self):
+        import zlib
+
+        data, compressed = self._data
+        if not compressed:
+            self._data = (zlib.compress(data), True)
+
+
+def _relabel_code(code, filename):
+    """ Returns a copy of a code object (and of its nested ones) with `filename`
+    as the file name shown in tracebacks """
+    if code.co_filename == filename:
+        return code
+    consts = tuple(_relabel_code(const, filename) if isinstance(const, types.CodeType)
+                   else const for const in code.co_consts)
+    return code.replace(co_filename=filename, co_consts=consts)
+
+
+class _SourceStore(object):
+    """ Process-wide content-addressed store of module sources and code objects, keyed
+    by the SHA256 digest of the source. Identical files found by several importers
+    (e.g. the same repository at several git refs, or versions of a PyPI project)
+    are kept once and compiled once.
+
+    Sources live as long as a module record references them. The most recently used
+    ones are also kept, up to `max_bytes`, for importers that have dropped them.
+    Code objects are only needed until their modules are executed, so only the most
+    recently compiled ones are kept (marshalled), up to `max_bytes` too.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._sources = weakref.WeakValueDictionary()
+        # Recently used sources (digests mapped to the sources and their sizes),
+        # least recent first
+        self._recent = OrderedDict()
+        self._recent_bytes = 0
+        # Recently compiled code (digests mapped to marshalled code objects),
+        # least recent first
+        self._codes = OrderedDict()
+        self._codes_bytes = 0
+        self._lock = _new_lock(self)
+
+    def intern(self, content):
+        """ Returns the `_SharedSource` of `content` """
+        import hashlib
+
+        sha256 = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            source = self._sources.get(sha256)
+            if source is None:
+                source = self._sources[sha256] = _SharedSource(sha256, content)
+            self._touch(source)
+        return source
+
+    def _touch(self, source):
+        self._recent_bytes -= self._recent.pop(source.sha256, (None, 0))[1]
+        size = source.size
+        self._recent[source.sha256] = (source, size)
+        self._recent_bytes += size
+        while self._recent_bytes > self.max_bytes and len(self._recent) > 1:
+            self._recent_bytes -= self._recent.popitem(last=False)[1][1]
+
+    def compile(self, content, filename):
+        """ Returns the code object of a module source, compiled once per distinct
+        source and labeled with `filename` """
+        import marshal
+
+        source = self.intern(content)
+        with self._lock:
+            code = self._codes.get(source.sha256)
+            if code is not None:
+                self._codes.move_to_end(source.sha256)
+        # 'CodeType.replace' is available since Python 3.8
+        if code is not None and hasattr(types.CodeType, 'replace'):
+            logger.debug("[+] Reusing the code of identical source for '%s'" % filename)
+            return _relabel_code(marshal.loads(code), filename)
+        code = compile(content, filename, 'exec', dont_inherit=True)
+        marshalled = marshal.dumps(code)
+        with self._lock:
+            self._codes_bytes -= len(self._codes.pop(source.sha256, b''))
+            self._codes[source.sha256] = marshalled
+            self._codes_bytes += len(marshalled)
+            while self._codes_bytes > self.max_bytes and len(self._codes) > 1:
+                self._codes_bytes -= len(self._codes.popitem(last=False)[1])
+        return code
+
+    def __len__(self):
+        return len(self._sources)
+
+    def clear(self):
+        """ Drops the sources kept for importers that have dropped them, and the code """
+        with self._lock:
+            self._recent.clear()
+            self._recent_bytes = 0
+            self._codes.clear()
+            self._codes_bytes = 0
+
+
+_SOURCE_STORE = _SourceStore()
 
 # ====================== Helpers ======================
 
@@ -142,10 +1608,16 @@ def _isHTTPS(url):
 
 
 def _get_options(url):
-    if url in CONFIG.sections():
-        return dict(CONFIG.items(url))
+    config = _config()
+    if url in config.sections():
+        return dict(config.items(url))
     else:
-        return dict(CONFIG.items('DEFAULT'))
+        return dict(config.items('DEFAULT'))
+
+
+def _parse_seconds(value):
+    """ Parses a profile option holding seconds. Empty values are parsed as `None` """
+    return float(value) if value.strip() else None
 
 
 def _create_paths(module_name, suffixes=['py']):
@@ -168,16 +1640,58 @@ def _create_paths(module_name, suffixes=['py']):
     return ret
 
 
+def _extension_paths(module_name):
+    """ Returns the paths where a native extension module could be located,
+    if extension modules can be loaded from memory (see `_load_extension`) """
+    if not hasattr(os, 'memfd_create') or not os.path.isdir('/proc/self/fd'):
+        return []
+    module_name = module_name.replace(".", "/")
+    return [module_name + suffix for suffix in importlib.machinery.EXTENSION_SUFFIXES]
+
+
+# The anonymous files of the extension modules loaded. They stay open, as the dynamic
+# loader identifies libraries by path and '/proc/self/fd/N' must not be reused
+_EXTENSION_FDS = []
+
+
+def _load_extension(fullname, content):
+    """ Creates a native extension module from memory, without touching the filesystem.
+    The shared object is written to an anonymous file (`os.memfd_create`, Linux only)
+    that `ExtensionFileLoader` loads through its '/proc/self/fd/N' path.
+
+    Args:
+        fullname (str): The name of the module
+        content (bytes): The shared object (e.g. a '.so' file)
+
+    Returns:
+        tuple: The module (not executed yet) and its `ExtensionFileLoader`
+    """
+    fd = os.memfd_create(fullname, getattr(os, 'MFD_CLOEXEC', 0))
+    _EXTENSION_FDS.append(fd)
+    view = memoryview(content)
+    while view:
+        view = view[os.write(fd, view):]
+    loader = importlib.machinery.ExtensionFileLoader(fullname, '/proc/self/fd/%d' % fd)
+    spec = importlib.machinery.ModuleSpec(fullname, loader, origin=loader.path)
+    logger.debug("[*] Loading extension module '%s' from '%s'" % (fullname, loader.path))
+    return loader.create_module(spec), loader
+
+
 def _retrieve_archive(content, url):
     """ Returns an ZipFile or tarfile Archive object if available
 
     Args:
-        content (bytes): Bytes (typically HTTP Response body) to be parsed as archive
+        content (bytes): Bytes (typically HTTP Response body) to be parsed as archive,
+            or an `mmap.mmap` holding them
 
     Returns:
         object: zipfile.ZipFile, tarfile.TarFile or None (if `contents` could not be parsed)
     """
-    content_io = io.BytesIO(content)
+    import mmap
+    import tarfile
+    import zipfile
+
+    content_io = content if isinstance(content, mmap.mmap) else io.BytesIO(content)
     try:
         tar = tarfile.open(fileobj=content_io, mode='r:*')
         logger.info("[+] URL: '%s' is a Tarball" % url)
@@ -198,6 +1712,164 @@ def _retrieve_archive(content, url):
     return None
 
 
+def _strip_archive_prefix(archive_obj):
+    """ Moves the files of an archive out of its single top-level directory (like the
+    '<repo>-<commit>/' directory of the archives of git services), in place
+
+    Args:
+        archive_obj (object): zipfile.ZipFile or tarfile.TarFile
+
+    Returns:
+        str: The directory stripped, or '' if the archive has no single top-level directory
+    """
+    import tarfile
+
+    names = _archive_namelist(archive_obj)
+    roots = {name.split('/', 1)[0] for name in names}
+    if len(roots) != 1 or not all('/' in name for name in names):
+        return ''
+    prefix = roots.pop() + '/'
+    if isinstance(archive_obj, tarfile.TarFile):
+        members = [member for member in archive_obj.getmembers()
+                   if member.name.startswith(prefix)]
+        for member in members:
+            member.name = member.name[len(prefix):]
+            if member.islnk() and member.linkname.startswith(prefix):
+                member.linkname = member.linkname[len(prefix):]
+        archive_obj.members = members
+    else:
+        # 'ZipFile.open' checks the local headers against 'orig_filename', left untouched
+        infos = [info for info in archive_obj.filelist
+                 if info.filename.startswith(prefix) and info.filename != prefix]
+        for info in infos:
+            info.filename = info.filename[len(prefix):]
+        archive_obj.filelist = infos
+        archive_obj.NameToInfo = {info.filename: info for info in infos}
+    logger.info("[*] Stripped the top-level directory '%s' of the archive" % prefix)
+    return prefix
+
+
+def _parse_autoindex(content, url):
+    """ Returns the names listed by an autoindex page (like the directory listings of
+    Apache, nginx and `http.server`) of the directory at `url`
+
+    Args:
+        content (bytes): The page
+        url (str): The URL of the directory, ending with '/'
+
+    Returns:
+        frozenset: The names, ending with '/' for subdirectories, or `None` if `content`
+            is not an autoindex page
+    """
+    from html.parser import HTMLParser
+    from urllib.parse import unquote, urljoin, urlsplit
+
+    text = content.decode('utf8', 'replace')
+    if not re.search(r'<title>\s*(Index of|Directory listing for)\b', text, re.IGNORECASE):
+        return None
+    hrefs = []
+
+    class _Links(HTMLParser):
+
+        def handle_starttag(self, tag, attrs):
+            href = dict(attrs).get('href') if tag == 'a' else None
+            if href:
+                hrefs.append(href)
+
+    _Links().feed(text)
+    base = urlsplit(url)
+    names = set()
+    for href in hrefs:
+        link = urlsplit(href)
+        if link.netloc and link.netloc != base.netloc:
+            continue
+        # Joined on the path, as 'urljoin' ignores schemes like 'http+unix'
+        path = urlsplit(urljoin('http://host' + base.path, link.path)).path
+        if not path.startswith(base.path):
+            # e.g. 'Parent Directory'
+            continue
+        name = unquote(path[len(base.path):])
+        if name and '/' not in name.rstrip('/'):
+            names.add(name)
+    return frozenset(names)
+
+
+# The body of the WebDAV 'PROPFIND' requests listing directories
+_PROPFIND_BODY = (b'<?xml version="1.0" encoding="utf-8"?>'
+                  b'<propfind xmlns="DAV:"><prop><resourcetype/></prop></propfind>')
+
+
+def _parse_propfind(content, url, recursive=False):
+    """ Returns the directory listings found in the response of a WebDAV 'PROPFIND'
+    request (a 'multistatus' document) for the directory at `url`
+
+    Args:
+        content (bytes): The response
+        url (str): The URL of the directory, ending with '/'
+        recursive (bool): Whether the request had 'Depth: infinity', listing all
+            subdirectories too. Otherwise only the directory itself is listed
+
+    Returns:
+        dict: The paths of the directories relative to `url` ('' for `url` itself, ending
+            with '/' otherwise) mapped to the names they contain (a `frozenset`, with
+            subdirectories ending with '/'), or `None` if `content` cannot be parsed
+    """
+    import xml.etree.ElementTree as ElementTree
+    from urllib.parse import unquote, urlsplit
+
+    try:
+        root = ElementTree.fromstring(content)
+    except ElementTree.ParseError:
+        return None
+    base = unquote(urlsplit(url).path)
+    listings = {'': set()}
+    for response in root.iter('{DAV:}response'):
+        path = unquote(urlsplit(response.findtext('{DAV:}href', '').strip()).path)
+        if not path.startswith(base) or not path[len(base):].strip('/'):
+            continue
+        path = path[len(base):].strip('/')
+        collection = response.find('.//{DAV:}resourcetype/{DAV:}collection') is not None
+        parent, _, name = path.rpartition('/')
+        parent = parent + '/' if parent else ''
+        if collection:
+            name += '/'
+            if recursive:
+                listings.setdefault(path + '/', set())
+        if recursive or not parent:
+            listings.setdefault(parent, set()).add(name)
+    return {directory: frozenset(names) for directory, names in listings.items()}
+
+
+def _readonly_mapping(content):
+    """ Returns a read-only memory map holding `content`. Its pages are shared
+    by forked children, unlike objects on the Python heap that get copied
+    as soon as their reference counts change.
+
+    Args:
+        content (bytes): The bytes to be mapped
+
+    Returns:
+        mmap.mmap: The memory map, backed by an anonymous file
+    """
+    import mmap
+    import tempfile
+
+    class _Mapping(mmap.mmap):
+        # 'zipfile' needs file objects to be 'seekable()' (added to 'mmap' in Python 3.13)
+        def seekable(self):
+            return True
+
+    if hasattr(os, 'memfd_create'):
+        fd = os.memfd_create('httpimport', getattr(os, 'MFD_CLOEXEC', 0))
+        file_ = os.fdopen(fd, 'w+b')
+    else:
+        file_ = tempfile.TemporaryFile()
+    with file_:
+        file_.write(content)
+        file_.flush()
+        return _Mapping(file_.fileno(), len(content), access=mmap.ACCESS_READ)
+
+
 def _open_archive_file(archive_obj, filepath, zip_pwd=None):
     """ Opens a file located under `filepath` from an archive
 
@@ -209,6 +1881,9 @@ def _open_archive_file(archive_obj, filepath, zip_pwd=None):
     Returns:
         bytes: The content of the extracted file
     """
+    import tarfile
+    import zipfile
+
     logger.info(
         "[*] Attempting extraction of '%s' from archive..." % (filepath))
     if isinstance(archive_obj, tarfile.TarFile):
@@ -219,7 +1894,45 @@ def _open_archive_file(archive_obj, filepath, zip_pwd=None):
     raise ValueError("Object is not a ZIP or TAR archive")
 
 
+def _encrypted_zip_members(archive_obj):
+    """ Returns the paths of the encrypted files of a ZipFile archive, smallest first
+    (none for other archives) """
+    import zipfile
+
+    if not isinstance(archive_obj, zipfile.ZipFile):
+        return []
+    return [info.filename for info in sorted(archive_obj.infolist(), key=lambda i: i.file_size)
+            if info.flag_bits & 0x1 and not info.is_dir()]
+
+
+def _archive_namelist(archive_obj):
+    """ Returns the paths of all files found in a ZipFile or TarFile archive """
+    import tarfile
+    import zipfile
+
+    if isinstance(archive_obj, tarfile.TarFile):
+        return [member.name for member in archive_obj.getmembers() if member.isfile()]
+    if isinstance(archive_obj, zipfile.ZipFile):
+        return [name for name in archive_obj.namelist() if not name.endswith('/')]
+
+    raise ValueError("Object is not a ZIP or TAR archive")
+
+
+def _archive_top_level_modules(archive_obj):
+    """ Returns the names of the modules and packages found at the root of an archive """
+    modules = set()
+    for name in _archive_namelist(archive_obj):
+        parts = name.split('/')
+        if len(parts) == 1 and parts[0].endswith('.py'):
+            modules.add(parts[0][:-len('.py')])
+        elif len(parts) == 2 and parts[1] == '__init__.py':
+            modules.add(parts[0])
+    return modules
+
+
 def _retrieve_compiled(content):  # <== Not Used Yet
+    import marshal
+
     try:
         # Strip the .pyc file header of Python up to 3.3
         return marshal.loads(content[8:])
@@ -235,33 +1948,60 @@ def _retrieve_compiled(content):  # <== Not Used Yet
     raise ValueError("[!] Not possible to unmarshal '.pyc' file")
 
 
-def _create_pypi_url(
+def _create_pypi_url(module_name, *args, **kw):
+    """ Returns the URL of a PyPI distribution of a module.
+Accepts the arguments of `_find_pypi_release`.
+    """
+    return _find_pypi_release(module_name, *args, **kw)['url']
+
+
+def _find_pypi_release(
         module_name,
         version=None,
         allowed_dists=[
             'bdist_wheel',
             'sdist'],
-        pypi_url="https://pypi.org/pypi/%s/json"):
-    """ Returns the URL of a PyPI distribution of a module.
+        pypi_url="https://pypi.org/pypi/%s/json",
+        mirrors=None,
+        http_options={},
+        cache_ttl=0,
+        cache_dir=None,
+        stale_while_revalidate=0):
+    """ Returns the PyPI API description of a distribution of a module (a dict
+containing 'url', 'packagetype', 'digests', etc).
 The Download URL is acquired by directly querying the PyPI API:
 https://warehouse.pypa.io/api-reference/json.html
+If the version is pinned, the (much smaller) version-specific endpoint is queried.
+If `mirrors` (a `_MirrorSet` of PyPI API URL templates) is set, it is used instead of `pypi_url`.
+The `http_options` are passed to `http()`.
+The API responses are cached for `cache_ttl` seconds (in `cache_dir` too, if set)
+and revalidated through their ETag afterwards (in the background, for `stale_while_revalidate`
+more seconds).
     """
-    url = pypi_url % module_name
+    import json
+
+    path = module_name if version is None else "%s/%s" % (module_name, version)
+    url = pypi_url % path
     logger.debug("[+] Querying PyPI URL '%s'" % url)
+    if mirrors is None:
+        mirrors = _MirrorSet([pypi_url])
+    raw_response = _hedged_http(
+        mirrors, lambda template: template % path,
+        request=_cached_http, ttl=cache_ttl, cache_dir=cache_dir,
+        stale_while_revalidate=stale_while_revalidate, **http_options)
+    if version is not None and raw_response['code'] == 404:
+        raise KeyError(
+            "Version '%s' not available for module %s" %
+            (version, module_name))
     try:
-        raw_response = http(url)
         pypi_response = json.loads(raw_response['body'])
     except json.decoder.JSONDecodeError:
         raise ModuleNotFoundError(
             "PyPI API did not respond with JSON for '%s'. HTTP Status Code: %d" %
             (module_name, raw_response['code']))
-    if version is None:
-        version = pypi_response['info']['version']
-    if version not in pypi_response['releases']:
-        raise KeyError(
-            "Version '%s' not available for module %s" %
-            version, module_name)
-    release = pypi_response['releases'][version]
+    # Both endpoints list the files of the requested (or latest) version under 'urls'
+    version = pypi_response['info']['version']
+    release = pypi_response['urls']
     logger.info(
         "[+] Version '%s' found for module '%s'" %
         (version, module_name))
@@ -269,18 +2009,558 @@ https://warehouse.pypa.io/api-reference/json.html
         if 'url' not in package:
             logger.info(
                 "[-] Version '%s' is an empty release for module '%s'" %
-                version, module_name)
+                (version, module_name))
             continue
         if package['packagetype'] in allowed_dists:
             logger.info(
                 "[+] Version '%s' release available in %s" %
                 (version, allowed_dists))
-            return package['url']
+            return package
     raise KeyError(
         "No allowed release type found for %s==%s. Allowed release types: %s" %
         (module_name, version, allowed_dists))
 
-# ====================== Importer Classes ======================
+
+# ====================== PyPI Metadata ======================
+
+# The Media Type of the JSON Simple API (PEP 691)
+_PYPI_SIMPLE_JSON = 'application/vnd.pypi.simple.v1+json'
+
+_SDIST_EXTENSIONS = ('.tar.gz', '.zip', '.tar.bz2', '.tgz')
+
+
+def _normalize_project(name):
+    """ Returns the normalized (PEP 503) name of a PyPI project """
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def _release_numbers(version):
+    """ Returns the release segment of a (PEP 440) version string as a tuple of ints """
+    match = re.match(r'^v?(\d+(?:\.\d+)*)', version.strip())
+    if not match:
+        return ()
+    return tuple(int(n) for n in match.group(1).split('.'))
+
+
+# A (PEP 440) version string
+_VERSION_PATTERN = re.compile(
+    r'^\s*v?(?:(?P<epoch>\d+)!)?(?P<release>\d+(?:\.\d+)*)'
+    r'(?:[-_.]?(?P<pre_l>alpha|a|beta|b|preview|pre|c|rc)[-_.]?(?P<pre_n>\d+)?)?'
+    r'(?:-(?P<post_n1>\d+)|[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>\d+)?)?'
+    r'(?:[-_.]?(?P<dev_l>dev)[-_.]?(?P<dev_n>\d+)?)?'
+    r'(?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?\s*$', re.IGNORECASE)
+
+# The pre-release phases, in order
+_PRE_RELEASES = {'a': 0, 'alpha': 0, 'b': 1, 'beta': 1,
+                 'c': 2, 'rc': 2, 'pre': 2, 'preview': 2}
+
+
+def _version_key(version):
+    """ Returns a sortable key for a (PEP 440) version string, ordered like
+    `packaging.version`: developmental releases sort before pre-releases, which
+    sort before their release, then post-releases, then local versions.
+    Invalid versions sort before all valid ones """
+    match = _VERSION_PATTERN.match(version)
+    if not match:
+        return (-1, _release_numbers(version), (), (), 0, ())
+    numbers = tuple(int(n) for n in match.group('release').split('.'))
+    # '1.0' and '1.0.0' are the same version
+    while numbers and numbers[-1] == 0:
+        numbers = numbers[:-1]
+    if match.group('pre_l'):
+        pre = (0, _PRE_RELEASES[match.group('pre_l').lower()], int(match.group('pre_n') or 0))
+    elif match.group('dev_l') and not (match.group('post_n1') or match.group('post_l')):
+        # '1.0.dev0' comes before '1.0a1'
+        pre = (-1,)
+    else:
+        pre = (1,)
+    if match.group('post_n1') or match.group('post_l'):
+        post = (int(match.group('post_n1') or match.group('post_n2') or 0),)
+    else:
+        post = ()
+    dev = int(match.group('dev_n') or 0) if match.group('dev_l') else float('inf')
+    # Numeric parts of local versions sort after alphanumeric ones
+    local = tuple((1, int(part), '') if part.isdigit() else (0, 0, part.lower())
+                  for part in re.split(r'[-_.]', match.group('local') or '') if part)
+    return (int(match.group('epoch') or 0), numbers, pre, post, dev, local)
+
+
+def _has_prefix(version, prefix):
+    """ Returns whether the release segment of `version` starts with the `prefix` numbers """
+    numbers = _release_numbers(version)
+    numbers += (0,) * (len(prefix) - len(numbers))
+    return numbers[:len(prefix)] == prefix
+
+
+def _is_prerelease(version):
+    """ Returns whether `version` is a pre-release or a developmental release """
+    match = _VERSION_PATTERN.match(version)
+    return match is not None and bool(match.group('pre_l') or match.group('dev_l'))
+
+
+def _specifier_matches(version, specifier):
+    """ Returns whether `version` satisfies a (PEP 440) specifier string, like '>=1.0,<2' """
+    for clause in specifier.strip().strip('()').split(','):
+        match = re.match(r'^\s*(~=|===|==|!=|<=|>=|<|>)\s*(\S+)\s*$', clause)
+        if not match:
+            continue
+        operator, target = match.groups()
+        if target.endswith('.*'):
+            matches = _has_prefix(version, _release_numbers(target[:-2]))
+            if operator == '==' and not matches or operator == '!=' and matches:
+                return False
+            continue
+        key, target_key = _version_key(version), _version_key(target)
+        if operator == '~=':
+            prefix = _release_numbers(target)[:-1]
+            if key < target_key or not _has_prefix(version, prefix):
+                return False
+        elif operator in ('==', '==='):
+            if key != target_key:
+                return False
+        elif operator == '!=':
+            if key == target_key:
+                return False
+        elif operator == '<=':
+            if key > target_key:
+                return False
+        elif operator == '>=':
+            if key < target_key:
+                return False
+        elif operator == '<':
+            if key >= target_key:
+                return False
+        elif operator == '>':
+            if key <= target_key:
+                return False
+    return True
+
+
+# The tokens of environment markers (PEP 508)
+_MARKER_TOKEN = re.compile(
+    r'\s*(?:(?P<paren>[()])|(?P<string>"[^"]*"|\'[^\']*\')|'
+    r'(?P<op>===|==|!=|<=|>=|~=|<|>|not\s+in\b|in\b)|'
+    r'(?P<bool>and\b|or\b)|(?P<name>[A-Za-z_][\w.]*))')
+
+# Marker variables compared as versions
+_MARKER_VERSIONS = ('python_version', 'python_full_version', 'implementation_version')
+
+
+def _marker_environment():
+    """ Returns the values of the environment marker variables (PEP 508) of the
+    running interpreter. 'extra' is empty, as extras are never requested """
+    import platform
+
+    return {
+        'python_version': '%d.%d' % sys.version_info[:2],
+        'python_full_version': platform.python_version(),
+        'sys_platform': sys.platform,
+        'os_name': os.name,
+        'platform_system': platform.system(),
+        'platform_machine': platform.machine(),
+        'platform_release': platform.release(),
+        'platform_version': platform.version(),
+        'platform_python_implementation': platform.python_implementation(),
+        'implementation_name': sys.implementation.name,
+        'implementation_version': '%d.%d.%d' % sys.implementation.version[:3],
+        'extra': '',
+    }
+
+
+def _evaluate_marker(marker, environment):
+    """ Evaluates an environment marker (PEP 508) with the variables of `environment`
+
+    Raises:
+        ValueError: If the marker cannot be parsed or uses unknown variables
+    """
+    tokens, position = [], 0
+    marker = marker.strip()
+    while position < len(marker):
+        match = _MARKER_TOKEN.match(marker, position)
+        if not match or match.end() == position:
+            raise ValueError("Unexpected '%s'" % marker[position:])
+        tokens.append((match.lastgroup, ' '.join(match.group(match.lastgroup).split())))
+        position = match.end()
+
+    def _value(index):
+        kind, token = tokens[index] if index < len(tokens) else (None, None)
+        if kind == 'string':
+            return token[1:-1], None
+        if kind == 'name':
+            if token not in environment:
+                raise ValueError("Unknown marker variable '%s'" % token)
+            return environment[token], token
+        raise ValueError("Expected a value, found '%s'" % token)
+
+    def _comparison(index):
+        (left, left_name), (right, right_name) = _value(index), _value(index + 2)
+        kind, operator = tokens[index + 1] if index + 1 < len(tokens) else (None, None)
+        if kind != 'op':
+            raise ValueError("Expected an operator, found '%s'" % operator)
+        if operator == 'in':
+            return left in right
+        if operator == 'not in':
+            return left not in right
+        if left_name in _MARKER_VERSIONS and right_name is None:
+            return _specifier_matches(left, operator + right)
+        if right_name in _MARKER_VERSIONS and left_name is None and operator != '~=':
+            flipped = {'<': '>', '>': '<', '<=': '>=', '>=': '<='}.get(operator, operator)
+            return _specifier_matches(right, flipped + left)
+        if operator in ('==', '==='):
+            return left == right
+        if operator == '!=':
+            return left != right
+        raise ValueError("'%s' cannot compare '%s' and '%s'" % (operator, left, right))
+
+    def _atom(index):
+        if index < len(tokens) and tokens[index] == ('paren', '('):
+            result, index = _or(index + 1)
+            if index >= len(tokens) or tokens[index] != ('paren', ')'):
+                raise ValueError("Unbalanced parentheses")
+            return result, index + 1
+        return _comparison(index), index + 3
+
+    def _and(index):
+        result, index = _atom(index)
+        while index < len(tokens) and tokens[index] == ('bool', 'and'):
+            other, index = _atom(index + 1)
+            result = result and other
+        return result, index
+
+    def _or(index):
+        result, index = _and(index)
+        while index < len(tokens) and tokens[index] == ('bool', 'or'):
+            other, index = _and(index + 1)
+            result = result or other
+        return result, index
+
+    result, index = _or(0)
+    if index != len(tokens):
+        raise ValueError("Unexpected '%s'" % tokens[index][1])
+    return result
+
+
+def _marker_matches(marker):
+    """ Evaluates an environment marker (PEP 508) against the running interpreter, with
+    `packaging` if it is installed. Markers requiring extras never match, nor do markers
+    that cannot be evaluated """
+    if not marker or not marker.strip():
+        return True
+    try:
+        from packaging.markers import Marker
+    except ImportError:
+        Marker = None
+    try:
+        if Marker is not None:
+            return Marker(marker).evaluate({'extra': ''})
+        return _evaluate_marker(marker, _marker_environment())
+    except Exception as e:
+        logger.info("[-] Cannot evaluate marker '%s' (%s). Skipping requirement..." %
+                    (marker, e))
+        return False
+
+
+def _parse_requirement(line):
+    """ Parses a (PEP 508) requirement, like 'requests[socks] (>=2.0) ; python_version<"4"'
+
+    Returns:
+        tuple: (name, specifier, marker) or `None` if the line cannot be parsed
+    """
+    match = re.match(
+        r'^\s*([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*\(?([^;()]*)\)?\s*(?:;(.*))?$',
+        line)
+    if not match:
+        return None
+    return match.group(1), match.group(2).strip(), (match.group(3) or '').strip()
+
+
+def _wheel_is_compatible(filename):
+    """ Returns whether a wheel file can be imported by the running interpreter.
+    Only pure Python wheels ('none' ABI, 'any' platform) are compatible """
+    parts = filename[:-len('.whl')].split('-')
+    if len(parts) < 5:
+        return False
+    python_tags, abi_tags, platform_tags = (tag.split('.') for tag in parts[-3:])
+    major, minor = sys.version_info[:2]
+    implementation = {'cpython': 'cp', 'pypy': 'pp'}.get(sys.implementation.name, 'py')
+    supported = {'py%d' % major, '%s%d%d' % (implementation, major, minor)}
+    supported.update('py%d%d' % (major, m) for m in range(minor + 1))
+    return bool(supported.intersection(python_tags)) \
+        and 'none' in abi_tags and 'any' in platform_tags
+
+
+def _distribution_version(filename):
+    """ Returns the version of a wheel or sdist, parsed from its filename """
+    if filename.endswith('.whl'):
+        return filename.split('-')[1]
+    for extension in _SDIST_EXTENSIONS:
+        if filename.endswith(extension):
+            return filename[:-len(extension)].rsplit('-', 1)[-1]
+    return None
+
+
+def _pypi_simple_files(project, simple_url, http_options={}, cache_ttl=0, cache_dir=None,
+                       stale_while_revalidate=0):
+    """ Returns the files of a PyPI project, listed by the JSON Simple API (PEP 691).
+    The version of each file is added under the 'version' key. """
+    import json
+
+    url = simple_url % _normalize_project(project)
+    logger.debug("[+] Querying PyPI Simple API URL '%s'" % url)
+    resp = _cached_http(url, ttl=cache_ttl, cache_dir=cache_dir,
+                        headers={'Accept': _PYPI_SIMPLE_JSON},
+                        stale_while_revalidate=stale_while_revalidate, **http_options)
+    if resp['code'] == 404:
+        raise ModuleNotFoundError("PyPI project '%s' not found" % project)
+    try:
+        files = json.loads(resp['body'])['files']
+    except (ValueError, KeyError):
+        raise ModuleNotFoundError(
+            "PyPI Simple API did not respond with JSON for '%s'. HTTP Status Code: %d" %
+            (project, resp['code']))
+    for file_ in files:
+        file_['version'] = _distribution_version(file_['filename'])
+    return files
+
+
+def _select_distribution(files, specifier='', allowed_dists=['bdist_wheel', 'sdist']):
+    """ Returns the file of the latest version satisfying `specifier` that can be
+    imported by the running interpreter (compatible wheels preferred over sdists).
+    Pre-releases are only selected if pinned.
+    """
+    python_version = '%d.%d.%d' % sys.version_info[:3]
+    pinned = re.match(r'^\s*===?\s*(\S+)\s*$', specifier or '')
+    candidates = []
+    for file_ in files:
+        version, filename = file_['version'], file_['filename']
+        if version is None or file_.get('yanked'):
+            continue
+        if filename.endswith('.whl'):
+            if 'bdist_wheel' not in allowed_dists or not _wheel_is_compatible(filename):
+                continue
+        elif 'sdist' not in allowed_dists:
+            continue
+        if _is_prerelease(version) and not pinned:
+            continue
+        if not _specifier_matches(python_version, file_.get('requires-python') or ''):
+            continue
+        if not _specifier_matches(version, specifier or ''):
+            continue
+        candidates.append(file_)
+    if not candidates:
+        return None
+    return max(candidates, key=lambda file_: (
+        _version_key(file_['version']), file_['filename'].endswith('.whl')))
+
+
+def _fetch_core_metadata(file_, http_options={}, cache_dir=None):
+    """ Returns the core metadata (PEP 658) of a distribution file, as served by the
+    index next to the file ('<url>.metadata'), without downloading the distribution.
+    If the index does not serve it, it is read from the distribution itself.
+
+    Returns:
+        email.message.Message: The parsed metadata ('Requires-Dist', 'Requires-Python', etc)
+    """
+    import zipfile
+
+    from email.parser import HeaderParser
+
+    metadata_hashes = file_.get('core-metadata', file_.get('dist-info-metadata'))
+    if metadata_hashes:
+        sha256 = metadata_hashes.get('sha256') \
+            if isinstance(metadata_hashes, dict) else None
+        resp = http(file_['url'] + '.metadata', sha256=sha256, **http_options)
+        if resp['code'] == 200:
+            return HeaderParser().parsestr(resp['body'].decode('utf8', 'replace'))
+    if not file_['filename'].endswith('.whl'):
+        logger.warning(
+            "[-] No metadata available for '%s'. Dependencies cannot be discovered" %
+            file_['filename'])
+        return None
+
+    logger.info(
+        "[*] Index does not serve metadata for '%s'. Downloading the wheel..." %
+        file_['filename'])
+    sha256 = file_.get('hashes', {}).get('sha256')
+    content = _CONTENT_STORE.get(sha256, cache_dir) if sha256 else None
+    if content is None:
+        resp = http(file_['url'], sha256=sha256, **http_options)
+        if resp['code'] != 200:
+            logger.warning(
+                "[-] URL '%s' returned HTTP Status Code '%d'. Dependencies cannot be discovered" %
+                (file_['url'], resp['code']))
+            return None
+        content = resp['body']
+        if sha256:
+            _CONTENT_STORE.put(sha256, content, cache_dir)
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(content))
+    except zipfile.BadZipFile:
+        logger.warning(
+            "[-] '%s' is not a valid wheel. Dependencies cannot be discovered" %
+            file_['filename'])
+        return None
+    for name in archive.namelist():
+        if re.match(r'^[^/]+\.dist-info/METADATA$', name):
+            return HeaderParser().parsestr(
+                archive.read(name).decode('utf8', 'replace'))
+    return None
+
+
+# ====================== Importer Classes ======================
+
+
+class _ModuleRecord(object):
+    """ What an HttpImporter keeps for a module it has found. After the module is executed
+    its source is compressed or dropped, as it is only needed again for `linecache`
+    (tracebacks, debuggers) and `importlib.reload`.
+
+    Args:
+        filepath (str): The URL of the module file
+        path (str): The path of the module file relative to the Importer's URL
+        content (bytes): The source of the module
+    """
+
+    __slots__ = ('filepath', 'path', 'package', 'module', 'size', 'code', 'pinned',
+                 'native', 'sha256', 'validators', '_source')
+
+    def __init__(self, filepath, path, content):
+        self.filepath = filepath
+        self.path = path
+        self.package = path.endswith('__init__.py')
+        self.module = None
+        # The compiled code of the module, if available before it is executed
+        self.code = None
+        # Kept as is, and never evicted (see 'HttpImporter.warm')
+        self.pinned = False
+        # The 'ExtensionFileLoader' of a native extension module, once created
+        self.native = None
+        self.size = len(content)
+        # Shared with the records of identical files (see '_SourceStore')
+        self._source = _SOURCE_STORE.intern(content)
+        self.sha256 = self._source.sha256
+        # The headers revalidating the file (see 'HttpImporter.check_changes')
+        self.validators = {}
+
+    @property
+    def content(self):
+        """ The source of the module, or `None` if it has been dropped """
+        source = self._source
+        return source.content if source is not None else None
+
+    def compress(self):
+        source = self._source
+        if source is not None:
+            source.compress()
+
+    def drop(self):
+        self._source = None
+
+    @property
+    def extension(self):
+        """ Whether the module is a native extension module (e.g. a '.so' file) """
+        return not self.path.endswith('.py')
+
+    def __getitem__(self, key):
+        # Backwards compatible access, from when records were dicts
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+
+class _RemoteResource(object):
+    """ A file or directory under the URL of an HttpImporter. Implements the
+    `importlib.resources.abc.Traversable` interface, returned by `files()`.
+
+    Args:
+        importer (HttpImporter): The Importer serving the resource
+        path (str): The path of the resource relative to the Importer's URL
+    """
+
+    def __init__(self, importer, path):
+        self._importer = importer
+        self._path = path.strip('/')
+
+    @property
+    def name(self):
+        return self._path.rsplit('/', 1)[-1]
+
+    def joinpath(self, *descendants):
+        parts = [self._path] if self._path else []
+        for descendant in descendants:
+            parts.extend(part for part in str(descendant).split('/') if part not in ('', '.'))
+        return _RemoteResource(self._importer, '/'.join(parts))
+
+    def __truediv__(self, child):
+        return self.joinpath(child)
+
+    def iterdir(self):
+        prefix = self._path + '/' if self._path else ''
+        children = {path[len(prefix):].split('/')[0]
+                    for path in self._importer._resource_names(self._path)
+                    if path.startswith(prefix) and path != prefix}
+        return iter([self.joinpath(name) for name in sorted(children)])
+
+    def is_dir(self):
+        prefix = self._path + '/' if self._path else ''
+        return any(path.startswith(prefix)
+                   for path in self._importer._resource_names(self._path))
+
+    def is_file(self):
+        try:
+            self._importer._open_resource(self._path).close()
+        except OSError:
+            return False
+        return True
+
+    def open(self, mode='r', *args, **kw):
+        stream = self._importer._open_resource(self._path)
+        if 'b' in mode:
+            return stream
+        return io.TextIOWrapper(stream, *args, **kw)
+
+    def read_bytes(self):
+        with self.open('rb') as f:
+            return f.read()
+
+    def read_text(self, encoding=None, errors=None):
+        with self.open('r', encoding=encoding, errors=errors) as f:
+            return f.read()
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, self._importer.url + '/' + self._path)
+
+
+class _RemoteResourceReader(object):
+    """ The resource reader of a package found by an HttpImporter. Implements the
+    `importlib.resources.abc.TraversableResources` interface (and the older
+    `ResourceReader` one) on top of `files()`.
+
+    Args:
+        importer (HttpImporter): The Importer that found the package
+        path (str): The directory of the package relative to the Importer's URL
+    """
+
+    def __init__(self, importer, path):
+        self._importer = importer
+        self._path = path
+
+    def files(self):
+        return _RemoteResource(self._importer, self._path)
+
+    def open_resource(self, resource):
+        return self.files().joinpath(resource).open('rb')
+
+    def resource_path(self, resource):
+        # Remote resources are not files on the local filesystem
+        raise FileNotFoundError(resource)
+
+    def is_resource(self, path):
+        return self.files().joinpath(path).is_file()
+
+    def contents(self):
+        return (item.name for item in self.files().iterdir())
 
 
 class HttpImporter(object):
@@ -295,6 +2575,33 @@ class HttpImporter(object):
         headers (dict): The HTTP Headers to be used in all HTTP requests issued by this Importer.
             Can be used for authentication, logging, etc.
         proxy (str): The URL for the HTTP proxy to be used for all requests
+        mirrors (list): Base URLs serving the same content as `url`. Requests are sent
+            to the fastest healthy one and hedged to the next one if they are slow
+        hedge_percentile (float): The latency percentile after which a request is hedged
+        import_deadline (float): Seconds after which finding or loading a module fails
+        sha256 (str): The SHA256 digest of the content of `url` (e.g. an archive). Verified
+            content is kept in a content-addressed store and never downloaded again
+        cache_dir (str): The directory of the on-disk caches. `None` caches in memory only
+        module_cache_bytes (int): The maximum size of the sources kept for modules that
+            have been found but not loaded (yet). The least recently found are dropped first
+        manifest (bool): Use the manifest of a repository created by `publish()`, if found.
+            `None` fetches it only if the server advertises it (`MANIFEST_HEADER` or the
+            listing of `url`)
+        allow_compiled (bool): Load the precompiled '.pyc' files listed in the manifest
+        batch (bool): Fetch many modules in a single request, if the server has a batch endpoint
+        stale_while_revalidate (float): Seconds during which responses cached in `cache_dir`
+            are served immediately, while revalidated in the background
+        strip_prefix (bool): Import from the single top-level directory of the archive at `url`
+            (like the '<repo>-<commit>/' directory of the archives of git services)
+        immutable (bool): The content of `url` never changes (e.g. it is pinned to a commit).
+            Responses cached in `cache_dir` are served without any request
+        listing (bool): Use the listings of web directories (autoindex pages), if the server
+            lists them, to find modules without probing for them
+        webdav (bool): List web directories through WebDAV 'PROPFIND' requests instead
+        zip_decrypt_all (bool): Decrypt the '.py' files of an encrypted ZIP archive on a
+            background thread as soon as it is opened, instead of on first use. Decrypted
+            files are kept up to `module_cache_bytes`
+        **kw (dict): Timeout, retry, circuit breaker and transport parameters passed to `http()`
     """
 
     def __init__(
@@ -304,12 +2611,290 @@ class HttpImporter(object):
             headers={},
             proxy=None,
             allow_plaintext=False,
-            ca_verify=True, ca_file=None, **kw):
+            ca_verify=True, ca_file=None,
+            mirrors=[], hedge_percentile=95,
+            import_deadline=None, sha256=None, cache_dir=None,
+            module_cache_bytes=16 * 1024 * 1024,
+            manifest=None, allow_compiled=False, batch=True,
+            stale_while_revalidate=0, strip_prefix=False, immutable=False,
+            listing=True, webdav=False, zip_decrypt_all=False, **kw):
         # remove trailing '/' from URL parameter
         self.url = url if not url.endswith('/') else url[:-1]
+        # Module names mapped to '_ModuleRecord' objects
         self.modules = {}
+        # Modules found but not loaded, least recently found first
+        self._unloaded = OrderedDict()
+        self._unloaded_bytes = 0
+        # Guards 'modules' and '_unloaded'. Each module is found and created
+        # under its own lock, so concurrent imports fetch it only once
+        self._lock = _new_lock(self, reentrant=True)
+        self._module_locks = _KeyedLocks()
+        self.module_cache_bytes = module_cache_bytes
+        self.mirrors = _MirrorSet(
+            [self.url] + [m if not m.endswith('/') else m[:-1]
+                          for m in mirrors if m],
+            hedge_percentile=hedge_percentile)
+
+        for mirror_url in self.mirrors.urls:
+            self._check_url(mirror_url, allow_plaintext, ca_verify)
+
+        self.zip_pwd = zip_pwd
+        self.headers = headers
+        self.proxy = proxy
+        self.ca_verify = ca_verify
+        self.ca_file = ca_file
+        self.import_deadline = import_deadline
+        self.http_options = {k: kw[k] for k in _HTTP_OPTIONS if k in kw}
+        self.sha256 = sha256
+        self.cache_dir = cache_dir
+        self.stale_while_revalidate = stale_while_revalidate
+        self.strip_prefix = strip_prefix
+        self.immutable = immutable
+
+        self.allow_compiled = allow_compiled
+        resp_headers = {}
+        try:
+            if sha256 is not None:
+                content = self._fetch_verified('/' if url.endswith('/') else '', sha256)
+            else:
+                # Try a request that can fail in case of connectivity issues
+                resp = self._fetch('/' if url.endswith('/') else '')
+                content, resp_headers = resp['body'], resp['headers']
+        except OfflineError as e:
+            raise ImportError("[-] %s" % e)
+
+        # The headers revalidating the URL (see 'check_changes')
+        self._validators = _conditional_headers(resp_headers)
+        # Try to extract an archive from URL
+        self.archive = self._open_archive(content)
+        # The bytes of the archive, if any
+        self._archive_buffer = content if self.archive is not None else None
+        # The decrypted files of encrypted ZIP archives by path, least recently used
+        # first, up to 'module_cache_bytes' (see '_extract')
+        self._decrypted = OrderedDict()
+        self._decrypted_bytes = 0
+        self._encrypted = bool(_encrypted_zip_members(self.archive))
+        if self._encrypted:
+            self._verify_zip_password()
+            if zip_decrypt_all:
+                threading.Thread(target=self._decrypt_all,
+                                 name='httpimport-decrypt', daemon=True).start()
+
+        # Package names mapped to the archives of their bundles (see 'publish')
+        self._bundles = {}
+        # The paths of the resources fetched (see 'files()') mapped to their content,
+        # or `None` if not found
+        self._resources = {}
+        self.manifest = None
+        self._manifest_validators = {}
+        # The names listed by the page of a web directory, if it is an autoindex page
+        root_listing = _parse_autoindex(content, self.url + '/') \
+            if self.archive is None else None
+        if manifest is None and self.archive is None:
+            manifest = MANIFEST_HEADER.lower() in resp_headers or \
+                MANIFEST in (root_listing or ())
+        if manifest and self.archive is None:
+            self.manifest = self._fetch_manifest()
+
+        # Directory paths ('' for the URL, ending with '/' otherwise) mapped to the
+        # names listed in them, or `None` if they cannot be listed (see '_listed')
+        self._listings = {}
+        self.webdav = webdav
+        # Whether the server lists the directories
+        self.listing = False
+        if listing and self.archive is None and self.manifest is None and sha256 is None:
+            if webdav:
+                self._listings = self._propfind('', recursive=True) or \
+                    self._propfind('') or {}
+            else:
+                self._listings[''] = root_listing
+            self.listing = self._listings.get('') is not None
+            if self.listing:
+                logger.info("[+] Using the directory listings of '%s'" % self.url)
+
+        # The path of the batch endpoint of the server, if any (see 'serve')
+        self.batch = None
+        # Top-level packages already fetched through the batch endpoint
+        self._batched = set()
+        if batch and self.archive is None:
+            self.batch = (self.manifest or {}).get('batch') or \
+                resp_headers.get(BATCH_HEADER.lower())
+            if self.batch:
+                logger.info("[+] Using the batch endpoint '%s' of '%s'" % (self.batch, self.url))
+
+    def _propfind(self, directory, recursive=False):
+        """ Lists a directory under the Importer's URL through a WebDAV 'PROPFIND' request
+
+        Returns:
+            dict: The listings of the response (see `_parse_propfind`), with paths relative
+                to the Importer's URL, or `None` if the directory cannot be listed
+        """
+        depth = 'infinity' if recursive else '1'
+        try:
+            resp = self._request(directory, method='PROPFIND', data=_PROPFIND_BODY, headers={
+                'Depth': depth, 'Content-Type': 'application/xml; charset=utf-8'})
+        except URLError as e:
+            logger.info("[-] '%s' cannot be listed through WebDAV: %s" % (directory or '/', e))
+            return None
+        if resp['code'] != 207:
+            logger.debug("[-] 'PROPFIND' (Depth: %s) of '%s' returned HTTP Status Code '%d'" %
+                         (depth, directory or '/', resp['code']))
+            return None
+        listings = _parse_propfind(resp['body'], self.url + '/' + directory, recursive)
+        if listings is None:
+            return None
+        return {directory + path: names for path, names in listings.items()}
+
+    def _list(self, directory):
+        """ Returns the names listed in a directory under the Importer's URL ('' for the URL
+        itself, ending with '/' otherwise), fetching its listing on first use
+
+        Returns:
+            frozenset: The names, ending with '/' for subdirectories, or `None` if the
+                directory cannot be listed
+        """
+        with self._module_locks[('listing', directory)]:
+            if directory in self._listings:
+                return self._listings[directory]
+            logger.debug("[*] Listing '%s' of '%s'..." % (directory or '/', self.url))
+            names = None
+            if self.webdav:
+                listings = self._propfind(directory)
+                names = listings.get(directory) if listings else None
+            elif not self._offline():
+                try:
+                    resp = self._fetch(directory or '/')
+                except URLError as e:
+                    logger.info("[-] '%s' cannot be listed: %s" % (directory or '/', e))
+                    return None
+                if resp['code'] == 404:
+                    names = frozenset()
+                elif resp['code'] == 200:
+                    names = _parse_autoindex(resp['body'], self.url + '/' + directory)
+            self._listings[directory] = names
+            return names
+
+    def _listed(self, path):
+        """ Whether a file (or a directory, ending with '/') under the Importer's URL is
+        listed in its directory. `None` if that is not known (e.g. the server does not
+        list directories) """
+        if not self.listing:
+            return None
+        parent, _, name = path.rstrip('/').rpartition('/')
+        if path.endswith('/'):
+            name += '/'
+        directory = parent + '/' if parent else ''
+        if directory and self._listed(directory) is False:
+            return False
+        names = self._list(directory)
+        return None if names is None else name in names
+
+    def _fetch_verified(self, path, sha256):
+        """ Returns the content of a path under the Importer's URL from the content-addressed
+        store, or downloads it, verifying it against `sha256` while streaming, and stores it """
+        url = self.url + '/' + path.lstrip('/') if path else self.url
+        content = _CONTENT_STORE.get(sha256, self.cache_dir)
+        if content is not None:
+            logger.info("[+] Serving '%s' from the content store (sha256: %s)" % (url, sha256))
+            return content
+        try:
+            resp = self._fetch(path, sha256=sha256)
+        except DigestMismatchError as e:
+            raise ImportError("[-] %s" % e)
+        if resp['code'] != 200:
+            raise ImportError(
+                "[-] URL '%s' returned HTTP Status Code '%d'" % (url, resp['code']))
+        _CONTENT_STORE.put(sha256, resp['body'], self.cache_dir)
+        return resp['body']
+
+    def _extract(self, path, archive=None):
+        """ Returns the content of a file of the Importer's archive (or of `archive`, a
+        new version of it). The files of encrypted ZIP archives are decrypted once and
+        kept (the most recently used, up to `module_cache_bytes`), as 'zipfile' decrypts
+        them in pure Python, at a few MB/s
+
+        Raises:
+            KeyError: If the file is not in the archive
+        """
+        with self._lock:
+            current = archive is None or archive is self.archive
+            archive = self.archive if archive is None else archive
+            decrypted = self._decrypted
+        if not (self._encrypted and current):
+            return _open_archive_file(archive, path, zip_pwd=self.zip_pwd)
+        with self._module_locks[('decrypt', path)]:
+            with self._lock:
+                content = decrypted.get(path)
+                if content is not None:
+                    decrypted.move_to_end(path)
+                    return content
+            content = _open_archive_file(archive, path, zip_pwd=self.zip_pwd)
+            with self._lock:
+                if decrypted is not self._decrypted:
+                    # Replaced by a new version (see 'check_changes')
+                    return content
+                decrypted[path] = content
+                self._decrypted_bytes += len(content)
+                while self._decrypted_bytes > self.module_cache_bytes and len(decrypted) > 1:
+                    _, dropped = decrypted.popitem(last=False)
+                    self._decrypted_bytes -= len(dropped)
+            return content
+
+    def _verify_zip_password(self, archive=None):
+        """ Decrypts the smallest encrypted file of the Importer's archive (or of
+        `archive`), checking its CRC, to fail early on a missing or wrong password
+
+        Raises:
+            ZipPasswordError: If the password is missing or wrong
+        """
+        import zipfile
+        import zlib
 
-        if not _isHTTPS(url):
+        path = _encrypted_zip_members(self.archive if archive is None else archive)[0]
+        try:
+            self._extract(path, archive)
+        except (RuntimeError, zipfile.BadZipFile, zlib.error) as e:
+            raise ZipPasswordError(
+                "[-] Cannot decrypt ZIP archive '%s' with the password given: %s" %
+                (self.url, e))
+        logger.info("[+] The password of ZIP archive '%s' is correct" % self.url)
+
+    def _decrypt_all(self):
+        """ Decrypts the '.py' files of the Importer's encrypted ZIP archive, smallest
+        first, as long as they fit in `module_cache_bytes` (see `zip_decrypt_all`) """
+        with self._lock:
+            archive, decrypted = self.archive, self._decrypted
+        paths = [path for path in _encrypted_zip_members(archive) if path.endswith('.py')]
+        logger.debug("[*] Decrypting %d files of '%s'..." % (len(paths), self.url))
+        decrypted_count = 0
+        for path in paths:
+            with self._lock:
+                if decrypted is not self._decrypted:
+                    # Replaced by a new version (see 'check_changes')
+                    return
+                if path not in decrypted and self._decrypted_bytes + \
+                        archive.getinfo(path).file_size > self.module_cache_bytes:
+                    logger.debug("[-] 'module_cache_bytes' reached. Decrypting the rest on use")
+                    break
+            try:
+                self._extract(path)
+                decrypted_count += 1
+            except Exception as e:
+                logger.warning("[-] Cannot decrypt '%s' of '%s': %s" % (path, self.url, e))
+        logger.debug("[+] Decrypted %d of %d files of '%s'" %
+                     (decrypted_count, len(paths), self.url))
+
+    def _open_archive(self, content):
+        """ Returns the archive held by `content` (see `_retrieve_archive`), stripping
+        its top-level directory if `strip_prefix` is set """
+        archive = _retrieve_archive(content, self.url)
+        if archive is not None and self.strip_prefix:
+            _strip_archive_prefix(archive)
+        return archive
+
+    @staticmethod
+    def _check_url(url, allow_plaintext, ca_verify):
+        if not _isHTTPS(url) and not _is_local(url):
             logger.warning(
                 "[-] Using HTTP URLs (%s) with 'httpimport' is a security hazard!" %
                 (url))
@@ -324,24 +2909,615 @@ class HttpImporter(object):
                 "[-] Disabling TLS Certificate verification for URL (%s) is a security hazard!" %
                 (url))
 
-        self.zip_pwd = zip_pwd
-        self.headers = headers
-        self.proxy = proxy
-        self.ca_verify = ca_verify
-        self.ca_file = ca_file
+    def _fetch(self, path, **kw):
+        """ Issues a GET request for a path under the Importer's URL, using its mirrors.
+        Responses cached in `cache_dir` are served instead within the `stale_while_revalidate`
+        window (unless `kw` are given), and revalidated in the background. Those of
+        `immutable` Importers are served however old they are
 
-        # Try a request that can fail in case of connectivity issues
-        resp = http(url, headers=self.headers, proxy=self.proxy,
-                    method='GET', ca_verify=self.ca_verify, ca_file=self.ca_file)
+        Args:
+            path (str): The path relative to the Importer's URL ('' or '/' for the URL itself)
+            **kw (dict): Additional parameters passed to `http()`. The `headers` are added
+                to the Importer's
 
-        # Try to extract an archive from URL
-        self.archive = _retrieve_archive(resp['body'], url)
+        Returns:
+            dict: The response, as returned by `http()`
+
+        Raises:
+            OfflineError: If the response is not cached in offline mode
+        """
+        url = self.url + '/' + path.lstrip('/') if path else self.url
+        if self._offline():
+            # Responses of earlier runs, cached on disk
+            entry = _RESPONSE_CACHE.get(url, self.cache_dir, memory=False)
+            if entry is None:
+                raise OfflineError("Offline mode: '%s' is not cached" % url)
+            logger.debug("[+] Serving '%s' from cache (offline mode)" % url)
+            return entry['resp']
+        if self.immutable and self.cache_dir and not kw:
+            entry = _RESPONSE_CACHE.get(url, self.cache_dir, memory=False)
+            if entry is not None and entry['resp']['code'] == 200:
+                logger.debug("[+] Serving '%s' from cache (immutable)" % url)
+                return entry['resp']
+        if self.stale_while_revalidate and self.cache_dir and not kw:
+            entry = _RESPONSE_CACHE.get(url, self.cache_dir, memory=False)
+            if entry is not None and time.time() - entry['stored'] < self.stale_while_revalidate:
+                _RESPONSE_CACHE.revalidate(
+                    url, entry, lambda conditional: self._request(path, headers=conditional),
+                    self.cache_dir, memory=False)
+                return entry['resp']
+
+        resp = self._request(path, **kw)
+        # Verified content (sha256) is kept in the content store instead
+        if self.cache_dir and 'sha256' not in kw and resp['code'] in (200, 404):
+            _RESPONSE_CACHE.put(url, resp, self.cache_dir, memory=False)
+        return resp
+
+    def _request(self, path, **kw):
+        """ Issues a request for a path under the Importer's URL through its mirrors,
+        bypassing the caches. See `_fetch` """
+        headers = dict(self.headers, **kw.pop('headers', {}))
+        return _hedged_http(
+            self.mirrors,
+            lambda base: base + '/' + path.lstrip('/') if path else base,
+            headers=headers, proxy=self.proxy,
+            ca_verify=self.ca_verify, ca_file=self.ca_file,
+            **dict(self.http_options, **kw))
+
+    def _offline(self):
+        return OFFLINE or self.http_options.get('offline', False)
+
+    def _not_found_error(self, fullname):
+        return ImportError(
+            "Module '%s' cannot be loaded from '%s'%s" %
+            (fullname, self.url,
+             " (offline mode: not cached)" if self._offline() else ""),
+            name=fullname)
+
+    def _fetch_manifest(self):
+        """ Returns the manifest of a repository created by `publish()`, or `None` """
+        import json
+
+        try:
+            resp = self._fetch(MANIFEST)
+        except URLError as e:
+            logger.info("[-] Manifest of '%s' cannot be fetched: %s" % (self.url, e))
+            return None
+        if resp['code'] != 200:
+            return None
+        try:
+            manifest = json.loads(resp['body'])
+            manifest['modules']
+        except (ValueError, KeyError, TypeError):
+            logger.warning("[-] Invalid manifest found in '%s'. Ignoring..." % self.url)
+            return None
+        self._manifest_validators = _conditional_headers(resp['headers'])
+        logger.info(
+            "[+] Using the manifest of '%s' (%d modules)" %
+            (self.url, len(manifest['modules'])))
+        return manifest
+
+    def _fetch_encoded(self, path):
+        """ Returns the content of a published file, fetching its compressed
+        sibling if the manifest lists one, or `None` if it is not available """
+        encodings = self.manifest.get('encodings', [])
+        if 'zstd' in encodings:
+            try:
+                import zstandard
+            except ImportError:
+                zstandard = None
+            if zstandard is not None:
+                resp = self._fetch(path + '.zst')
+                if resp['code'] == 200:
+                    return zstandard.ZstdDecompressor().decompress(resp['body'])
+        if 'gzip' in encodings:
+            import gzip
+
+            resp = self._fetch(path + '.gz')
+            if resp['code'] == 200:
+                return gzip.decompress(resp['body'])
+        resp = self._fetch(path)
+        return resp['body'] if resp['code'] == 200 else None
+
+    def _bundle(self, package):
+        """ Returns the archive of the bundle of a top-level package, or `None` """
+        bundle = self.manifest.get('bundles', {}).get(package)
+        if bundle is None:
+            return None
+        with self._module_locks[('bundle', package)]:
+            if package not in self._bundles:
+                logger.info("[*] Fetching bundle of package '%s'..." % package)
+                self._bundles[package] = _retrieve_archive(
+                    self._fetch_verified(bundle['path'], bundle['sha256']),
+                    self.url + '/' + bundle['path'])
+            return self._bundles[package]
+
+    def _fetch_batch(self, paths):
+        """ Fetches many files in a single request to the batch endpoint of the server.
+        The paths are POSTed as a JSON object (`{"paths": [...]}`) and the files
+        are returned in a TAR archive, leaving out the ones not found.
+
+        Args:
+            paths (list): The paths of the files, relative to the Importer's URL
+
+        Returns:
+            dict: The paths of the files found mapped to their contents,
+                or `None` if the batch request failed
+        """
+        import json
+        import tarfile
+
+        if self._offline():
+            # The files of batch responses are cached one by one
+            return None
+        logger.info("[*] Fetching %d files through the batch endpoint of '%s'..." %
+                    (len(paths), self.url))
+        try:
+            resp = _hedged_http(
+                self.mirrors, lambda base: base + '/' + self.batch.lstrip('/'),
+                method='POST', data=json.dumps({'paths': paths}).encode('utf8'),
+                headers=dict(self.headers, **{'Content-Type': 'application/json'}),
+                proxy=self.proxy, ca_verify=self.ca_verify, ca_file=self.ca_file,
+                **self.http_options)
+        except URLError as e:
+            logger.warning("[-] Batch request to '%s' failed: %s" % (self.url, e))
+            return None
+        if resp['code'] in (404, 405, 501):
+            # Not retried for every module
+            logger.warning(
+                "[-] The batch endpoint of '%s' is not supported (HTTP Status Code '%d'). "
+                "Fetching files one by one..." % (self.url, resp['code']))
+            self.batch = None
+            return None
+        if resp['code'] != 200:
+            logger.warning(
+                "[-] Batch request to '%s' returned HTTP Status Code '%d'" %
+                (self.url, resp['code']))
+            return None
+        contents = {}
+        try:
+            with tarfile.open(fileobj=io.BytesIO(resp['body']), mode='r:*') as archive:
+                for member in archive:
+                    if member.isfile() and member.name in paths:
+                        contents[member.name] = archive.extractfile(member).read()
+        except tarfile.TarError as e:
+            logger.warning("[-] Invalid batch response from '%s': %s" % (self.url, e))
+            return None
+        if self.cache_dir:
+            # Served in offline mode as if fetched one by one
+            for path in paths:
+                resp = {'code': 200, 'body': contents[path], 'headers': {}} \
+                    if path in contents else {'code': 404, 'body': b'', 'headers': {}}
+                _RESPONSE_CACHE.put(self.url + '/' + path, resp, self.cache_dir, memory=False)
+        return contents
+
+    def _published_file(self, entry):
+        """ Returns the path, the SHA256 digest and the 'pyc' entry (or `None`)
+        of the file to load for a module of the manifest """
+        compiled = entry.get('pyc', {}).get(sys.implementation.cache_tag)
+        if self.allow_compiled and compiled is not None:
+            return compiled['path'], compiled['sha256'], compiled
+        return entry['path'], entry['sha256'], None
+
+    def _published_record(self, entry, content):
+        """ Verifies the content of a module of the manifest and returns its record """
+        import hashlib
+        import importlib.util
+        import marshal
+
+        path, sha256, compiled = self._published_file(entry)
+        if hashlib.sha256(content).hexdigest() != sha256:
+            raise ImportError(
+                "[-] SHA256 digest of '%s' does not match the manifest of '%s'" %
+                (path, self.url))
+        url = self.url + '/' + entry['path']
+        if compiled is None:
+            return _ModuleRecord(url, entry['path'], content)
+        if content[:4] != importlib.util.MAGIC_NUMBER:
+            raise ImportError("[-] '%s' is not compatible with this interpreter" % path)
+        logger.debug("[+] Using precompiled '%s'" % path)
+        record = _ModuleRecord(url, entry['path'], b'')
+        # The source is only fetched for 'linecache'
+        record.drop()
+        record.code = _relabel_code(marshal.loads(content[16:]), url)
+        return record
+
+    def _find_batched(self, fullname):
+        """ Fetches all modules of the top-level package of a module of the manifest
+        in a single batch request, once. The other modules are recorded as found.
+
+        Returns:
+            bytes: The content of the file of the module, or `None`
+        """
+        package = fullname.split('.')[0]
+        with self._module_locks[('batch', package)]:
+            if package in self._batched:
+                return None
+            self._batched.add(package)
+            entries = {name: entry for name, entry in self.manifest['modules'].items()
+                       if name == package or name.startswith(package + '.')}
+            contents = self._fetch_batch(
+                [self._published_file(entry)[0] for entry in entries.values()])
+        if not contents:
+            return None
+        for name, entry in entries.items():
+            content = contents.get(self._published_file(entry)[0])
+            if name == fullname or content is None or name in sys.modules \
+                    or self._record(name) is not None:
+                continue
+            try:
+                self._add_record(name, self._published_record(entry, content))
+            except ImportError as e:
+                logger.warning("[-] %s" % e)
+        return contents.get(self._published_file(entries[fullname])[0])
+
+    def _find_published(self, fullname):
+        """ Finds a module through the manifest, without probing for its paths """
+        entry = self.manifest['modules'].get(fullname)
+        if entry is None:
+            logger.info(
+                "[-] Module '%s' is not in the manifest of '%s'. Skipping..." %
+                (fullname, self.url))
+            return None
+
+        path, sha256, compiled = self._published_file(entry)
+        bundle = self._bundle(fullname.split('.')[0]) if compiled is None else None
+        if bundle is not None:
+            content = _open_archive_file(bundle, path)
+        else:
+            content = self._find_batched(fullname) if self.batch else None
+            if content is None:
+                content = self._fetch_encoded(path)
+        if content is None:
+            logger.warning("[-] Module '%s' is listed but not served by '%s'" % (fullname, self.url))
+            return None
+        self._add_record(fullname, self._published_record(entry, content))
+        return self
+
+    def _add_record(self, fullname, record):
+        """ Keeps the record of a found module, dropping the least recently found
+        unloaded modules if their sources exceed `module_cache_bytes` """
+        with self._lock:
+            self._discard_unloaded(fullname)
+            self.modules[fullname] = record
+            self._unloaded[fullname] = record.size
+            self._unloaded_bytes += record.size
+            while self._unloaded_bytes > self.module_cache_bytes and len(self._unloaded) > 1:
+                name, size = self._unloaded.popitem(last=False)
+                self._unloaded_bytes -= size
+                logger.debug(
+                    "[*] Dropping unloaded module '%s' (%d bytes) from '%s'" %
+                    (name, size, self.url))
+                del self.modules[name]
+
+    def _discard_unloaded(self, fullname):
+        with self._lock:
+            size = self._unloaded.pop(fullname, None)
+            if size is not None:
+                self._unloaded_bytes -= size
+
+    def _record(self, fullname):
+        with self._lock:
+            return self.modules.get(fullname)
+
+    def _read_source(self, record):
+        """ Returns the source of a module, fetching it again if it has been dropped """
+        content = record.content
+        if content is not None:
+            return content
+        logger.debug("[*] Fetching source of '%s' again" % record.filepath)
+        if self.archive is not None:
+            return self._extract(record.path)
+        resp = self._fetch(record.path)
+        if resp['code'] != 200:
+            raise ImportError(
+                "Source of '%s' is not available anymore" % record.filepath)
+        return resp['body']
+
+    def get_source(self, fullname):
+        """ Returns the source of a module found by this Importer. Used by `linecache` """
+        import importlib.util
+
+        if fullname not in self.modules or self.modules[fullname].extension:
+            return None
+        return importlib.util.decode_source(self._read_source(self.modules[fullname]))
+
+    def get_filename(self, fullname):
+        if fullname not in self.modules:
+            raise ImportError("Module '%s' has not been found by '%s'" % (fullname, self.url))
+        return self.modules[fullname].filepath
+
+    def is_package(self, fullname):
+        record = self._record(fullname)
+        if record is None:
+            if self.find_module(fullname) is not self:
+                raise self._not_found_error(fullname)
+            record = self._record(fullname)
+        return record.package
+
+    def _resource_names(self, directory=None):
+        """ Returns the paths of the files known to be under the Importer's URL.
+        All files of archives are known. For web directories, the modules found, the
+        files listed in the manifest or the directory listings and the resources fetched
+        are. The listed subdirectories are included too, ending with '/'
+
+        Args:
+            directory (str): A directory (relative to the Importer's URL) to list first
+        """
+        if self.archive is not None:
+            return _archive_namelist(self.archive)
+        if directory is not None and self.listing:
+            self._list(directory.strip('/') + '/' if directory.strip('/') else '')
+        with self._lock:
+            names = {record.path for record in self.modules.values()}
+            names.update(path for path, content in self._resources.items()
+                         if content is not None)
+        for listed, listing in list(self._listings.items()):
+            names.update(listed + name for name in listing or ())
+        if self.manifest is not None:
+            names.update(entry['path'] for entry in self.manifest['modules'].values())
+            names.update(self.manifest.get('resources', {}))
+        return sorted(names)
+
+    def _open_resource(self, path):
+        """ Returns a binary stream of a file under the Importer's URL. The files of
+        archives are streamed out of the archive, without extracting them first.
+        The files of web directories are fetched on first use and kept in memory.
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+        """
+        import hashlib
+        import tarfile
+
+        if self.archive is not None and self._encrypted:
+            try:
+                return io.BytesIO(self._extract(path))
+            except KeyError:
+                raise FileNotFoundError("'%s' is not in '%s'" % (path, self.url))
+        if self.archive is not None:
+            try:
+                if isinstance(self.archive, tarfile.TarFile):
+                    stream = self.archive.extractfile(path)
+                else:
+                    stream = self.archive.open(path, 'r', pwd=self.zip_pwd)
+            except KeyError:
+                stream = None
+            if stream is None:
+                raise FileNotFoundError("'%s' is not in '%s'" % (path, self.url))
+            return stream
+
+        if path and self._listed(path.rstrip('/') + '/'):
+            raise IsADirectoryError("'%s' is a directory of '%s'" % (path, self.url))
+        with self._module_locks[('resource', path)]:
+            if path not in self._resources:
+                logger.info("[*] Fetching resource '%s' from '%s'..." % (path, self.url))
+                try:
+                    if self.manifest is not None:
+                        content = self._fetch_encoded(path)
+                    else:
+                        resp = self._fetch(path)
+                        content = resp['body'] if resp['code'] == 200 else None
+                        if resp.get('url', '').endswith('/' + path.rstrip('/') + '/'):
+                            # Redirected to the directory (e.g. to its autoindex page)
+                            logger.debug("[-] '%s' is a directory of '%s'" % (path, self.url))
+                            content = None
+                except URLError as e:
+                    raise OSError("'%s' cannot be fetched from '%s': %s" % (path, self.url, e))
+                entry = (self.manifest or {}).get('resources', {}).get(path)
+                if content is not None and entry is not None and \
+                        hashlib.sha256(content).hexdigest() != entry['sha256']:
+                    raise OSError(
+                        "SHA256 digest of '%s' does not match the manifest of '%s'" %
+                        (path, self.url))
+                with self._lock:
+                    self._resources[path] = content
+            content = self._resources[path]
+        if content is None:
+            raise FileNotFoundError("'%s' is not served by '%s'" % (path, self.url))
+        return io.BytesIO(content)
+
+    def get_data(self, path):
+        """ Returns the content of a file under the Importer's URL, given its URL (like
+        the `__file__` of the modules found) or its path relative to the Importer's URL.
+        Part of the `importlib.abc.ResourceLoader` API """
+        for prefix in (self.url + '/', self.url + '#'):
+            if path.startswith(prefix):
+                path = path[len(prefix):]
+                break
+        with self._open_resource(path) as f:
+            return f.read()
+
+    def get_resource_reader(self, fullname):
+        """ Returns the resource reader of a package found by this Importer,
+        used by `importlib.resources.files()` """
+        record = self._record(fullname)
+        if record is None or not record.package:
+            return None
+        return _RemoteResourceReader(self, record.path.rpartition('/')[0])
+
+    def warm(self, modules):
+        """ Fetches and compiles modules (and their parent packages) ahead of time,
+        typically in the parent process of a pre-fork server. The sources and code
+        objects are kept in memory, never evicted, and an archive is moved to a
+        read-only memory map, so forked workers import them without network activity.
+
+        Args:
+            modules (list): The names of the modules/packages to warm
+
+        Returns:
+            list: The names of the warmed modules/packages
+
+        Raises:
+            ImportError: If a module cannot be found through this Importer
+        """
+        import mmap
+
+        if self.archive is not None and not isinstance(self._archive_buffer, mmap.mmap):
+            logger.info("[*] Mapping archive '%s' read-only" % self.url)
+            self._archive_buffer = _readonly_mapping(self._archive_buffer)
+            self.archive = self._open_archive(self._archive_buffer)
+
+        warmed = []
+        for name in modules:
+            parts = name.split('.')
+            for fullname in ('.'.join(parts[:i + 1]) for i in range(len(parts))):
+                if fullname in warmed:
+                    continue
+                with self._module_locks[fullname]:
+                    if self.find_module(fullname) is not self:
+                        raise ImportError(
+                            "Module '%s' cannot be warmed from '%s'" %
+                            (fullname, self.url))
+                    record = self._record(fullname)
+                    if record.code is None and not record.extension:
+                        record.code = _SOURCE_STORE.compile(
+                            self._read_source(record), record.filepath)
+                    record.pinned = True
+                    self._discard_unloaded(fullname)
+                warmed.append(fullname)
+        logger.info("[+] Warmed modules from '%s': %s" % (self.url, warmed))
+        return warmed
+
+    def check_changes(self, workers=8):
+        """ Revalidates the files of the modules loaded through this Importer and keeps
+        the new content of the ones that changed, used by `importlib.reload`. Files are
+        revalidated concurrently with conditional requests ('If-None-Match',
+        'If-Modified-Since'). Repositories with a manifest are revalidated through
+        the manifest alone and archives through their URL.
+
+        Args:
+            workers (int): The number of concurrent requests
+
+        Returns:
+            list: The names of the modules whose content changed
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        if self._offline() or self.sha256 is not None or self.immutable:
+            # Pinned content never changes
+            return []
+        with self._lock:
+            loaded = {name: record for name, record in self.modules.items()
+                      if record.module is not None and not record.extension}
+        if self.listing:
+            # Listed again on their next use, to find new modules
+            self._listings = {}
+        if not loaded:
+            return []
+        logger.info("[*] Checking %d modules of '%s' for changes..." % (len(loaded), self.url))
+        if self.archive is not None:
+            updated = self._changed_archive(loaded)
+        elif self.manifest is not None:
+            updated = self._changed_published(loaded)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                updated = {name: record for name, record in
+                           zip(loaded, executor.map(self._revalidate, loaded.values()))
+                           if record is not None}
+
+        for name, record in updated.items():
+            # Found but not loaded: 'importlib.reload' executes the new content
+            # in the existing module object, without fetching it again
+            with self._module_locks[name], self._lock:
+                self.modules[name] = record
+            logger.info("[+] Module '%s' changed in '%s'" % (name, self.url))
+        return sorted(updated)
+
+    def _revalidate(self, record):
+        """ Returns the new record of a module whose file changed, or `None` """
+        import hashlib
+
+        try:
+            resp = self._fetch(record.path, headers=record.validators)
+        except URLError as e:
+            logger.warning("[-] '%s' cannot be revalidated: %s" % (record.filepath, e))
+            return None
+        if resp['code'] != 200:
+            if resp['code'] != 304:
+                logger.warning(
+                    "[-] '%s' returned HTTP Status Code '%d' while revalidated" %
+                    (record.filepath, resp['code']))
+            return None
+        validators = _conditional_headers(resp['headers'])
+        # Servers without validators send unchanged files again
+        if hashlib.sha256(resp['body']).hexdigest() == record.sha256:
+            record.validators = validators
+            return None
+        new_record = _ModuleRecord(record.filepath, record.path, resp['body'])
+        new_record.validators = validators
+        return new_record
+
+    def _changed_published(self, loaded):
+        """ Returns the new records of the loaded modules whose digests changed
+        in the manifest """
+        import json
+
+        resp = self._fetch(MANIFEST, headers=self._manifest_validators)
+        if resp['code'] != 200:
+            return {}
+        try:
+            manifest = json.loads(resp['body'])
+            manifest['modules']
+        except (ValueError, KeyError, TypeError):
+            logger.warning("[-] Invalid manifest found in '%s'. Ignoring..." % self.url)
+            return {}
+        updated = {}
+        for name in loaded:
+            entry, old_entry = manifest['modules'].get(name), self.manifest['modules'].get(name)
+            if entry is None or old_entry is not None and \
+                    self._published_file(entry)[1] == self._published_file(old_entry)[1]:
+                continue
+            content = self._fetch_encoded(self._published_file(entry)[0])
+            if content is None:
+                continue
+            try:
+                updated[name] = self._published_record(entry, content)
+            except ImportError as e:
+                logger.warning("[-] %s" % e)
+        with self._lock:
+            self.manifest = manifest
+            self._manifest_validators = _conditional_headers(resp['headers'])
+            # Bundles of the previous manifest are stale
+            self._bundles = {}
+        return updated
+
+    def _changed_archive(self, loaded):
+        """ Returns the new records of the loaded modules whose files changed in the archive """
+        import hashlib
+
+        resp = self._fetch('', headers=self._validators)
+        if resp['code'] != 200:
+            return {}
+        archive = self._open_archive(resp['body'])
+        if archive is None:
+            logger.warning("[-] '%s' is not an archive anymore. Ignoring..." % self.url)
+            return {}
+        encrypted = bool(_encrypted_zip_members(archive))
+        if encrypted:
+            self._verify_zip_password(archive)
+        updated = {}
+        for name, record in loaded.items():
+            try:
+                content = self._extract(record.path, archive)
+            except KeyError:
+                continue
+            if hashlib.sha256(content).hexdigest() != record.sha256:
+                updated[name] = _ModuleRecord(record.filepath, record.path, content)
+        with self._lock:
+            self.archive, self._archive_buffer = archive, resp['body']
+            self._encrypted, self._decrypted = encrypted, OrderedDict()
+            self._decrypted_bytes = 0
+            self._validators = _conditional_headers(resp['headers'])
+        return updated
 
     def find_spec(self, fullname, path, target=None):
-        loader = self.find_module(fullname, path)
+        with _deadline(self.import_deadline):
+            loader = self.find_module(fullname, path)
         if loader is not None:
+            record = self._record(fullname)
             return importlib.machinery.ModuleSpec(
-            fullname, loader)
+                fullname, loader, is_package=record is not None and record.package)
         return None
 
     def find_module(self, fullname, path=None):
@@ -358,21 +3534,70 @@ class HttpImporter(object):
         logger.info(
             "[*] Trying to find loadable code for module '%s', path: '%s'" %
             (fullname, path))
+        with self._module_locks[fullname]:
+            record = self._record(fullname)
+            if record is not None and (record.module is None or record.pinned):
+                # Found by a concurrent import that has not loaded it yet,
+                # or warmed: served from memory
+                return self
+            return self._find_module(fullname)
+
+    def _find_module(self, fullname):
+        if self.manifest is not None:
+            try:
+                return self._find_published(fullname)
+            except URLError as e:
+                logger.warning(
+                    "[-] Module '%s' cannot be fetched from '%s': %s" %
+                    (fullname, self.url, e))
+                return None
 
         paths = _create_paths(fullname)
+        if self.archive is not None:
+            # Like the standard path finder, extension modules come first
+            paths = _extension_paths(fullname) + paths
+        elif self.listing and not self.batch:
+            # Files missing from the directory listings are not probed. A batch
+            # endpoint probes all paths in one request already
+            paths = [path for path in paths if self._listed(path) is not False]
+            if not paths:
+                logger.info(
+                    "[-] Module '%s' is not listed in '%s'. Skipping..." % (fullname, self.url))
+                return None
+        if self.batch:
+            # All paths are probed in a single request
+            contents = self._fetch_batch(paths)
+            if contents is not None:
+                for path in paths:
+                    if path in contents:
+                        logger.debug(
+                            "[+] Fetched '%s' through the batch endpoint. The module can be loaded!" %
+                            (path))
+                        self._add_record(fullname, _ModuleRecord(
+                            self.url + '/' + path, path, contents[path]))
+                        return self
+                logger.info(
+                    "[-] Module '%s' cannot be loaded from '%s'. Skipping..." %
+                    (fullname, self.url))
+                return None
         for path in paths:
             if self.archive is None:
                 url = self.url + '/' + path
-                resp = http(url, headers=self.headers, proxy=self.proxy, ca_verify=self.ca_verify, ca_file=self.ca_file)
+                try:
+                    resp = self._fetch(path)
+                except URLError as e:
+                    # Let 'import' move on to the next Importer quickly
+                    logger.warning(
+                        "[-] Module '%s' cannot be fetched from '%s': %s" %
+                        (fullname, self.url, e))
+                    return None
                 if resp['code'] == 200:
                     logger.debug(
                         "[+] Fetched Python code from '%s'. The module can be loaded!" %
                         (url))
-                    self.modules[fullname] = {}
-                    self.modules[fullname]['content'] = resp['body']
-                    self.modules[fullname]['filepath'] = url
-                    self.modules[fullname]['package'] = path.endswith(
-                        '__init__.py')
+                    record = _ModuleRecord(url, path, resp['body'])
+                    record.validators = _conditional_headers(resp['headers'])
+                    self._add_record(fullname, record)
                     return self
                 else:
                     logger.debug(
@@ -381,16 +3606,12 @@ class HttpImporter(object):
                     continue
             else:
                 try:
-                    content = _open_archive_file(
-                        self.archive, path, zip_pwd=self.zip_pwd)
+                    content = self._extract(path)
                     logger.debug(
                         "[+] Extracted '%s' from archive. The module can be loaded!" %
                         (path))
-                    self.modules[fullname] = {}
-                    self.modules[fullname]['content'] = content
-                    self.modules[fullname]['filepath'] = self.url + "#" + path
-                    self.modules[fullname]['package'] = path.endswith(
-                        '__init__.py')
+                    self._add_record(
+                        fullname, _ModuleRecord(self.url + "#" + path, path, content))
                     return self
                 except KeyError:
                     logger.debug(
@@ -405,8 +3626,11 @@ class HttpImporter(object):
 
     def create_module(self, spec):
         fullname = spec.name
+        with self._module_locks[fullname]:
+            return self._new_module(fullname)
 
-        if fullname not in self.modules:
+    def _new_module(self, fullname):
+        if self._record(fullname) is None:
             logger.debug(
                 "[*] Module '%s' has not been attempted before. Trying to load..." % fullname)
             # Run 'find_module' and see if it is loadable through this Importer
@@ -416,43 +3640,56 @@ class HttpImporter(object):
                     "[-] Module '%s' has not been found as loadable. Failing..." % fullname)
                 # If it is not loadable ('find_module' did not return 'self' but 'None'):
                 # throw error:
-                raise ImportError(
-                    "Module '%s' cannot be loaded from '%s'" %
-                    (fullname, self.url))
+                raise self._not_found_error(fullname)
 
         logger.debug(
             "[*] Creating Python Module object for '%s'" % (fullname))
 
+        record = self.modules[fullname]
+        if record.extension:
+            mod, record.native = _load_extension(fullname, self._read_source(record))
+            mod.__loader__ = self
+            mod.__file__ = record.filepath
+            mod.__url__ = record.filepath
+            record.module = mod
+            self._discard_unloaded(fullname)
+            return mod
         mod = types.ModuleType(fullname)
         mod.__loader__ = self
-        mod.__file__ = self.modules[fullname]['filepath']
+        mod.__file__ = record.filepath
         # Set module path - get filepath and keep only the path until filename
         mod.__path__ = ['/'.join(mod.__file__.split('/')[:-1]) + '/']
-        mod.__url__ = self.modules[fullname]['filepath']
+        mod.__url__ = record.filepath
 
         mod.__package__ = fullname
 
         # Populate subpackage '__package__' metadata with parent package names
         pkg_name = '.'.join(fullname.split('.')[:-1])
-        if len(fullname.split('.')[:-1]) > 1 and not self.modules[fullname]['package']:
+        if len(fullname.split('.')[:-1]) > 1 and not record.package:
             # recursively find the parent package
             while sys.modules[pkg_name].__package__ != pkg_name:
                 pkg_name = '.'.join(pkg_name.split('.')[:-1])
             mod.__package__ = pkg_name
-        elif not self.modules[fullname]['package']:
+        elif not record.package:
             mod.__package__ = pkg_name.split('.')[0]
 
         logger.debug(
             "[*] Metadata (__package__) set to '%s' for %s '%s'" %
             (mod.__package__,
-             'package' if self.modules[fullname]['package'] else 'module',
+             'package' if record.package else 'module',
              fullname))
 
-        self.modules[fullname]['module'] = mod
+        record.module = mod
+        self._discard_unloaded(fullname)
         return mod
 
     def exec_module(self, module):
         fullname = module.__name__
+        record = self._record(fullname)
+        if record is not None:
+            # 'importlib.reload' executes the existing module object
+            record.module = module
+            self._discard_unloaded(fullname)
         return self._create_module(fullname)
 
     def _create_module(self, fullname, sys_modules=True):
@@ -468,23 +3705,32 @@ class HttpImporter(object):
 
         """
 
-        # If the module has not been found as loadable
-        # through 'find_module' method (yet)
-        if fullname not in self.modules:
-            spec = self.find_spec(fullname, "")
-            if spec is not None:
-                module = self.create_module(spec)
+        with self._module_locks[fullname]:
+            # If the module has not been found as loadable
+            # through 'find_module' method (or created) yet
+            record = self._record(fullname)
+            if record is None or record.module is None:
+                spec = self.find_spec(fullname, "")
+                if spec is not None:
+                    module = self.create_module(spec)
+                else:
+                    raise self._not_found_error(fullname)
+                record = self._record(fullname)
             else:
-                raise ImportError
-        else:
-            module = self.modules[fullname]['module']
+                module = record.module
 
         if sys_modules:
             sys.modules[fullname] = module
 
         # Execute the module/package code into the Module object
         try:
-            exec(self.modules[fullname]['content'], module.__dict__)
+            if record.native is not None:
+                record.native.exec_module(module)
+            else:
+                code = record.code
+                if code is None:
+                    code = _SOURCE_STORE.compile(self._read_source(record), record.filepath)
+                exec(code, module.__dict__)
         except BaseException:
             if not sys_modules:
                 logger.warning(
@@ -492,6 +3738,17 @@ class HttpImporter(object):
                     fullname)
             else:
                 del sys.modules[fullname]
+            return module
+
+        # The source is only needed again for 'linecache' and 'reload'
+        if record.pinned:
+            # Warmed records stay untouched, to keep their memory shared after fork
+            return module
+        record.code = None
+        if self.archive is not None:
+            record.drop()
+        else:
+            record.compress()
         return module
 
 
@@ -504,6 +3761,14 @@ releases.
         project_matrix (dict):
         allowed_dists (list):
         pypi_url (str):
+        mirrors (list): PyPI API URL templates equivalent to `url`, queried with hedging
+        hedge_percentile (float): The latency percentile after which a PyPI API query is hedged
+        preload (bool): Run `preload()` when the object is created
+        preload_workers (int): The number of concurrent downloads of `preload()`
+        resolve_dependencies (bool): Make `preload()` also resolve and preload the
+            dependencies of the requirements
+        simple_url (str): The URL template of the JSON Simple API (PEP 691) of the index.
+            Derived from `url` if not set
         **kw (dict): Parameters that are passed to HttpImporter objects created by this class
      """
 
@@ -514,50 +3779,241 @@ releases.
             version_matrix={},
             allowed_dists=[
                 'bdist_wheel',
-                'sdist'], **kw):
+                'sdist'],
+            mirrors=[], hedge_percentile=95,
+            preload=False, preload_workers=8,
+            resolve_dependencies=False, simple_url=None, **kw):
         if url is None:
             url = 'https://pypi.org/pypi/%s/json'
         self.url = url  # Duck Type with HttpImporter
+        self.mirrors = _MirrorSet(
+            [url] + [m for m in mirrors if m],
+            hedge_percentile=hedge_percentile)
         self.version_matrix = version_matrix
         self.project_matrix = project_matrix
         self.allowed_dists = allowed_dists
         self.module_importers = {}
+        self._root_locks = _KeyedLocks()
+        self.preload_workers = preload_workers
+        self.resolve_dependencies = resolve_dependencies
+        if simple_url is None and url.endswith('/pypi/%s/json'):
+            simple_url = url[:-len('/pypi/%s/json')] + '/simple/%s/'
+        self.simple_url = simple_url
+        # Normalized project names mapped to the distribution files chosen by 'resolve()'
+        self.resolved = {}
         self.kw = kw
-
-    def find_module(self, module_name, path=None):
-        logger.info(
-            "[*] Trying to find PyPI module '%s', path: '%s'" %
-            (module_name, path))
-        module_root = module_name.split('.')[0]
-        if module_root in self.module_importers:
-            return self.module_importers[module_root]
+        if preload:
+            self.preload()
+
+    def _http_options(self):
+        return {k: self.kw[k] for k in _HTTP_OPTIONS if k in self.kw}
+
+    def _project_importer(self, project_name):
+        """ Returns an HttpImporter for the distribution of a PyPI project,
+        as chosen by `resolve()` or pinned in the requirements (if any) """
+        resolved = self.resolved.get(_normalize_project(project_name))
+        if resolved is not None:
+            return HttpImporter(
+                resolved['url'],
+                sha256=resolved.get('hashes', {}).get('sha256'),
+                **self.kw)
 
         version = None
-        # Get the PyPI Project from Module name, if not available use module
-        # root
-        project_name = self.project_matrix.get(module_root, module_root)
         version_tuple = self.version_matrix.get(project_name, (None, None))
         # Parse version tuple ('==', '1.0.0')
         if version_tuple[0] == '==':
             version = version_tuple[1]
 
+        release = _find_pypi_release(
+            project_name,
+            version=version,
+            allowed_dists=self.allowed_dists,
+            pypi_url=self.url,
+            mirrors=self.mirrors,
+            http_options=self._http_options(),
+            cache_ttl=self.kw.get('pypi_cache_ttl', 0),
+            cache_dir=self.kw.get('cache_dir'),
+            stale_while_revalidate=self.kw.get('stale_while_revalidate', 0))
+        return HttpImporter(
+            release['url'],
+            sha256=release.get('digests', {}).get('sha256'),
+            **self.kw)
+
+    def _resolve_project(self, project, specifier):
+        """ Returns the distribution chosen for `project` and its requirements, or
+        `None` if the project cannot be resolved """
         try:
-            url = _create_pypi_url(
-                project_name,
-                version=version,
-                allowed_dists=self.allowed_dists,
-                pypi_url=self.url)
-            importer = HttpImporter(url, **self.kw)
-            found = importer.find_module(module_name)
-            if found:
+            return self._resolve_distribution(project, specifier)
+        except (KeyError, ModuleNotFoundError, URLError, ImportError) as e:
+            logger.warning("[-] PyPI project '%s' could not be resolved: %s" % (project, e))
+            return None
+
+    def _resolve_distribution(self, project, specifier):
+        files = _pypi_simple_files(
+            project, self.simple_url, http_options=self._http_options(),
+            cache_ttl=self.kw.get('pypi_cache_ttl', 0),
+            cache_dir=self.kw.get('cache_dir'),
+            stale_while_revalidate=self.kw.get('stale_while_revalidate', 0))
+        file_ = _select_distribution(files, specifier, self.allowed_dists)
+        if file_ is None:
+            raise KeyError(
+                "No compatible distribution found for %s%s" % (project, specifier))
+        metadata = _fetch_core_metadata(
+            file_, http_options=self._http_options(),
+            cache_dir=self.kw.get('cache_dir'))
+        requires = metadata.get_all('Requires-Dist', []) if metadata else []
+        return file_, requires
+
+    def resolve(self, workers=None):
+        """ Resolves the requirements and their transitive dependencies, using only
+        the JSON Simple API (PEP 691) and the core metadata served next to each
+        distribution (PEP 658), without downloading any distribution.
+        The chosen versions are pinned in `version_matrix`.
+
+        Args:
+            workers (int): The number of concurrent queries. Defaults to `preload_workers`
+
+        Returns:
+            dict: The normalized names of all projects mapped to their chosen versions
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        if self.simple_url is None:
+            raise ValueError(
+                "The Simple API URL of '%s' is not known. Set 'simple_url'" % self.url)
+        pending = {}
+        for project, version_tuple in self.version_matrix.items():
+            pending[_normalize_project(project)] = ''.join(
+                part for part in version_tuple if part)
+        with ThreadPoolExecutor(max_workers=workers or self.preload_workers) as executor:
+            while pending:
+                logger.info("[*] Resolving PyPI projects: %s" % sorted(pending))
+                results = executor.map(
+                    lambda item: (item[0], self._resolve_project(*item)),
+                    pending.items())
+                discovered = {}
+                for project, result in results:
+                    if result is None:
+                        continue
+                    file_, requires = result
+                    self.resolved[project] = file_
+                    for line in requires:
+                        requirement = _parse_requirement(line)
+                        if requirement is None or not _marker_matches(requirement[2]):
+                            continue
+                        dependency = _normalize_project(requirement[0])
+                        if dependency in pending or dependency in discovered:
+                            continue
+                        if dependency in self.resolved:
+                            chosen = self.resolved[dependency]['version']
+                            if not _specifier_matches(chosen, requirement[1]):
+                                logger.warning(
+                                    "[-] '%s' requires %s%s, but version '%s' was chosen" %
+                                    (project, dependency, requirement[1], chosen))
+                            continue
+                        logger.info(
+                            "[+] PyPI project '%s' depends on '%s'" % (project, line))
+                        discovered[dependency] = requirement[1]
+                pending = discovered
+
+        for project, file_ in self.resolved.items():
+            self.version_matrix.setdefault(project, ('==', file_['version']))
+        return {project: file_['version'] for project, file_ in self.resolved.items()}
+
+    def preload(self, workers=None, dependencies=None):
+        """ Resolves all projects found in the requirements, downloads their distributions
+        concurrently and creates their HttpImporter objects, so later imports
+        do not wait on PyPI.
+
+        Args:
+            workers (int): The number of concurrent downloads. Defaults to `preload_workers`
+            dependencies (bool): Also preload the dependencies of the requirements,
+                found through `resolve()`. Defaults to `resolve_dependencies`
+
+        Returns:
+            dict: The module roots that can be imported, mapped to their HttpImporter objects
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        if dependencies is None:
+            dependencies = self.resolve_dependencies
+        if dependencies:
+            self.resolve(workers)
+            # 'version_matrix' also contains the dependencies now
+            projects = list(self.resolved)
+        else:
+            projects = list(self.version_matrix)
+        logger.info("[*] Preloading PyPI projects: %s" % projects)
+        preloaded = {}
+        with ThreadPoolExecutor(max_workers=workers or self.preload_workers) as executor:
+            futures = {
+                executor.submit(self._project_importer, project): project
+                for project in projects}
+            for future in as_completed(futures):
+                project = futures[future]
+                try:
+                    importer = future.result()
+                except (KeyError, ModuleNotFoundError, URLError, ImportError) as e:
+                    logger.warning(
+                        "[-] PyPI project '%s' could not be preloaded: %s" % (project, e))
+                    continue
+                roots = {module for module, project_name in self.project_matrix.items()
+                         if _normalize_project(project_name) == _normalize_project(project)}
+                if importer.archive is not None:
+                    roots.update(_archive_top_level_modules(importer.archive))
+                if not roots:
+                    roots.add(project.replace('-', '_'))
+                for root in roots:
+                    preloaded[root] = self.module_importers.setdefault(root, importer)
                 logger.info(
-                    "[+] Module '%s' can be loaded from PyPI project '%s'. URL: '%s'" %
-                    (module_name, project_name, url))
-                self.module_importers[module_root] = found
-                return found
+                    "[+] PyPI project '%s' preloaded for modules: %s" %
+                    (project, sorted(roots)))
+        return preloaded
+
+    def warm(self, modules):
+        """ Fetches and compiles modules ahead of time. See `HttpImporter.warm`
+
+        Args:
+            modules (list): The names of the modules/packages to warm
 
-        except (KeyError, ModuleNotFoundError) as e:
-            logger.warning("[-] %s" % e)
+        Returns:
+            list: The names of the warmed modules/packages
+        """
+        warmed = []
+        for name in modules:
+            importer = self.find_module(name)
+            if importer is None:
+                raise ImportError("Module '%s' cannot be warmed from PyPI" % name)
+            warmed += [fullname for fullname in importer.warm([name])
+                       if fullname not in warmed]
+        return warmed
+
+    def find_module(self, module_name, path=None):
+        logger.info(
+            "[*] Trying to find PyPI module '%s', path: '%s'" %
+            (module_name, path))
+        module_root = module_name.split('.')[0]
+        # Concurrent imports from the same project download it only once
+        with self._root_locks[module_root]:
+            if module_root in self.module_importers:
+                return self.module_importers[module_root]
+
+            # Get the PyPI Project from Module name, if not available use module
+            # root
+            project_name = self.project_matrix.get(module_root, module_root)
+
+            try:
+                importer = self._project_importer(project_name)
+                found = importer.find_module(module_name)
+                if found:
+                    logger.info(
+                        "[+] Module '%s' can be loaded from PyPI project '%s'. URL: '%s'" %
+                        (module_name, project_name, importer.url))
+                    self.module_importers[module_root] = found
+                    return found
+
+            except (KeyError, ModuleNotFoundError, URLError) as e:
+                logger.warning("[-] %s" % e)
         # Could not load module from PyPI
         logger.warning(
             "[-] Module '%s' cannot be found in PyPI." %
@@ -565,10 +4021,11 @@ releases.
         return None
 
     def find_spec(self, fullname, path, target=None):
-        loader = self.find_module(fullname, path)
+        with _deadline(self.kw.get('import_deadline')):
+            loader = self.find_module(fullname, path)
         if loader is not None:
-            return importlib.machinery.ModuleSpec(
-            fullname, loader)
+            # The spec of the project's Importer tells packages apart
+            return loader.find_spec(fullname, path, target)
         return None
 
     def _create_module(self, fullname, sys_modules=True):
@@ -579,15 +4036,16 @@ releases.
             # Run 'find_module' and see if it returns an HttpImporter
             # object
             spec = self.find_spec(fullname, None)
-            if type(spec.loader) != HttpImporter:
+            if spec is None or type(spec.loader) != HttpImporter:
                 logger.info(
                     "[-] Module '%s' has not been found in PyPI. Failing..." % fullname)
                 # If it is not loadable ('find_module' did not return HttpImporter):
                 raise ImportError(
                     "Module '%s' cannot be loaded from PyPI" %
                     (fullname))
-        self.module_importers[module_root].create_module(spec)
-        return self.module_importers[module_root]._create_module(fullname, sys_modules)
+        importer = self.module_importers[module_root]
+        importer.create_module(importlib.machinery.ModuleSpec(fullname, importer))
+        return importer._create_module(fullname, sys_modules)
 
     def load_module(self, fullname):
         logger.info(
@@ -627,7 +4085,135 @@ def __create_git_url(service, username=None, repo=None,
         domain=domain, user=username, repo=repo, ref=ref)
 
 
+def __resolve_git_ref(service, username, repo, ref, domain=None, options={}):
+    """ Resolves a branch or tag of a repository of a Managed Git Service to the commit
+      it points to, through the service's API. Uses the internal `__GIT_SERVICE_ARCHIVES` dict constant.
+
+    Args:
+      service (str): The name of the Git Managed Service (as in the keys of `__GIT_SERVICE_ARCHIVES` dict)
+      username (str): The username which is the repository's owner in the Git Service.
+      repo (str): The name of the repository
+      ref (str): The commit hash, branch or tag to be resolved
+      domain (str): The domain of a self-hosted instance of the service. Can include a scheme
+      options (dict): The profile options (as Importer keyword arguments) of the requests
+
+    Returns:
+      str: The (full) commit hash `ref` points to
+
+    Raises:
+      ImportError: If the commit cannot be resolved
+    """
+    import json
+    from urllib.parse import quote
+
+    if re.match(r'^[0-9a-f]{40}$', ref):
+        # Already a commit
+        return ref
+    endpoints = __GIT_SERVICE_ARCHIVES[service]
+    if domain is None or domain == endpoints['domain']:
+        api = endpoints['api']
+    else:
+        api = (domain if '://' in domain else 'https://' + domain) + endpoints['api_path']
+    url = endpoints['commit'].format(
+        api=api, user=quote(username, safe=''), repo=quote(repo, safe=''),
+        ref=quote(ref, safe=''))
+    HttpImporter._check_url(url, options.get('allow_plaintext', False),
+                            options.get('ca_verify', True))
+    logger.info("[*] Resolving '%s' of '%s/%s' through '%s'..." % (ref, username, repo, url))
+    try:
+        # Revalidated on every use, as branches move
+        resp = _cached_http(
+            url, cache_dir=options.get('cache_dir'),
+            headers=dict(options.get('headers', {}), Accept='application/json'),
+            proxy=options.get('proxy'), ca_verify=options.get('ca_verify', True),
+            ca_file=options.get('ca_file'),
+            **{k: options[k] for k in _HTTP_OPTIONS if k in options})
+    except URLError as e:
+        raise ImportError("[-] '%s' of '%s/%s' cannot be resolved: %s" % (ref, username, repo, e))
+    if resp['code'] != 200:
+        raise ImportError(
+            "[-] URL '%s' returned HTTP Status Code '%d'" % (url, resp['code']))
+    try:
+        sha = json.loads(resp['body'])[endpoints['sha_key']]
+    except (ValueError, KeyError, TypeError):
+        sha = None
+    if not isinstance(sha, str) or not re.match(r'^[0-9a-f]{40}$', sha):
+        raise ImportError(
+            "[-] URL '%s' did not return the commit of '%s' of '%s/%s'" %
+            (url, ref, username, repo))
+    logger.info("[+] '%s' of '%s/%s' is at commit '%s'" % (ref, username, repo, sha))
+    return sha
+
+
+def __create_git_archive_url(service, username=None, repo=None,
+                             sha=None, domain=None):
+    """ Function that creates the URL of the ZIP archive of a commit of a repository
+      in a Managed Git Service. Uses the internal `__GIT_SERVICE_ARCHIVES` dict constant.
+
+    Args:
+      service (str): The name of the Git Managed Service (as in the keys of `__GIT_SERVICE_ARCHIVES` dict)
+      username (str): The username which is the repository's owner in the Git Service.
+      repo (str): The name of the repository that contains the modules/packages to be imported
+      sha (str): The commit hash
+      domain (str): The domain of a self-hosted instance of the service. Can include a scheme
+
+    Returns
+      str: The URL of the archive
+    """
+    endpoints = __GIT_SERVICE_ARCHIVES[service]
+    if domain is None:
+        domain = endpoints['domain']
+    base = domain if '://' in domain else 'https://' + domain
+    return endpoints['archive'].format(base=base, user=username, repo=repo, sha=sha)
+
+
+def __add_git_repo(service, username=None, repo=None, ref='master',
+                   domain=None, profile=None, archive=False):
+    """ Adds an HttpImporter for a repository of a Managed Git Service to the `sys.meta_path`.
+      Without `archive`, its files are fetched one by one from the raw content host of the
+      service. With `archive`, `ref` is resolved to a commit and the archive of the commit
+      is downloaded in a single request. Its content never changes, so it is cached (in
+      `cache-dir`) for good
+
+    Returns
+      str: The URL of the HttpImporter added
+    """
+    if not archive:
+        url = __create_git_url(service, username, repo, ref=ref, domain=domain)
+        add_remote_repo(url=url, profile=profile)
+        return url
+    options = __extract_profile_options(profile=profile)
+    sha = __resolve_git_ref(service, username, repo, ref, domain=domain, options=options)
+    url = __create_git_archive_url(service, username, repo, sha, domain=domain)
+    add_remote_repo(url=url, profile=profile, strip_prefix=True, immutable=True)
+    return url
+
+
+# Compiled profile options, cached by (url, profile). Cleared by 'set_profile'
+_COMPILED_PROFILES = {}
+
+
 def __extract_profile_options(url=None, profile=None):
+    """ Returns the options of a profile (or URL) as Importer keyword arguments.
+    Profiles are compiled once and cached until `set_profile` is called.
+
+    Args:
+        url (str): The URL to find a profile for
+        profile (str): The name of the profile
+
+    Returns:
+        dict: The options, that the caller is free to modify
+    """
+    key = (url, profile)
+    compiled = _COMPILED_PROFILES.get(key)
+    if compiled is None:
+        compiled = _COMPILED_PROFILES[key] = __compile_profile_options(url, profile)
+    # Callers get their own copies of the mutable options
+    return {option: dict(value) if isinstance(value, MappingProxyType) else value
+            for option, value in compiled.items()}
+
+
+def __compile_profile_options(url=None, profile=None):
     if profile:
         # If there is a profile name set - try it
         options = _get_options(profile)
@@ -644,6 +4230,7 @@ def __extract_profile_options(url=None, profile=None):
 
     proxy = options['proxy-url']
     zip_pwd = bytes(options['zip-password'], 'utf8')
+    zip_decrypt_all = options['zip-decrypt-all'].lower() in ['true', 'yes', '1']
 
     # Parse header dict from str lines
     headers = {
@@ -659,6 +4246,38 @@ def __extract_profile_options(url=None, profile=None):
 
     ca_file = None if not options['ca-file'] else options['ca-file']
 
+    mirrors = [line.strip() for line in options['mirrors'].splitlines()
+               if line.strip()]
+    hedge_percentile = float(options['hedge-percentile'])
+
+    # Parse timeouts, retries and circuit breaker settings
+    connect_timeout = _parse_seconds(options['connect-timeout'])
+    read_timeout = _parse_seconds(options['read-timeout'])
+    import_deadline = _parse_seconds(options['import-deadline'])
+    retries = int(options['retries'] or 0)
+    retry_backoff = float(options['retry-backoff'] or 0)
+    breaker_threshold = int(options['circuit-breaker-threshold'] or 0)
+    breaker_cooldown = float(options['circuit-breaker-cooldown'] or 0)
+
+    offline = options['offline'].lower() in ['true', 'yes', '1']
+    transport = options['transport'] or None
+    manifest = None if options['manifest'].lower() in ['auto', ''] else \
+        options['manifest'].lower() in ['true', 'yes', '1']
+    allow_compiled = options['allow-compiled'].lower() in ['true', 'yes', '1']
+    batch = options['batch'].lower() in ['true', 'yes', '1']
+    listing = options['directory-listing'].lower() in ['true', 'yes', '1']
+    webdav = options['webdav'].lower() in ['true', 'yes', '1']
+    cache_dir = os.path.expanduser(options['cache-dir']) \
+        if options['cache-dir'] else None
+    pypi_cache_ttl = float(options['pypi-cache-ttl'] or 0)
+    stale_while_revalidate = float(options['stale-while-revalidate'] or 0)
+    strip_prefix = options['strip-prefix'].lower() in ['true', 'yes', '1']
+    immutable = options['immutable'].lower() in ['true', 'yes', '1']
+    module_cache_bytes = int(options['module-cache-bytes'] or 0)
+    preload = options['preload'].lower() in ['true', 'yes', '1']
+    preload_workers = int(options['preload-workers'] or 1)
+    resolve_dependencies = options['resolve-dependencies'].lower() in ['true', 'yes', '1']
+
     # Get PyPI requirements
     requirements_file = options['requirements-file']
     requirements = options['requirements']
@@ -688,32 +4307,60 @@ def __extract_profile_options(url=None, profile=None):
         if line
     }
 
-    return {
-        'headers': headers,
+    return MappingProxyType({
+        'headers': MappingProxyType(headers),
         'proxy': proxy,
         'url': url,
         'zip_pwd': zip_pwd,
+        'zip_decrypt_all': zip_decrypt_all,
         'allow_plaintext': allow_plaintext,
-        'version_matrix': version_matrix,
-        'project_matrix': project_matrix,
+        'version_matrix': MappingProxyType(version_matrix),
+        'project_matrix': MappingProxyType(project_matrix),
         'ca_verify': ca_verify,
-        'ca_file': ca_file
-    }
+        'ca_file': ca_file,
+        'mirrors': tuple(mirrors),
+        'hedge_percentile': hedge_percentile,
+        'connect_timeout': connect_timeout,
+        'read_timeout': read_timeout,
+        'import_deadline': import_deadline,
+        'retries': retries,
+        'retry_backoff': retry_backoff,
+        'breaker_threshold': breaker_threshold,
+        'breaker_cooldown': breaker_cooldown,
+        'offline': offline,
+        'transport': transport,
+        'manifest': manifest,
+        'allow_compiled': allow_compiled,
+        'batch': batch,
+        'listing': listing,
+        'webdav': webdav,
+        'cache_dir': cache_dir,
+        'pypi_cache_ttl': pypi_cache_ttl,
+        'stale_while_revalidate': stale_while_revalidate,
+        'strip_prefix': strip_prefix,
+        'immutable': immutable,
+        'module_cache_bytes': module_cache_bytes,
+        'preload': preload,
+        'preload_workers': preload_workers,
+        'resolve_dependencies': resolve_dependencies,
+    })
 
 # ====================== Features ======================
 
 
 def set_profile(ini_str):
-    global CONFIG
-    CONFIG.read_string(ini_str)
+    _config().read_string(ini_str)
+    # Profiles are compiled again on their next use
+    _COMPILED_PROFILES.clear()
 
 
-def add_remote_repo(url=None, profile=None, importer_class=HttpImporter):
+def add_remote_repo(url=None, profile=None, importer_class=HttpImporter, **kw):
     """ Creates an HttpImporter object and adds it to the `sys.meta_path`.
 
     Args:
       url (str): The URL of an HTTP/WebDav directory (either listable or not)
     or of an archive (supported: .zip, .tar, .tar.bz, .tar.gz, .tar.xz - Python3 only)
+      **kw (dict): Importer parameters overriding the options of the profile
 
     Returns:
       HttpImporter: The `HttpImporter` object added to the `sys.meta_path`
@@ -721,6 +4368,7 @@ def add_remote_repo(url=None, profile=None, importer_class=HttpImporter):
     options = __extract_profile_options(url, profile)
     url = options.get('url', url)
     del options['url']
+    options.update(kw)
     logger.debug(
         "[*] Adding '%s' (profile: %s) with options: %s " %
         (importer_class, profile, options))
@@ -775,7 +4423,7 @@ def remote_repo(url=None, profile=None):
 
 @contextmanager
 def github_repo(username=None, repo=None, ref='master',
-                domain=None, profile=None):
+                domain=None, profile=None, archive=False):
     """ Context Manager that enables importing modules/packages from Github repositories.
 
     Args:
@@ -783,11 +4431,13 @@ def github_repo(username=None, repo=None, ref='master',
       repo (str): The name of the repository that contains the modules/packages to be imported
       ref (str): The commit hash, branch or tag to be fetched
       domain (str): The domain to be used for the URL (service domains service raw content)
+      archive (bool): Resolve `ref` to a commit and download the archive of the commit in a
+        single request, instead of fetching each file. `domain` is then the domain of the
+        (self-hosted) service, and can include a scheme
 
     """
-    url = __create_git_url('github',
-                           username, repo, ref=ref, domain=domain)
-    add_remote_repo(url=url, profile=profile)
+    url = __add_git_repo('github', username, repo, ref=ref,
+                         domain=domain, profile=profile, archive=archive)
     try:
         yield
     except ImportError as e:
@@ -798,7 +4448,7 @@ def github_repo(username=None, repo=None, ref='master',
 
 @contextmanager
 def bitbucket_repo(username=None, repo=None, ref='master',
-                   domain=None, profile=None):
+                   domain=None, profile=None, archive=False):
     """ Context Manager that enables importing modules/packages from Bitbucket repositories.
 
     Args:
@@ -806,11 +4456,13 @@ def bitbucket_repo(username=None, repo=None, ref='master',
       repo (str): The name of the repository that contains the modules/packages to be imported
       ref (str): The commit hash, branch or tag to be fetched
       domain (str): The domain to be used for the URL (service domains service raw content)
+      archive (bool): Resolve `ref` to a commit and download the archive of the commit in a
+        single request, instead of fetching each file. `domain` is then the domain of the
+        (self-hosted) service, and can include a scheme
 
     """
-    url = __create_git_url('bitbucket',
-                           username, repo, ref=ref, domain=domain)
-    add_remote_repo(url=url, profile=profile)
+    url = __add_git_repo('bitbucket', username, repo, ref=ref,
+                         domain=domain, profile=profile, archive=archive)
     try:
         yield
     except ImportError as e:
@@ -821,7 +4473,7 @@ def bitbucket_repo(username=None, repo=None, ref='master',
 
 @contextmanager
 def gitlab_repo(username=None, repo=None, ref='master',
-                domain='gitlab.com', profile=None):
+                domain='gitlab.com', profile=None, archive=False):
     """ Context Manager that enables importing modules/packages from Gitlab repositories.
 
     Args:
@@ -829,11 +4481,13 @@ def gitlab_repo(username=None, repo=None, ref='master',
       repo (str): The name of the repository that contains the modules/packages to be imported
       ref (str): The commit hash, branch or tag to be fetched
       domain (str): The domain to be used for the URL (service domains service raw content)
+      archive (bool): Resolve `ref` to a commit and download the archive of the commit in a
+        single request, instead of fetching each file. `domain` is then the domain of the
+        (self-hosted) service, and can include a scheme
 
     """
-    url = __create_git_url('gitlab',
-                           username, repo, ref=ref, domain=domain)
-    add_remote_repo(url=url, profile=profile)
+    url = __add_git_repo('gitlab', username, repo, ref=ref,
+                         domain=domain, profile=profile, archive=archive)
     try:
         yield
     except ImportError as e:
@@ -862,6 +4516,640 @@ def load(module_name, url=None, profile=None, importer_class=HttpImporter):
     raise ImportError(
         "Module '%s' cannot be imported from URL: '%s'" % (module_name, url))
 
+
+def warm(modules, url=None, profile=None, importer_class=HttpImporter):
+    """ Adds an Importer to the `sys.meta_path` and warms a set of modules through it.
+    Call it before forking worker processes, so that they share the fetched and compiled
+    modules and import them without any network activity.
+  Example (gunicorn.conf.py):
+
+  >>> httpimport.warm(['mypackage.app'], url='https://example.com/packages.zip')
+
+    Args:
+      modules (list): The names of the modules/packages to warm
+      url (str): The URL to import from
+      profile (str): The profile to use
+
+    Returns:
+      object: The Importer object added to the `sys.meta_path`
+    """
+    importer = add_remote_repo(
+        url=url, profile=profile, importer_class=importer_class)
+    importer.warm(modules)
+    return importer
+
+
+class Watcher(object):
+    """ Watches the modules loaded through the Importers for changes of their remote
+    content, on a background thread, and reports or reloads the changed ones.
+    See `HttpImporter.check_changes`.
+  Example:
+
+  >>> watcher = httpimport.Watcher(interval=30, reload=True).start()
+  >>> watcher.stop()
+
+    Args:
+      interval (float): Seconds between checks
+      reload (bool): Reload the changed modules (`importlib.reload`). Otherwise they
+        are only reported, and their new content is used by the next `importlib.reload`
+      callback (callable): Called with the names of the changed modules
+      importers (list): The Importers to check. Defaults to the ones in `sys.meta_path`
+      workers (int): The number of concurrent requests of each Importer
+    """
+
+    def __init__(self, interval=60, reload=False, callback=None, importers=None, workers=8):
+        self.interval = interval
+        self.reload = reload
+        self.callback = callback
+        self.importers = importers
+        self.workers = workers
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _importers(self):
+        importers = []
+        for importer in self.importers if self.importers is not None else list(sys.meta_path):
+            if isinstance(importer, PyPIImporter):
+                importers.extend(importer.module_importers.values())
+            elif isinstance(importer, HttpImporter):
+                importers.append(importer)
+        # Each Importer once, in order
+        return list(OrderedDict((id(importer), importer) for importer in importers).values())
+
+    def check(self):
+        """ Checks the Importers for changed modules once
+
+        Returns:
+          list: The names of the changed modules
+        """
+        changed = []
+        for importer in self._importers():
+            try:
+                changed.extend(importer.check_changes(workers=self.workers))
+            except (URLError, ImportError) as e:
+                logger.warning("[-] Modules of '%s' cannot be checked: %s" % (importer.url, e))
+        if not changed:
+            return changed
+        logger.warning("[*] Remote modules changed: %s" % changed)
+        if self.reload:
+            # Packages before their submodules
+            for name in sorted(changed):
+                module = sys.modules.get(name)
+                if module is not None:
+                    logger.info("[*] Reloading module '%s'" % name)
+                    importlib.reload(module)
+        if self.callback is not None:
+            self.callback(changed)
+        return changed
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error("[-] Checking remote modules failed: %s" % e)
+
+    def start(self):
+        """ Starts checking every `interval` seconds. Returns the Watcher """
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='httpimport-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """ Stops checking, waiting for a running check to finish """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def _pyc(code, source):
+    """ Returns the content of an unchecked hash-based '.pyc' file (PEP 552),
+    that is valid without its source file
+
+    Args:
+        code (code): The code object compiled from `source`
+        source (bytes): The source of the module
+
+    Returns:
+        bytes: The '.pyc' file content
+    """
+    import importlib.util
+    import marshal
+
+    flags = 0b01  # hash-based, source not checked
+    return (importlib.util.MAGIC_NUMBER + flags.to_bytes(4, 'little') +
+            importlib.util.source_hash(source) + marshal.dumps(code))
+
+
+def freeze(path, modules=None):
+    """ Writes modules imported through `httpimport` to a ZIP file of precompiled
+    '.pyc' files, importable with the standard `zipimport` (by adding `path` to
+    `sys.path`) without network access. The original URLs are kept in the
+    `FREEZE_METADATA` file of the ZIP.
+  Example:
+
+  >>> with httpimport.remote_repo('https://example.com/packages/'):
+  ...   import mypackage
+  >>> httpimport.freeze('bundle.zip')
+  ['mypackage']
+
+    Args:
+      path (str): The path of the ZIP file to write
+      modules (list): The names of the modules/packages to freeze (imported if needed),
+        along with their parent packages. Defaults to all modules imported through `httpimport`
+
+    Returns:
+      list: The names of the frozen modules/packages
+
+    Raises:
+      ValueError: If a module has not been imported through `httpimport`,
+        or is a native extension module
+    """
+    import hashlib
+    import json
+    import zipfile
+
+    if modules is None:
+        modules = [name for name, module in list(sys.modules.items())
+                   if isinstance(getattr(module, '__loader__', None), HttpImporter)]
+    else:
+        for name in modules:
+            importlib.import_module(name)
+        # Parent packages are needed to import the modules from the ZIP
+        modules = {'.'.join(name.split('.')[:i + 1])
+                   for name in modules for i in range(name.count('.') + 1)}
+
+    metadata = {
+        'httpimport': __version__,
+        'python': '%d.%d' % sys.version_info[:2],
+        'modules': {},
+    }
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as bundle:
+        for name in sorted(modules):
+            module = sys.modules[name]
+            loader = getattr(module, '__loader__', None)
+            if not isinstance(loader, HttpImporter) or name not in loader.modules:
+                raise ValueError(
+                    "Module '%s' has not been imported through 'httpimport'" % name)
+            record = loader.modules[name]
+            if record.extension:
+                raise ValueError(
+                    "Extension module '%s' cannot be imported through 'zipimport'" % name)
+            source = loader._read_source(record)
+            code = record.code or _SOURCE_STORE.compile(source, record.filepath)
+            filename = name.replace('.', '/') + \
+                ('/__init__.pyc' if record.package else '.pyc')
+            bundle.writestr(filename, _pyc(code, source))
+            metadata['modules'][name] = {
+                'url': record.filepath,
+                'sha256': hashlib.sha256(source).hexdigest(),
+                'package': record.package,
+            }
+            logger.info("[+] Frozen '%s' from '%s'" % (name, record.filepath))
+        bundle.writestr(FREEZE_METADATA, json.dumps(metadata, indent=2, sort_keys=True))
+    return sorted(metadata['modules'])
+
+
+# Compiles the '.py' files given as JSON '[path, display path]' pairs in stdin,
+# with the interpreter that runs it, and prints its cache tag (e.g. 'cpython-311')
+_COMPILE_SCRIPT = """
+import json, py_compile, sys
+for path, dfile in json.load(sys.stdin):
+    py_compile.compile(path, dfile=dfile, doraise=True,
+                       invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+print(sys.implementation.cache_tag)
+"""
+
+
+def publish(source, output, pythons=None, compress=True, bundles=False, batch=None):
+    """ Creates a repository optimized for `HttpImporter` from a directory of
+    modules/packages. The repository can be served by any static HTTP server
+    and contains:
+
+    * the '.py' files, so it works as a plain web directory too
+    * a manifest (`MANIFEST`) listing the modules with their SHA256 digests,
+      so importers do not probe for paths
+    * precompiled '.pyc' files (in `__pycache__` directories) for each interpreter
+      of `pythons`, loaded by importers with `allow_compiled`
+    * '.gz' (and '.zst', if `zstandard` is installed) siblings of every file
+    * a ZIP bundle for each top-level package, fetched by importers at once
+    * the data files of the packages, listed in the manifest for `importlib.resources`
+
+  Example:
+
+  >>> httpimport.publish('src/', 'public/', pythons=['python3.11', 'python3.12'])
+
+    Args:
+      source (str): The directory containing the modules/packages
+      output (str): The directory to write the repository to
+      pythons (list): The interpreters to precompile '.pyc' files for.
+        Defaults to the running interpreter
+      compress (bool): Write compressed siblings of the files
+      bundles (bool): Write a ZIP bundle for each top-level package
+      batch (str): The path of the batch endpoint of the server of the repository
+        (e.g. `BATCH_PATH`, see `serve()`), listed in the manifest
+
+    Returns:
+      dict: The manifest
+    """
+    import gzip
+    import hashlib
+    import json
+    import subprocess
+    import zipfile
+
+    try:
+        import zstandard
+    except ImportError:
+        zstandard = None
+
+    manifest = {'httpimport': __version__, 'modules': {}, 'bundles': {},
+                'resources': {}, 'encodings': []}
+    if compress:
+        manifest['encodings'] = ['gzip'] + (['zstd'] if zstandard is not None else [])
+    if batch:
+        manifest['batch'] = batch
+
+    def write(path, content):
+        """ Writes a file of the repository along with its compressed siblings """
+        full_path = os.path.join(output, *path.split('/'))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'wb') as f:
+            f.write(content)
+        if 'gzip' in manifest['encodings']:
+            with open(full_path + '.gz', 'wb') as f:
+                f.write(gzip.compress(content, mtime=0))
+        if 'zstd' in manifest['encodings']:
+            with open(full_path + '.zst', 'wb') as f:
+                f.write(zstandard.ZstdCompressor(level=19).compress(content))
+        return full_path
+
+    # Copy the sources
+    sources = {}
+    for root, dirs, files in os.walk(source):
+        dirs[:] = sorted(d for d in dirs
+                         if d != '__pycache__' and not d.startswith('.'))
+        for filename in sorted(files):
+            path = os.path.relpath(os.path.join(root, filename), source).replace(os.sep, '/')
+            if not filename.endswith('.py'):
+                # The data files of packages (see 'importlib.resources')
+                if '/' in path and not filename.endswith(('.pyc', '.pyo')):
+                    with open(os.path.join(root, filename), 'rb') as f:
+                        content = f.read()
+                    manifest['resources'][path] = {
+                        'sha256': hashlib.sha256(content).hexdigest()}
+                    write(path, content)
+                continue
+            name = path[:-len('.py')].replace('/', '.')
+            if name.endswith('.__init__'):
+                name = name[:-len('.__init__')]
+            with open(os.path.join(root, filename), 'rb') as f:
+                content = f.read()
+            sources[name] = (path, content)
+            manifest['modules'][name] = {
+                'path': path,
+                'sha256': hashlib.sha256(content).hexdigest(),
+                'pyc': {},
+            }
+            write(path, content)
+    logger.info("[+] Published %d modules to '%s'" % (len(sources), output))
+
+    # Precompile with each interpreter
+    for python in pythons or [sys.executable]:
+        process = subprocess.run(
+            [python, '-c', _COMPILE_SCRIPT], check=True, capture_output=True,
+            input=json.dumps([[os.path.join(output, *path.split('/')), path]
+                              for path, _ in sources.values()]).encode('utf8'))
+        cache_tag = process.stdout.decode('utf8').strip()
+        for name, (path, _) in sources.items():
+            directory, filename = path.rpartition('/')[::2]
+            pyc_path = (directory + '/' if directory else '') + \
+                '__pycache__/%s.%s.pyc' % (filename[:-len('.py')], cache_tag)
+            pyc_file = os.path.join(output, *pyc_path.split('/'))
+            with open(pyc_file, 'rb') as f:
+                pyc = f.read()
+            write(pyc_path, pyc)
+            manifest['modules'][name]['pyc'][cache_tag] = {
+                'path': pyc_path, 'sha256': hashlib.sha256(pyc).hexdigest()}
+        logger.info("[+] Precompiled modules for '%s' (%s)" % (python, cache_tag))
+
+    if bundles:
+        packages = sorted({name.split('.')[0] for name, (path, _) in sources.items()
+                           if '/' in path})
+        for package in packages:
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as bundle:
+                for name, (path, content) in sorted(sources.items()):
+                    if path.startswith(package + '/'):
+                        info = zipfile.ZipInfo(path, date_time=(1980, 1, 1, 0, 0, 0))
+                        info.compress_type = zipfile.ZIP_DEFLATED
+                        bundle.writestr(info, content)
+            content = buffer.getvalue()
+            # Bundles are already compressed
+            with open(os.path.join(output, package + '.zip'), 'wb') as f:
+                f.write(content)
+            manifest['bundles'][package] = {
+                'path': package + '.zip',
+                'sha256': hashlib.sha256(content).hexdigest()}
+            logger.info("[+] Bundled package '%s'" % package)
+
+    with open(os.path.join(output, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+_BATCH_HANDLER = None
+
+
+def _batch_request_handler():
+    """ Returns the `BatchRequestHandler` class, defined on first use
+    as 'http.server' is slow to import """
+    global _BATCH_HANDLER
+    if _BATCH_HANDLER is not None:
+        return _BATCH_HANDLER
+    import http.server
+    import json
+    import tarfile
+
+    class BatchRequestHandler(http.server.SimpleHTTPRequestHandler):
+        """ The reference server of the batch protocol. Serves a directory like
+        `SimpleHTTPRequestHandler` and answers POST requests to `BATCH_PATH` naming
+        many files (`{"paths": [...]}`) with a TAR archive of the ones found.
+        Every response advertises the endpoint through the `BATCH_HEADER` header,
+        and the manifest of the directory, if any, through `MANIFEST_HEADER`.
+        """
+        # The largest accepted request body
+        max_request_bytes = 1024 * 1024
+
+        def end_headers(self):
+            self.send_header(BATCH_HEADER, BATCH_PATH)
+            if os.path.isfile(self.translate_path('/' + MANIFEST)):
+                self.send_header(MANIFEST_HEADER, MANIFEST)
+            http.server.SimpleHTTPRequestHandler.end_headers(self)
+
+        def do_POST(self):
+            if self.path.split('?', 1)[0].strip('/') != BATCH_PATH:
+                self.send_error(404)
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                if length > self.max_request_bytes:
+                    raise ValueError('request too large')
+                paths = json.loads(self.rfile.read(length))['paths']
+                if not all(isinstance(path, str) for path in paths):
+                    raise ValueError('invalid paths')
+            except (ValueError, KeyError, TypeError):
+                self.send_error(400)
+                return
+            buffer = io.BytesIO()
+            with tarfile.open(fileobj=buffer, mode='w') as archive:
+                for path in paths:
+                    # Drops '..' and absolute components
+                    filepath = self.translate_path('/' + path)
+                    if not os.path.isfile(filepath):
+                        continue
+                    with open(filepath, 'rb') as f:
+                        content = f.read()
+                    info = tarfile.TarInfo(path)
+                    info.size = len(content)
+                    archive.addfile(info, io.BytesIO(content))
+            body = buffer.getvalue()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-tar')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    _BATCH_HANDLER = BatchRequestHandler
+    return _BATCH_HANDLER
+
+
+def serve(directory='.', port=8000, bind=''):
+    """ Serves a directory (e.g. a repository created by `publish()`) over HTTP,
+    with the batch endpoint of `BatchRequestHandler`. Blocks until interrupted.
+
+    Args:
+      directory (str): The directory to serve
+      port (int): The TCP port to listen on
+      bind (str): The address to listen on. Defaults to all interfaces
+    """
+    import http.server
+
+    handler = functools.partial(_batch_request_handler(), directory=directory)
+    with http.server.ThreadingHTTPServer((bind, port), handler) as server:
+        logger.info("[*] Serving '%s' on port %d..." % (directory, port))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+_CACHE_PROXY_HANDLER = None
+
+# The headers of requests and responses that are not passed on by the cache server
+_HOP_BY_HOP_HEADERS = frozenset((
+    'connection', 'keep-alive', 'proxy-connection', 'proxy-authorization', 'proxy-authenticate',
+    'te', 'trailer', 'transfer-encoding', 'upgrade', 'host', 'content-length',
+    # The cache server revalidates its responses itself
+    'if-none-match', 'if-modified-since'))
+
+
+def _cache_proxy_handler():
+    """ Returns the `CacheProxyHandler` class, defined on first use
+    as 'http.server' is slow to import """
+    global _CACHE_PROXY_HANDLER
+    if _CACHE_PROXY_HANDLER is not None:
+        return _CACHE_PROXY_HANDLER
+    import hashlib
+    import http.server
+
+    class CacheProxyHandler(http.server.BaseHTTPRequestHandler):
+        """ A caching forward proxy, sharing the responses of origin servers between the
+        httpimport clients of a host (see `cache_server()`). Clients use it through a
+        'cache+http://' (or 'cache+http+unix://') `proxy-url`, that sends it the absolute
+        URLs of HTTPS requests too. Responses are revalidated with the origins after
+        `ttl` seconds, and answered with '304' when the validators of the clients match.
+        Concurrent requests of a URL share a single request to its origin.
+        """
+        protocol_version = 'HTTP/1.1'
+        # Set by 'cache_server()'
+        cache_dir = None
+        ttl = 0
+        http_options = {}
+        # The largest accepted request body
+        max_request_bytes = 1024 * 1024
+
+        def address_string(self):
+            # Clients of Unix domain sockets have no address
+            return self.client_address[0] if self.client_address else 'unix'
+
+        def log_message(self, format, *args):
+            logger.debug("[*] %s - %s" % (self.address_string(), format % args))
+
+        def _forwarded_headers(self):
+            return {k: v for k, v in self.headers.items()
+                    if k.lower() not in _HOP_BY_HOP_HEADERS}
+
+        def _origin_url(self):
+            if not re.match(r'^https?://', self.path):
+                self.send_error(400, "Only absolute 'http(s)://' URLs are proxied")
+                return None
+            return self.path
+
+        def _not_modified(self, resp_headers):
+            etag = self.headers.get('If-None-Match')
+            if etag is not None:
+                return etag == resp_headers.get('etag')
+            since = self.headers.get('If-Modified-Since')
+            return since is not None and since == resp_headers.get('last-modified')
+
+        def _respond(self, resp):
+            code, body = resp['code'], resp['body']
+            if code == 200 and self._not_modified(resp['headers']):
+                code, body = 304, b''
+            self.send_response(code)
+            for name, value in resp['headers'].items():
+                if name not in _HOP_BY_HOP_HEADERS:
+                    self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = self._origin_url()
+            if url is None:
+                return
+            headers = self._forwarded_headers()
+            # Responses are shared by the clients sending the same headers
+            # (which may hold credentials) only
+            cache_key = url + '#' + hashlib.sha256(
+                repr(sorted((k.lower(), v) for k, v in headers.items())).encode()).hexdigest()
+            try:
+                # Kept on disk only, as the daemon runs for long
+                resp = _cached_http(url, ttl=self.ttl, cache_dir=self.cache_dir,
+                                    headers=headers, cache_key=cache_key, memory=False,
+                                    **self.http_options)
+            except URLError as e:
+                self.send_error(502, "'%s' cannot be fetched: %s" % (url, e))
+                return
+            self._respond(resp)
+
+        def do_POST(self):
+            # Passed on, uncached (e.g. to batch endpoints)
+            url = self._origin_url()
+            if url is None:
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            if length > self.max_request_bytes:
+                self.send_error(413)
+                return
+            try:
+                resp = http(url, headers=self._forwarded_headers(), method='POST',
+                            data=self.rfile.read(length), **self.http_options)
+            except URLError as e:
+                self.send_error(502, "'%s' cannot be fetched: %s" % (url, e))
+                return
+            self._respond(resp)
+
+        def do_CONNECT(self):
+            # Tunnels cannot be cached
+            self.send_error(501, "Use a 'cache+http://' proxy URL")
+
+    _CACHE_PROXY_HANDLER = CacheProxyHandler
+    return _CACHE_PROXY_HANDLER
+
+
+def _cache_proxy_server(port=8010, bind='127.0.0.1', unix_socket=None, cache_dir=None,
+                        ttl=0, profile=None):
+    """ Returns the (not yet serving) server of `cache_server()` """
+    import http.server
+    import shutil
+    import socketserver
+    import stat
+    import tempfile
+
+    options = __extract_profile_options(profile=profile)
+    cache_dir = cache_dir or options['cache_dir']
+    temporary_dir = None
+    if not cache_dir:
+        # Responses are not kept in memory, as it would grow without limit
+        cache_dir = temporary_dir = tempfile.mkdtemp(prefix='httpimport-cache-server-')
+        logger.info("[*] Caching responses in the temporary directory '%s'" % cache_dir)
+    http_options = {k: options[k] for k in _HTTP_OPTIONS if k in options}
+    http_options.update(ca_verify=options['ca_verify'], ca_file=options['ca_file'])
+    if options['proxy'] and options['proxy'].lower().startswith('cache+'):
+        # The clients' configuration, pointing to this server
+        logger.warning("[-] Ignoring the cache server proxy '%s'" % options['proxy'])
+    elif options['proxy']:
+        http_options['proxy'] = options['proxy']
+    handler = type('CacheProxyHandler', (_cache_proxy_handler(),), {
+        'cache_dir': cache_dir,
+        'ttl': ttl,
+        'http_options': http_options,
+    })
+
+    class TCPHTTPServer(http.server.ThreadingHTTPServer):
+
+        def server_close(self):
+            http.server.ThreadingHTTPServer.server_close(self)
+            if temporary_dir is not None:
+                shutil.rmtree(temporary_dir, ignore_errors=True)
+
+    if unix_socket is None:
+        return TCPHTTPServer((bind, port), handler)
+
+    class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def server_close(self):
+            socketserver.UnixStreamServer.server_close(self)
+            os.unlink(self.server_address)
+            if temporary_dir is not None:
+                shutil.rmtree(temporary_dir, ignore_errors=True)
+
+    try:
+        # Left behind by a server that did not exit cleanly
+        if stat.S_ISSOCK(os.stat(unix_socket).st_mode):
+            os.unlink(unix_socket)
+    except FileNotFoundError:
+        pass
+    return UnixHTTPServer(unix_socket, handler)
+
+
+def cache_server(port=8010, bind='127.0.0.1', unix_socket=None, cache_dir=None,
+                 ttl=0, profile=None):
+    """ Runs a caching forward proxy for the httpimport clients of a host, so that
+    the responses of origin servers are fetched once for all processes. Clients use
+    it through the `proxy-url` profile option ('cache+http://127.0.0.1:8010' or
+    'cache+http+unix://<percent-encoded socket path>'). Blocks until interrupted.
+
+    Args:
+      port (int): The TCP port to listen on
+      bind (str): The address to listen on. Defaults to the loopback interface
+      unix_socket (str): The path of a Unix domain socket to listen on, instead of TCP
+      cache_dir (str): The directory of the shared on-disk cache. Defaults to the
+        `cache-dir` of the profile, or to a temporary directory removed on exit
+      ttl (float): Seconds that responses are served without revalidating them with the origins
+      profile (str): The profile of the requests to the origins (timeouts, retries, TLS, proxy)
+    """
+    with _cache_proxy_server(port, bind, unix_socket, cache_dir, ttl, profile) as server:
+        logger.info("[*] Cache server listening on %s..." % (unix_socket or '%s:%d' % (bind, port)))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
 @contextmanager
 def pypi_repo(url='https://pypi.org/pypi/%s/json', profile=None):
     """ Context Manager that provides remote import functionality from PyPI
@@ -884,32 +5172,162 @@ def pypi_repo(url='https://pypi.org/pypi/%s/json', profile=None):
 # ====================== Runtime ======================
 
 
-# Load the catch-all configuration
-set_profile(_DEFAULT_INI_CONFIG)
+def _config():
+    """ Returns the configuration. It is loaded on first use (a profile lookup or
+    `set_profile`), so that 'import httpimport' does not read any files """
+    global CONFIG
+    with _CONFIG_LOCK:
+        if 'CONFIG' in globals():
+            return CONFIG
+        from configparser import ConfigParser
 
-# Try to load the user config file
-try:
-    with open(_DEFAULT_INI_CONFIG_FILENAME) as f:
-        logger.info(
-            "[*] Loading configuration from '%s'" %
-            _DEFAULT_INI_CONFIG_FILENAME)
-        set_profile(f.read())
-except FileNotFoundError:
-    logger.info("[*] File '%s' not available." % _DEFAULT_INI_CONFIG_FILENAME)
-
-# Try to load the user config directory
-try:
-    for config_file in os.listdir(_DEFAULT_INI_CONFIG_DIR_NAME):
-        with open(config_file) as f:
-            logger.info("[*] Loading configuration from '%s'" % config_file)
-            set_profile(f.read())
-except FileNotFoundError:
-    logger.info(
-        "[*] Directory '%s' not available." %
-        _DEFAULT_INI_CONFIG_DIR_NAME)
+        config = ConfigParser()
+        # Load the catch-all configuration
+        config.read_string(_DEFAULT_INI_CONFIG)
+
+        # Try to load the user config file
+        try:
+            with open(_DEFAULT_INI_CONFIG_FILENAME) as f:
+                logger.info(
+                    "[*] Loading configuration from '%s'" %
+                    _DEFAULT_INI_CONFIG_FILENAME)
+                config.read_string(f.read())
+        except FileNotFoundError:
+            logger.info("[*] File '%s' not available." % _DEFAULT_INI_CONFIG_FILENAME)
+
+        # Try to load the user config directory
+        try:
+            for config_file in sorted(os.listdir(_DEFAULT_INI_CONFIG_DIR_NAME)):
+                config_file = os.path.join(_DEFAULT_INI_CONFIG_DIR_NAME, config_file)
+                with open(config_file) as f:
+                    logger.info("[*] Loading configuration from '%s'" % config_file)
+                    config.read_string(f.read())
+        except FileNotFoundError:
+            logger.info(
+                "[*] Directory '%s' not available." %
+                _DEFAULT_INI_CONFIG_DIR_NAME)
+
+        CONFIG = config
+        return CONFIG
+
+
+def __getattr__(name):
+    # 'httpimport.CONFIG' is loaded on first access
+    if name == 'CONFIG':
+        return _config()
+    if name == 'BatchRequestHandler':
+        return _batch_request_handler()
+    if name == 'CacheProxyHandler':
+        return _cache_proxy_handler()
+    raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
 
 # ====================== Main ======================
 
+
+def main(argv=None):
+    """ The command line interface (`python -m httpimport`) """
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog='python -m httpimport',
+        description='Import Python modules and packages from HTTP/S locations')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='log every step')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+    commands.required = True
+
+    freeze_parser = commands.add_parser(
+        'freeze', help='import modules and write them to a ZIP for zipimport')
+    freeze_parser.add_argument('modules', nargs='+', metavar='module',
+                               help='the modules/packages to freeze')
+    freeze_parser.add_argument('-o', '--output', required=True,
+                               help='the ZIP file to write')
+    freeze_parser.add_argument('--url', help='the URL to import from')
+    freeze_parser.add_argument('--profile', help='the profile to use')
+    freeze_parser.add_argument('--pypi', action='store_true',
+                               help='import from PyPI (or the PyPI-like --url)')
+    freeze_parser.add_argument('--insecure', action='store_true',
+                               help='allow plaintext HTTP URLs')
+
+    publish_parser = commands.add_parser(
+        'publish', help='create a repository optimized for httpimport')
+    publish_parser.add_argument('source', help='the directory of the modules/packages')
+    publish_parser.add_argument('output', help='the directory to write the repository to')
+    publish_parser.add_argument(
+        '--python', action='append', dest='pythons', metavar='PYTHON',
+        help='an interpreter to precompile .pyc files for (repeatable, '
+             'defaults to the running one)')
+    publish_parser.add_argument('--no-compress', action='store_false', dest='compress',
+                                help='do not write .gz/.zst files')
+    publish_parser.add_argument('--bundles', action='store_true',
+                                help='write a ZIP bundle for each top-level package')
+    publish_parser.add_argument(
+        '--batch', nargs='?', const=BATCH_PATH, metavar='PATH',
+        help='list the batch endpoint of the server in the manifest '
+             '(defaults to the one of "serve": %s)' % BATCH_PATH)
+
+    serve_parser = commands.add_parser(
+        'serve', help='serve a directory, with a batch endpoint for httpimport')
+    serve_parser.add_argument('directory', nargs='?', default='.',
+                              help='the directory to serve (default: current)')
+    serve_parser.add_argument('-p', '--port', type=int, default=8000,
+                              help='the port to listen on (default: 8000)')
+    serve_parser.add_argument('-b', '--bind', default='',
+                              help='the address to listen on (default: all)')
+
+    cache_server_parser = commands.add_parser(
+        'cache-server', help='run a caching proxy shared by the httpimport clients of a host')
+    cache_server_parser.add_argument('-p', '--port', type=int, default=8010,
+                                     help='the port to listen on (default: 8010)')
+    cache_server_parser.add_argument('-b', '--bind', default='127.0.0.1',
+                                     help='the address to listen on (default: 127.0.0.1)')
+    cache_server_parser.add_argument('--unix-socket', metavar='PATH',
+                                     help='listen on a Unix domain socket instead')
+    cache_server_parser.add_argument('--cache-dir',
+                                     help='the directory of the shared on-disk cache '
+                                          '(default: the cache-dir of the profile)')
+    cache_server_parser.add_argument('--ttl', type=float, default=0,
+                                     help='seconds responses are served without '
+                                          'revalidation (default: 0)')
+    cache_server_parser.add_argument('--profile',
+                                     help='the profile of the requests to the origins')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(format=log_format)
+    logger.setLevel(logging.INFO if args.verbose else log_level)
+
+    if args.command == 'freeze':
+        global INSECURE
+        INSECURE = INSECURE or args.insecure
+        if args.pypi:
+            importer = add_remote_repo(
+                url=args.url or 'https://pypi.org/pypi/%s/json',
+                profile=args.profile, importer_class=PyPIImporter)
+        else:
+            importer = add_remote_repo(url=args.url, profile=args.profile)
+        try:
+            for name in freeze(args.output, args.modules):
+                print(name)
+        finally:
+            sys.meta_path.remove(importer)
+    elif args.command == 'publish':
+        manifest = publish(args.source, args.output, pythons=args.pythons,
+                           compress=args.compress, bundles=args.bundles,
+                           batch=args.batch)
+        for name in sorted(manifest['modules']):
+            print(name)
+    elif args.command == 'serve':
+        print("Serving '%s' on port %d" % (args.directory, args.port))
+        serve(args.directory, port=args.port, bind=args.bind)
+    elif args.command == 'cache-server':
+        if args.unix_socket:
+            print("Cache server listening on '%s'" % args.unix_socket)
+        else:
+            print("Cache server listening on %s:%d" % (args.bind, args.port))
+        cache_server(port=args.port, bind=args.bind, unix_socket=args.unix_socket,
+                     cache_dir=args.cache_dir, ttl=args.ttl, profile=args.profile)
+    return 0
+
+
 if __name__ == '__main__':
-    logger.warning("[-] This module cannot be called directly!")
-    pass
+    sys.exit(main())
@@ -1,5 +1,8 @@
+import atexit
 import logging
+import shutil
 import sys
+import tempfile
 import unittest
 
 import httpimport
@@ -23,10 +26,23 @@ BASIC_AUTH_PORT = 8001
 BASIC_AUTH_PROXY_PORT = 8081
 HTTPS_PORT = 8443
 PROXY_TLS_PORT = 8480
+MIRROR_PORT = 8002
+SLOW_PORT = 8003
+PYPI_PORT = 8004
+PUBLISHED_PORT = 8005
+BATCH_PORT = 8006
+GIT_PORT = 8007
+WEBDAV_PORT = 8008
+DEAD_PORT = 8009  # Nothing listens here
+
+SLOW_DELAY = 3  # seconds
 
 BASIC_AUTH_CREDS = 'dXNlcm5hbWU6cGFzc3dvcmQ='  # username:password
 ZIP_PASSWORD = 'P@ssw0rd!'
 WEB_DIRECTORY = 'test_web_directory/'
+# Served through 'httpd_published', for repositories created by 'httpimport.publish'
+PUBLISHED_DIRECTORY = tempfile.mkdtemp(prefix='httpimport-published-')
+atexit.register(shutil.rmtree, PUBLISHED_DIRECTORY, ignore_errors=True)
 PROXY_HEADER = ('x-proxy', 'httpimport-proxy')
 HTTPS_CERT = 'tests/certs/server.pem'
 PROXY_TLS_CERT = 'tests/certs/proxy.pem'
@@ -41,8 +57,10 @@ TEST_MODULES = [
     'test_package.a',
     'test_package.b',
     'test_package.c',
+    'test_package.a.mod',
     'test_package.b.mod',
     'test_package.b.mod2',
+    'watched',
     'dependent_package',
 
     'sample',  # PyPI project: https://pypi.org/project/sampleproject
@@ -59,6 +77,21 @@ URLS = {
     "tar": "http://localhost:%d/test_package.tar",
     "zip": "http://localhost:%d/test_package.zip",
     "zip_encrypt": "http://localhost:%d/test_package.enc.zip",
+    "pypi": "http://localhost:%d/pypi/%%s/json",
+}
+
+# Versions of the projects served by the local PyPI server
+PYPI_PROJECTS = {
+    'test_package': ['1.0.0', '2.0.0'],
+    'dependent_package': ['1.0.0'],
+}
+
+# Dependencies (Requires-Dist) of the projects served by the local PyPI server
+PYPI_REQUIRES = {
+    'dependent_package': [
+        'test_package<2,>=1.0',
+        'pytest ; extra == "test"',
+    ],
 }
 
 
@@ -1,25 +1,44 @@
 
+import hashlib
+import io
+import json
 import os
+import re
+import zipfile
 from http.server import HTTPServer as BaseHTTPServer
 from http.server import SimpleHTTPRequestHandler
+from socketserver import ThreadingMixIn
 import ssl
 from threading import Thread
 from time import sleep
 from urllib.error import HTTPError
+from urllib.parse import quote
 from urllib.request import urlopen
 
+import httpimport
 from tests import (
     SERVER_HOST,
     BASIC_AUTH_CREDS,
+    BATCH_PORT,
     BASIC_AUTH_PORT,
     BASIC_AUTH_PROXY_PORT,
+    GIT_PORT,
     HTTP_PORT,
     HTTPS_PORT,
+    MIRROR_PORT,
     PROXY_PORT,
     PROXY_TLS_PORT,
     HTTPS_CERT,
     PROXY_TLS_CERT,
     PROXY_HEADER,
+    PUBLISHED_DIRECTORY,
+    PUBLISHED_PORT,
+    PYPI_PORT,
+    PYPI_PROJECTS,
+    PYPI_REQUIRES,
+    SLOW_DELAY,
+    SLOW_PORT,
+    WEBDAV_PORT,
     WEB_DIRECTORY)
 
 # Taken from:
@@ -35,6 +54,96 @@ class HTTPHandler(SimpleHTTPRequestHandler):
         fullpath = os.path.join(self.server.base_path, relpath)
         return fullpath
 
+
+class SlowHTTPHandler(HTTPHandler):
+    """This handler delays every response by SLOW_DELAY seconds"""
+
+    # Paths of the requests served
+    requests = []
+
+    def do_GET(self):
+        SlowHTTPHandler.requests.append(self.path)
+        sleep(SLOW_DELAY)
+        HTTPHandler.do_GET(self)
+
+
+class RecordingHTTPHandler(HTTPHandler):
+    """This handler records the paths of the requests it serves"""
+
+    requests = []
+
+    def do_GET(self):
+        RecordingHTTPHandler.requests.append(self.path)
+        HTTPHandler.do_GET(self)
+
+
+class BatchHTTPHandler(HTTPHandler, httpimport.BatchRequestHandler):
+    """This handler serves the batch endpoint and records the requests it serves"""
+
+    requests = []
+
+    def do_GET(self):
+        BatchHTTPHandler.requests.append(('GET', self.path))
+        HTTPHandler.do_GET(self)
+
+    def do_POST(self):
+        BatchHTTPHandler.requests.append(('POST', self.path))
+        httpimport.BatchRequestHandler.do_POST(self)
+
+
+class WebDAVHandler(HTTPHandler):
+    """This handler lists directories through WebDAV 'PROPFIND' requests only,
+    and records the requests it serves"""
+
+    requests = []
+    # Whether 'Depth: infinity' is refused, like most WebDAV servers do by default
+    refuse_infinity = False
+
+    def do_GET(self):
+        WebDAVHandler.requests.append(('GET', self.path))
+        HTTPHandler.do_GET(self)
+
+    def list_directory(self, path):
+        self.send_error(403)
+
+    def do_PROPFIND(self):
+        depth = self.headers.get('Depth', 'infinity')
+        WebDAVHandler.requests.append(('PROPFIND', self.path, depth))
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if depth == 'infinity' and WebDAVHandler.refuse_infinity:
+            self.send_error(403)
+            return
+        root = self.translate_path(self.path)
+        if not os.path.isdir(root):
+            self.send_error(404)
+            return
+        responses = []
+        for directory, dirnames, filenames in os.walk(root):
+            level = os.path.relpath(directory, root).count(os.sep) + 1 \
+                if directory != root else 0
+            if depth != 'infinity' and level >= int(depth):
+                dirnames[:] = []
+            if level == 0:
+                responses.append((directory, True))
+            if depth == 'infinity' or level < int(depth):
+                responses.extend((os.path.join(directory, name), True) for name in dirnames)
+                responses.extend((os.path.join(directory, name), False) for name in filenames)
+        body = '<?xml version="1.0" encoding="utf-8"?><D:multistatus xmlns:D="DAV:">'
+        for path, collection in responses:
+            href = self.path.rstrip('/') + '/' + os.path.relpath(path, root).replace(os.sep, '/')
+            href = href[:-2] if href.endswith('/.') else href
+            body += ('<D:response><D:href>%s</D:href><D:propstat><D:prop><D:resourcetype>%s'
+                     '</D:resourcetype></D:prop><D:status>HTTP/1.1 200 OK</D:status>'
+                     '</D:propstat></D:response>') % (
+                quote(href) + ('/' if collection else ''),
+                '<D:collection/>' if collection else '')
+        body = (body + '</D:multistatus>').encode()
+        self.send_response(207)
+        self.send_header('Content-Type', 'application/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
 # Taken from:
 # https://github.com/operatorequals/httpimport/pull/42
 
@@ -94,7 +203,200 @@ class HTTPBasicAuthProxyHandler(HTTPBasicAuthHandler):
         HTTPBasicAuthHandler.do_GET(self, onauth=ProxyHandler.do_GET)
 
 
-class HTTPServer(BaseHTTPServer):
+def build_wheel(project, version):
+    """Builds a wheel of a package found in WEB_DIRECTORY, setting its __version__"""
+    wheel = io.BytesIO()
+    dist_info = '%s-%s.dist-info/' % (project, version)
+    with zipfile.ZipFile(wheel, 'w') as zip_:
+        for root, _, files in os.walk(os.path.join(WEB_DIRECTORY, project)):
+            for filename in files:
+                if not filename.endswith('.py'):
+                    continue
+                path = os.path.join(root, filename)
+                with open(path, 'rb') as f:
+                    content = f.read()
+                arcname = os.path.relpath(path, WEB_DIRECTORY).replace(os.sep, '/')
+                if arcname == project + '/__init__.py':
+                    content += b"\n__version__ = '%s'\n" % version.encode()
+                zip_.writestr(arcname, content)
+        zip_.writestr(dist_info + 'METADATA', metadata(project, version))
+        zip_.writestr(dist_info + 'WHEEL', 'Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n')
+        zip_.writestr(dist_info + 'RECORD', '')
+    return wheel.getvalue()
+
+
+def metadata(project, version):
+    lines = ['Metadata-Version: 2.1', 'Name: ' + project, 'Version: ' + version,
+             'Requires-Python: >=3']
+    lines += ['Requires-Dist: ' + requirement
+              for requirement in PYPI_REQUIRES.get(project, [])]
+    return '\n'.join(lines) + '\n'
+
+
+class PyPIHandler(SimpleHTTPRequestHandler):
+    """A minimal stand-in of the PyPI JSON API and JSON Simple API (PEP 691),
+    serving wheels built from the packages in WEB_DIRECTORY and their
+    metadata (PEP 658). Requests are recorded in 'requests'."""
+
+    requests = []
+    files = {}  # filename -> (project, version, content)
+
+    @classmethod
+    def file_info(cls, host, filename):
+        content = cls.files[filename][2]
+        return {
+            'filename': filename,
+            'url': 'http://%s/packages/%s' % (host, filename),
+            'packagetype': 'bdist_wheel',
+            'requires_python': '>=3',
+            'size': len(content),
+            'digests': {'sha256': hashlib.sha256(content).hexdigest()},
+        }
+
+    def simple_files(self, project):
+        files = []
+        for filename, (p, version, content) in sorted(self.files.items()):
+            if p != project:
+                continue
+            info = self.file_info(self.headers['Host'], filename)
+            files.append({
+                'filename': filename,
+                'url': info['url'],
+                'hashes': info['digests'],
+                'requires-python': info['requires_python'],
+                'core-metadata': {'sha256': hashlib.sha256(
+                    metadata(project, version).encode()).hexdigest()},
+            })
+        return files
+
+    def release_files(self, project, version):
+        return [self.file_info(self.headers['Host'], filename)
+                for filename, (p, v, _) in sorted(self.files.items())
+                if (p, v) == (project, version)]
+
+    def send_body(self, body, content_type):
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        parts = self.path.strip('/').split('/')
+        if parts[0] == 'packages' and len(parts) == 2 and parts[1] in self.files:
+            return self.send_body(self.files[parts[1]][2], 'application/zip')
+        if parts[0] == 'packages' and len(parts) == 2 and \
+                parts[1].endswith('.metadata') and parts[1][:-9] in self.files:
+            project, version, _ = self.files[parts[1][:-9]]
+            return self.send_body(metadata(project, version).encode(), 'text/plain')
+        projects = {p.replace('_', '-'): p for p in PYPI_PROJECTS}
+        if parts[0] == 'simple' and len(parts) == 2 and parts[1] in projects:
+            project = projects[parts[1]]
+            doc = {
+                'meta': {'api-version': '1.1'},
+                'name': parts[1],
+                'files': self.simple_files(project),
+                'versions': PYPI_PROJECTS[project],
+            }
+            return self.send_body(
+                json.dumps(doc).encode(), 'application/vnd.pypi.simple.v1+json')
+        if parts[0] == 'pypi' and parts[-1] == 'json' and parts[1] in PYPI_PROJECTS:
+            project, versions = parts[1], PYPI_PROJECTS[parts[1]]
+            if len(parts) == 3:
+                doc = {
+                    'info': {'name': project, 'version': versions[-1]},
+                    'releases': {v: self.release_files(project, v) for v in versions},
+                    'urls': self.release_files(project, versions[-1]),
+                }
+            elif len(parts) == 4 and parts[2] in versions:
+                doc = {
+                    'info': {'name': project, 'version': parts[2]},
+                    'urls': self.release_files(project, parts[2]),
+                }
+            else:
+                return self.send_error(404)
+            return self.send_body(json.dumps(doc).encode(), 'application/json')
+        self.send_error(404)
+
+
+for project, versions in PYPI_PROJECTS.items():
+    for version in versions:
+        PyPIHandler.files['%s-%s-py3-none-any.whl' % (project, version)] = (
+            project, version, build_wheel(project, version))
+
+
+def build_repo_archive(prefix):
+    """Builds a ZIP archive of the packages in WEB_DIRECTORY under a top-level
+    directory, like the archives of git services"""
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zip_:
+        zip_.writestr(prefix, '')
+        for root, _, files in os.walk(os.path.join(WEB_DIRECTORY, 'test_package')):
+            for filename in files:
+                path = os.path.join(root, filename)
+                zip_.write(path, prefix + os.path.relpath(path, WEB_DIRECTORY).replace(os.sep, '/'))
+    return archive.getvalue()
+
+
+class GitServiceHandler(SimpleHTTPRequestHandler):
+    """A minimal stand-in of the commit APIs and repository archives of Github
+    (Enterprise), Gitlab and Bitbucket, for any repository. Its only branch
+    is 'main', at commit 'COMMIT'. The refs 'portal' and 'error' are answered with
+    an HTML page and a JSON error object. Requests are recorded in 'requests'."""
+
+    COMMIT = hashlib.sha1(b'main').hexdigest()
+    requests = []
+
+    APIS = [
+        (r'/api/v3/repos/([^/]+)/([^/]+)/commits/([^/]+)', 'sha'),
+        (r'/api/v4/projects/([^/]+)%2F([^/]+)/repository/commits/([^/]+)', 'id'),
+        (r'/!api/2.0/repositories/([^/]+)/([^/]+)/commit/([^/]+)', 'hash'),
+    ]
+    ARCHIVES = [
+        (r'/([^/]+)/([^/]+)/archive/(\w+)\.zip', '{repo}-{sha}/'),
+        (r'/([^/]+)/([^/]+)/-/archive/(\w+)/[^/]+\.zip', '{repo}-{sha}/'),
+        (r'/([^/]+)/([^/]+)/get/(\w+)\.zip', '{user}-{repo}-{short}/'),
+    ]
+
+    def send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        GitServiceHandler.requests.append(self.path)
+        for pattern, key in self.APIS:
+            match = re.match(pattern + '$', self.path)
+            if match and match.group(3) in ('main', self.COMMIT):
+                return self.send_body(
+                    json.dumps({key: self.COMMIT}).encode(), 'application/json')
+            if match and match.group(3) == 'portal':
+                # A login page or captive portal answering in place of the API
+                return self.send_body(b'<html><body>Sign in</body></html>', 'text/html')
+            if match and match.group(3) == 'error':
+                return self.send_body(b'{"message": "Not Found"}', 'application/json')
+        for pattern, prefix in self.ARCHIVES:
+            match = re.match(pattern + '$', self.path)
+            if match and match.group(3) == self.COMMIT:
+                user, repo, sha = match.groups()
+                return self.send_body(build_repo_archive(prefix.format(
+                    user=user, repo=repo, sha=sha, short=sha[:12])), 'application/zip')
+        self.send_error(404)
+
+
+class HTTPServer(ThreadingMixIn, BaseHTTPServer):
+    daemon_threads = True
+
     def __init__(self, base_path, server_address,
                  RequestHandlerClass=HTTPHandler):
         self.base_path = base_path
@@ -135,6 +437,41 @@ __SERVERS = {
         (SERVER_HOST,
          PROXY_TLS_PORT),
         RequestHandlerClass=ProxyHandler),
+    'httpd_mirror': HTTPServer(
+        WEB_DIRECTORY,
+        (SERVER_HOST,
+         MIRROR_PORT),
+        RequestHandlerClass=HTTPHandler),
+    'httpd_slow': HTTPServer(
+        WEB_DIRECTORY,
+        (SERVER_HOST,
+         SLOW_PORT),
+        RequestHandlerClass=SlowHTTPHandler),
+    'httpd_pypi': HTTPServer(
+        WEB_DIRECTORY,
+        (SERVER_HOST,
+         PYPI_PORT),
+        RequestHandlerClass=PyPIHandler),
+    'httpd_published': HTTPServer(
+        PUBLISHED_DIRECTORY,
+        (SERVER_HOST,
+         PUBLISHED_PORT),
+        RequestHandlerClass=RecordingHTTPHandler),
+    'httpd_batch': HTTPServer(
+        PUBLISHED_DIRECTORY,
+        (SERVER_HOST,
+         BATCH_PORT),
+        RequestHandlerClass=BatchHTTPHandler),
+    'httpd_git': HTTPServer(
+        WEB_DIRECTORY,
+        (SERVER_HOST,
+         GIT_PORT),
+        RequestHandlerClass=GitServiceHandler),
+    'httpd_webdav': HTTPServer(
+        WEB_DIRECTORY,
+        (SERVER_HOST,
+         WEBDAV_PORT),
+        RequestHandlerClass=WebDAVHandler),
 }
 
 tls_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
@@ -152,6 +489,13 @@ RUNNING = {
     'httpd_basic_auth_proxy': False,
     'httpd_tls': False,
     'httpd_proxy_tls': False,
+    'httpd_mirror': False,
+    'httpd_slow': False,
+    'httpd_pypi': False,
+    'httpd_published': False,
+    'httpd_batch': False,
+    'httpd_git': False,
+    'httpd_webdav': False,
 }
 
 
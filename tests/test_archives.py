@@ -80,3 +80,54 @@ zip-password: XXXXXXXX
 
         except RuntimeError:
             self.assertTrue(True)
+
+    def test_zip_pwd_wrong_or_missing(self, url=URLS['zip_encrypt'] % HTTP_PORT):
+        # Before any module is looked up
+        with self.assertRaises(httpimport.ZipPasswordError):
+            httpimport.HttpImporter(url, zip_pwd=b'XXXXXXXX', allow_plaintext=True)
+        with self.assertRaises(ImportError):
+            httpimport.HttpImporter(url, allow_plaintext=True)
+
+    def test_zip_pwd_decrypted_once(self, url=URLS['zip_encrypt'] % HTTP_PORT):
+        extracted = []
+        open_archive_file = httpimport._open_archive_file
+
+        def _open_archive_file(archive_obj, filepath, zip_pwd=None):
+            extracted.append(filepath)
+            return open_archive_file(archive_obj, filepath, zip_pwd=zip_pwd)
+
+        httpimport._open_archive_file = _open_archive_file
+        self.addCleanup(setattr, httpimport, '_open_archive_file', open_archive_file)
+        importer = httpimport.HttpImporter(
+            url, zip_pwd=ZIP_PASSWORD.encode(), allow_plaintext=True)
+        # The password is verified once, with the smallest file
+        self.assertEqual(len(extracted), 1)
+        for name in ('test_package', 'test_package.a', 'test_package.b.mod'):
+            self.assertIs(importer.find_module(name), importer)
+        for _ in range(3):
+            # Dropped after execution, then needed again (e.g. for 'linecache')
+            importer._record('test_package.b.mod').drop()
+            self.assertIn('def', importer.get_source('test_package.b.mod'))
+        self.assertEqual(len(extracted), len(set(extracted)))
+
+    def test_zip_decrypt_all(self, url=URLS['zip_encrypt'] % HTTP_PORT):
+        import threading
+
+        importer = httpimport.HttpImporter(
+            url, zip_pwd=ZIP_PASSWORD.encode(), allow_plaintext=True, zip_decrypt_all=True)
+        for thread in threading.enumerate():
+            if thread.name == 'httpimport-decrypt':
+                thread.join()
+        sources = [name for name in importer.archive.namelist() if name.endswith('.py')]
+        self.assertTrue(sources)
+        self.assertLessEqual(set(sources), set(importer._decrypted))
+
+    def test_zip_decrypted_bounded(self, url=URLS['zip_encrypt'] % HTTP_PORT):
+        importer = httpimport.HttpImporter(
+            url, zip_pwd=ZIP_PASSWORD.encode(), allow_plaintext=True, module_cache_bytes=1)
+        for name in ('test_package', 'test_package.a', 'test_package.b.mod'):
+            importer.find_module(name)
+        # The most recently used file is kept, even if larger
+        self.assertEqual(list(importer._decrypted), ['test_package/b/mod.py'])
+        self.assertEqual(importer._decrypted_bytes,
+                         len(importer._decrypted['test_package/b/mod.py']))
@@ -0,0 +1,93 @@
+import os
+import shutil
+
+import httpimport
+from tests import (
+    HttpImportTest,
+    BATCH_PORT,
+    PUBLISHED_DIRECTORY,
+    URLS,
+    WEB_DIRECTORY,
+    servers)
+from tests.servers import BatchHTTPHandler
+
+URL = URLS['web_dir'] % BATCH_PORT
+
+
+class TestBatch(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_batch')
+        for name in os.listdir(PUBLISHED_DIRECTORY):
+            path = os.path.join(PUBLISHED_DIRECTORY, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.unlink(path)
+        httpimport.publish(WEB_DIRECTORY, PUBLISHED_DIRECTORY,
+                           compress=False, batch=httpimport.BATCH_PATH)
+        del BatchHTTPHandler.requests[:]
+
+    def importer(self, **kw):
+        return httpimport.HttpImporter(URL, allow_plaintext=True, **kw)
+
+    def test_package_in_one_request(self):
+        importer = self.importer()
+        self.assertEqual(importer.batch, httpimport.BATCH_PATH)
+        self.assertIs(importer.find_module('test_package'), importer)
+        self.assertEqual(BatchHTTPHandler.requests, [
+            ('GET', '/'), ('GET', '/' + httpimport.MANIFEST),
+            ('POST', '/' + httpimport.BATCH_PATH)])
+        # The whole package is found at once
+        self.assertIn('test_package.b.mod', importer.modules)
+        self.assertIs(importer.find_module('test_package.b.mod'), importer)
+        self.assertEqual(len(BatchHTTPHandler.requests), 3)
+
+    def test_manifest_header(self):
+        resp = httpimport.http(URL + 'test_module.py')
+        self.assertEqual(resp['headers'][httpimport.MANIFEST_HEADER.lower()], httpimport.MANIFEST)
+        # Found without the directory listing
+        self.assertIsNotNone(self.importer(listing=False).manifest)
+
+    def test_import(self):
+        httpimport.set_profile('''[batch]
+allow-plaintext: yes
+''')
+        with httpimport.remote_repo(URL, profile='batch'):
+            import test_package.b.mod
+        self.assertTrue(test_package.b.mod)
+        self.assertEqual(
+            [request for request in BatchHTTPHandler.requests if request[0] == 'POST'],
+            [('POST', '/' + httpimport.BATCH_PATH)])
+
+    def test_header_capability(self):
+        # Without a manifest, the paths of each module are probed at once
+        importer = self.importer(manifest=False)
+        self.assertEqual(importer.batch, httpimport.BATCH_PATH)
+        self.assertIs(importer.find_module('test_package.b'), importer)
+        self.assertIsNone(importer.find_module('not_published'))
+        self.assertEqual(BatchHTTPHandler.requests, [
+            ('GET', '/'),
+            ('POST', '/' + httpimport.BATCH_PATH),
+            ('POST', '/' + httpimport.BATCH_PATH)])
+
+    def test_disabled(self):
+        importer = self.importer(batch=False)
+        self.assertIsNone(importer.batch)
+        self.assertIs(importer.find_module('test_package'), importer)
+        self.assertNotIn('POST', [method for method, _ in BatchHTTPHandler.requests])
+
+    def test_unsupported_endpoint(self):
+        importer = self.importer(manifest=False)
+        importer.batch = 'not-a-batch-endpoint'
+        self.assertIs(importer.find_module('test_package.b'), importer)
+        self.assertIsNone(importer.batch)
+        self.assertIs(importer.find_module('test_package.a'), importer)
+        # Given up on after the first 404
+        self.assertEqual(
+            [request for request in BatchHTTPHandler.requests if request[0] == 'POST'],
+            [('POST', '/not-a-batch-endpoint')])
+
+    def test_paths_outside_directory(self):
+        importer = self.importer()
+        self.assertEqual(importer._fetch_batch(['../tests/__init__.py']), {})
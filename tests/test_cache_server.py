@@ -0,0 +1,118 @@
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from urllib.parse import quote
+
+import httpimport
+from tests import (
+    HttpImportTest,
+    HTTPS_CERT,
+    HTTPS_PORT,
+    PUBLISHED_DIRECTORY,
+    PUBLISHED_PORT,
+    SLOW_PORT,
+    URLS,
+    servers)
+from tests.servers import RecordingHTTPHandler, SlowHTTPHandler
+
+URL = URLS['web_dir'] % PUBLISHED_PORT
+SLOW_URL = URLS['web_dir'] % SLOW_PORT
+TLS_URL = (URLS['web_dir'] % HTTPS_PORT).replace('http://', 'https://')
+
+
+class TestCacheServer(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_published')
+        for name in os.listdir(PUBLISHED_DIRECTORY):
+            path = os.path.join(PUBLISHED_DIRECTORY, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.unlink(path)
+        with open(os.path.join(PUBLISHED_DIRECTORY, 'watched.py'), 'w') as f:
+            f.write('VALUE = 1\n')
+        httpimport._RESPONSE_CACHE.clear()
+        del RecordingHTTPHandler.requests[:]
+
+    def tearDown(self):
+        # Requests of the cache server to the origins
+        httpimport._CIRCUIT_BREAKERS.clear()
+        HttpImportTest.tearDown(self)
+
+    def start(self, **kw):
+        server = httpimport._cache_proxy_server(port=0, **kw)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        if kw.get('unix_socket'):
+            return 'cache+http+unix://' + quote(server.server_address, safe='')
+        return 'cache+http://127.0.0.1:%d' % server.server_address[1]
+
+    def import_watched(self, proxy, url=URL):
+        httpimport.set_profile('''[DEFAULT]
+allow-plaintext: yes
+proxy-url: %s
+        ''' % proxy.replace('%', '%%'))
+        with httpimport.remote_repo(url):
+            import watched
+        del sys.modules['watched']
+        return watched
+
+    def test_shared_between_clients(self):
+        proxy = self.start(ttl=60)
+        for _ in range(3):
+            self.assertEqual(self.import_watched(proxy).VALUE, 1)
+        self.assertEqual(RecordingHTTPHandler.requests.count('/watched.py'), 1)
+
+    def test_not_kept_in_memory(self):
+        proxy = self.start()
+        self.assertEqual(self.import_watched(proxy).VALUE, 1)
+        # The daemon's entries are keyed by URL and headers
+        self.assertFalse([key for key in httpimport._RESPONSE_CACHE._memory if '#' in key])
+
+    def test_revalidated(self):
+        proxy = self.start()
+        self.import_watched(proxy)
+        resp = httpimport.http(URL + 'watched.py', proxy=proxy)
+        self.assertEqual(resp['body'], b'VALUE = 1\n')
+        # Validators of the clients are answered by the cache server
+        conditional = httpimport._conditional_headers(resp['headers'])
+        resp = httpimport.http(URL + 'watched.py', headers=conditional, proxy=proxy)
+        self.assertEqual(resp['code'], 304)
+
+    def test_https_origin(self):
+        servers.init('httpd_tls')
+        httpimport.set_profile('''[origins]
+ca-file: %s
+        ''' % HTTPS_CERT)
+        proxy = self.start(profile='origins')
+        resp = httpimport.http(TLS_URL + 'test_package/a/mod.py', proxy=proxy)
+        self.assertEqual(resp['code'], 200)
+        self.assertIn(b'Module A', resp['body'])
+
+    def test_coalesced(self):
+        servers.init('httpd_slow')
+        proxy = self.start()
+        del SlowHTTPHandler.requests[:]
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(
+            httpimport.http(SLOW_URL + 'test_package/__init__.py', proxy=proxy)))
+            for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([resp['code'] for resp in responses], [200] * 5)
+        self.assertEqual(SlowHTTPHandler.requests, ['/test_package/__init__.py'])
+
+    @unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'needs Unix domain sockets')
+    def test_unix_socket(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        proxy = self.start(unix_socket=os.path.join(directory, 'cache.sock'))
+        self.assertEqual(self.import_watched(proxy).VALUE, 1)
@@ -0,0 +1,71 @@
+import importlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+import zipimport
+
+import httpimport
+from tests import HttpImportTest, HTTP_PORT, TEST_MODULES, URLS, servers
+
+URL = URLS['web_dir'] % HTTP_PORT
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestFreeze(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd')
+        httpimport.set_profile('''[{url}]
+allow-plaintext: yes
+        '''.format(url=URL))
+        self.directory = tempfile.mkdtemp()
+        self.bundle = os.path.join(self.directory, 'bundle.zip')
+
+    def tearDown(self):
+        if self.bundle in sys.path:
+            sys.path.remove(self.bundle)
+        shutil.rmtree(self.directory)
+        HttpImportTest.tearDown(self)
+
+    def unload(self):
+        for module in TEST_MODULES:
+            sys.modules.pop(module, None)
+
+    def test_freeze_loaded_modules(self):
+        with httpimport.remote_repo(URL):
+            import test_package.a.mod
+        frozen = httpimport.freeze(self.bundle)
+        self.assertEqual(
+            frozen, ['test_package', 'test_package.a', 'test_package.a.mod'])
+
+        with zipfile.ZipFile(self.bundle) as bundle:
+            metadata = json.loads(bundle.read(httpimport.FREEZE_METADATA))
+        self.assertEqual(metadata['modules']['test_package.a.mod']['url'],
+                         URL + 'test_package/a/mod.py')
+
+        # Imported without network access, through 'zipimport'
+        self.unload()
+        sys.path.insert(0, self.bundle)
+        mod = importlib.import_module('test_package.a.mod')
+        self.assertIsInstance(mod.__loader__, zipimport.zipimporter)
+        self.assertEqual(mod.module_name(), 'Module A')
+
+    def test_freeze_not_remote_module(self):
+        with self.assertRaises(ValueError):
+            httpimport.freeze(self.bundle, ['json'])
+
+    def test_freeze_command(self):
+        process = subprocess.run(
+            [sys.executable, '-m', 'httpimport', 'freeze', '--insecure',
+             '--url', URL, '-o', self.bundle, 'test_package.b.mod'],
+            cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertEqual(process.stdout.split(),
+                         ['test_package', 'test_package.b', 'test_package.b.mod'])
+        with zipfile.ZipFile(self.bundle) as bundle:
+            self.assertIn('test_package/b/mod.pyc', bundle.namelist())
@@ -0,0 +1,86 @@
+import io
+import shutil
+import sys
+import tarfile
+import tempfile
+
+import httpimport
+from tests import GIT_PORT, HttpImportTest, TEST_MODULES, servers
+from tests.servers import GitServiceHandler
+
+DOMAIN = 'http://localhost:%d' % GIT_PORT
+COMMIT = GitServiceHandler.COMMIT
+
+REPOS = {
+    'github': httpimport.github_repo,
+    'gitlab': httpimport.gitlab_repo,
+    'bitbucket': httpimport.bitbucket_repo,
+}
+
+
+class TestGitArchives(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_git')
+        httpimport.set_profile('''[DEFAULT]
+allow-plaintext: yes
+        ''')
+        del GitServiceHandler.requests[:]
+
+    def test_single_request(self):
+        for service, git_repo in REPOS.items():
+            with self.subTest(service=service):
+                del GitServiceHandler.requests[:]
+                with git_repo('operatorequals', 'httpimport-test', ref='main',
+                              domain=DOMAIN, archive=True):
+                    import test_package.a.mod
+                self.assertEqual(test_package.a.mod.module_name(), 'Module A')
+                # The commit, then its archive
+                self.assertEqual(len(GitServiceHandler.requests), 2)
+                self.assertIn(COMMIT, GitServiceHandler.requests[-1])
+                for module in TEST_MODULES:
+                    sys.modules.pop(module, None)
+
+    def test_cached_for_good(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        httpimport.set_profile('''[DEFAULT]
+allow-plaintext: yes
+cache-dir: %s
+        ''' % cache_dir)
+        for _ in range(2):
+            with httpimport.github_repo('operatorequals', 'httpimport-test', ref=COMMIT,
+                                        domain=DOMAIN, archive=True):
+                import test_package
+            for module in TEST_MODULES:
+                sys.modules.pop(module, None)
+        # Commits are not resolved, and their archives never change
+        self.assertEqual(GitServiceHandler.requests,
+                         ['/operatorequals/httpimport-test/archive/%s.zip' % COMMIT])
+
+    def test_unknown_ref(self):
+        with self.assertRaises(ImportError):
+            with httpimport.gitlab_repo('operatorequals', 'httpimport-test', ref='missing',
+                                        domain=DOMAIN, archive=True):
+                pass
+
+    def test_unexpected_api_response(self):
+        for ref in ('portal', 'error'):
+            with self.subTest(ref=ref):
+                with self.assertRaises(ImportError):
+                    with httpimport.github_repo('operatorequals', 'httpimport-test', ref=ref,
+                                                domain=DOMAIN, archive=True):
+                        pass
+
+    def test_strip_tar_prefix(self):
+        content = io.BytesIO()
+        with tarfile.open(fileobj=content, mode='w') as tar:
+            info = tarfile.TarInfo('repo-1234/module.py')
+            info.size = 4
+            tar.addfile(info, io.BytesIO(b'X=1\n'))
+        archive = httpimport._retrieve_archive(content.getvalue(), 'repo.tar')
+        self.assertEqual(httpimport._strip_archive_prefix(archive), 'repo-1234/')
+        self.assertEqual(httpimport._archive_top_level_modules(archive), {'module'})
+        self.assertEqual(httpimport._open_archive_file(archive, 'module.py'), b'X=1\n')
+        # Archives of many top-level files are left untouched
+        self.assertEqual(httpimport._strip_archive_prefix(archive), '')
@@ -0,0 +1,64 @@
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# How many times as long as 'import json' (a stdlib package of similar scope)
+# 'import httpimport' may take (cumulative, best of RUNS), so that the budget
+# follows the speed of the machine
+IMPORT_TIME_RATIO = 6
+BASELINE_MODULE = 'json'
+RUNS = 5
+
+# Modules that must only be imported when they are needed
+LAZY_MODULES = ['ssl', 'tarfile', 'zipfile', 'json', 'urllib.request',
+                'http.client', 'configparser', 'hashlib']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestImportTime(unittest.TestCase):
+
+    def setUp(self):
+        self.pycache = tempfile.mkdtemp()
+        self.env = dict(os.environ, PYTHONPYCACHEPREFIX=self.pycache,
+                        # An empty home directory, without configuration files
+                        HOME=self.pycache)
+        self.env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+    def tearDown(self):
+        shutil.rmtree(self.pycache)
+
+    def python(self, *args):
+        return subprocess.run(
+            [sys.executable] + list(args), cwd=ROOT, env=self.env,
+            capture_output=True, text=True, check=True)
+
+    def test_lazy_modules(self):
+        loaded = self.python('-c', 'import sys, httpimport; print(" ".join(sys.modules))')
+        loaded = loaded.stdout.split()
+        self.assertFalse([module for module in LAZY_MODULES if module in loaded])
+        # Configuration is only loaded on first use
+        self.assertEqual('False', self.python(
+            '-c', 'import httpimport; print("CONFIG" in vars(httpimport))').stdout.strip())
+
+    def import_time(self, module):
+        """ Returns the best cumulative time of importing `module`, in microseconds """
+        self.python('-c', 'import ' + module)  # Compile to '.pyc' once
+        timings = []
+        for _ in range(RUNS):
+            stderr = self.python('-X', 'importtime', '-c', 'import ' + module).stderr
+            for line in stderr.splitlines():
+                if line.rstrip().endswith('| ' + module):
+                    timings.append(int(line.split('|')[1]))
+        self.assertEqual(len(timings), RUNS)
+        return min(timings)
+
+    @unittest.skipUnless(platform.python_implementation() == 'CPython',
+                         "'-X importtime' is specific to CPython")
+    def test_import_time_budget(self):
+        baseline = self.import_time(BASELINE_MODULE)
+        self.assertLess(self.import_time('httpimport'), IMPORT_TIME_RATIO * baseline)
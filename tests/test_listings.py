@@ -0,0 +1,121 @@
+import os
+import shutil
+
+import httpimport
+from tests import (
+    HttpImportTest,
+    PUBLISHED_DIRECTORY,
+    PUBLISHED_PORT,
+    URLS,
+    WEBDAV_PORT,
+    WEB_DIRECTORY,
+    servers)
+from tests.servers import RecordingHTTPHandler, WebDAVHandler
+
+URL = URLS['web_dir'] % PUBLISHED_PORT
+WEBDAV_URL = URLS['web_dir'] % WEBDAV_PORT
+
+
+class TestAutoindexListings(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_published')
+        for name in os.listdir(PUBLISHED_DIRECTORY):
+            path = os.path.join(PUBLISHED_DIRECTORY, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.unlink(path)
+        shutil.copytree(os.path.join(WEB_DIRECTORY, 'test_package'),
+                        os.path.join(PUBLISHED_DIRECTORY, 'test_package'))
+        del RecordingHTTPHandler.requests[:]
+
+    def importer(self, **kw):
+        return httpimport.HttpImporter(URL, allow_plaintext=True, **kw)
+
+    def test_not_probed(self):
+        importer = self.importer()
+        self.assertTrue(importer.listing)
+        self.assertIs(importer.find_module('test_package.a.mod'), importer)
+        # The listings of the directories, then the module
+        self.assertNotIn('/test_package/a/mod/__init__.py', RecordingHTTPHandler.requests)
+        self.assertNotIn('/test_package.py', RecordingHTTPHandler.requests)
+        self.assertIn('/test_package/a/mod.py', RecordingHTTPHandler.requests)
+
+    def test_missing(self):
+        importer = self.importer()
+        importer.find_module('test_package')
+        del RecordingHTTPHandler.requests[:]
+        self.assertIsNone(importer.find_module('missing'))
+        self.assertIsNone(importer.find_module('test_package.missing'))
+        self.assertEqual(RecordingHTTPHandler.requests, [])
+
+    def test_disabled(self):
+        importer = self.importer(listing=False)
+        self.assertFalse(importer.listing)
+        self.assertIsNone(importer.find_module('missing'))
+        self.assertEqual(RecordingHTTPHandler.requests,
+                         ['/', '/missing.py', '/missing/__init__.py'])
+
+    def test_iterdir(self):
+        importer = self.importer()
+        importer.find_module('test_package')
+        names = {resource.name for resource in importer.get_resource_reader(
+            'test_package').files().iterdir()}
+        self.assertEqual(names, {'__init__.py', 'a', 'b', 'c', 'data'})
+
+    def test_parse_autoindex(self):
+        page = b'''<html><head><title>Index of /repo/</title></head><body>
+<a href="../">Parent Directory</a> <a href="module.py">module.py</a>
+<a href="/repo/package/">package/</a> <a href="https://example.com/">elsewhere</a>
+<a href="?C=M;O=A">Last modified</a> <a href="my%20file.txt">my file.txt</a>
+</body></html>'''
+        self.assertEqual(
+            httpimport._parse_autoindex(page, 'http://localhost/repo/'),
+            {'module.py', 'package/', 'my file.txt'})
+        self.assertIsNone(httpimport._parse_autoindex(
+            b'<html><title>Welcome</title></html>', 'http://localhost/repo/'))
+
+
+class TestWebDAVListings(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_webdav')
+        del WebDAVHandler.requests[:]
+        WebDAVHandler.refuse_infinity = False
+
+    def importer(self):
+        return httpimport.HttpImporter(WEBDAV_URL, allow_plaintext=True, webdav=True)
+
+    def test_infinity(self):
+        importer = self.importer()
+        self.assertTrue(importer.listing)
+        self.assertIs(importer.find_module('test_package.b.mod2'), importer)
+        self.assertIsNone(importer.find_module('test_package.missing'))
+        # The whole tree in one request
+        self.assertEqual([request for request in WebDAVHandler.requests
+                          if request[0] == 'PROPFIND'], [('PROPFIND', '/', 'infinity')])
+        self.assertIn(('GET', '/test_package/b/mod2.py'), WebDAVHandler.requests)
+        self.assertNotIn(('GET', '/test_package/b/mod2/__init__.py'), WebDAVHandler.requests)
+
+    def test_depth_one(self):
+        WebDAVHandler.refuse_infinity = True
+        importer = self.importer()
+        self.assertTrue(importer.listing)
+        self.assertIs(importer.find_module('test_package.a'), importer)
+        self.assertEqual([request for request in WebDAVHandler.requests
+                          if request[0] == 'PROPFIND'], [
+            ('PROPFIND', '/', 'infinity'),
+            ('PROPFIND', '/', '1'),
+            ('PROPFIND', '/test_package/', '1'),
+            ('PROPFIND', '/test_package/a/', '1')])
+
+    def test_profile(self):
+        httpimport.set_profile('''[webdav]
+allow-plaintext: yes
+webdav: yes
+        ''')
+        with httpimport.remote_repo(WEBDAV_URL, profile='webdav'):
+            import test_package.a.mod
+        self.assertEqual(test_package.a.mod.module_name(), 'Module A')
+        self.assertIn(('PROPFIND', '/', 'infinity'), WebDAVHandler.requests)
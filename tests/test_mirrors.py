@@ -0,0 +1,49 @@
+import time
+
+import httpimport
+from tests import (
+    HttpImportTest,
+    DEAD_PORT,
+    HTTP_PORT,
+    MIRROR_PORT,
+    SLOW_DELAY,
+    SLOW_PORT,
+    URLS,
+    servers)
+
+URL = URLS['web_dir'] % HTTP_PORT
+MIRROR_URL = URLS['web_dir'] % MIRROR_PORT
+SLOW_URL = URLS['web_dir'] % SLOW_PORT
+DEAD_URL = URLS['web_dir'] % DEAD_PORT
+
+
+class TestMirrors(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd')
+        servers.init('httpd_mirror')
+        servers.init('httpd_slow')
+
+    def test_failover_from_dead_url(self):
+        httpimport.set_profile('''[{url}]
+allow-plaintext: yes
+mirrors:
+    {mirror}
+        '''.format(url=DEAD_URL, mirror=MIRROR_URL))
+        with httpimport.remote_repo(DEAD_URL):
+            import test_package
+        self.assertTrue(test_package)
+
+    def test_hedged_request_to_fast_mirror(self):
+        importer = httpimport.HttpImporter(
+            SLOW_URL, mirrors=[URL], allow_plaintext=True)
+        start = time.monotonic()
+        resp = importer._fetch('test_module.py')
+        self.assertEqual(resp['code'], 200)
+        self.assertTrue(time.monotonic() - start < SLOW_DELAY)
+
+    def test_failing_mirror_demoted(self):
+        mirrors = httpimport._MirrorSet([DEAD_URL, URL])
+        for _ in range(mirrors.MAX_FAILURES):
+            mirrors.record(DEAD_URL, failed=True)
+        self.assertEqual(mirrors.ranked(), [URL, DEAD_URL])
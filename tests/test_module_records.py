@@ -0,0 +1,53 @@
+import importlib
+import linecache
+
+import httpimport
+from tests import HttpImportTest, HTTP_PORT, URLS, servers
+
+URL = URLS['web_dir'] % HTTP_PORT
+ZIP_URL = URLS['zip'] % HTTP_PORT
+
+
+class TestModuleRecords(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd')
+        httpimport.set_profile('''[DEFAULT]
+allow-plaintext: yes
+        ''')
+
+    def test_unloaded_modules_evicted(self):
+        importer = httpimport.HttpImporter(
+            URL, allow_plaintext=True, module_cache_bytes=1)
+        self.assertTrue(importer.find_module('test_package'))
+        self.assertTrue(importer.find_module('test_package.a'))
+        # Only the most recently found module is kept
+        self.assertEqual(list(importer.modules), ['test_package.a'])
+
+    def test_source_compressed_after_exec(self):
+        with httpimport.remote_repo(URL):
+            import test_package.a
+        importer = test_package.__loader__
+        record = importer.modules['test_package.a']
+        self.assertTrue(record._source.compressed)
+        self.assertIn(
+            'import', importer.get_source('test_package.a'))
+        self.assertTrue(linecache.getlines(test_package.a.__file__,
+                                           test_package.a.__dict__))
+
+    def test_archive_source_dropped_after_exec(self):
+        with httpimport.remote_repo(ZIP_URL):
+            import test_package.a.mod
+        importer = test_package.__loader__
+        self.assertIsNone(importer.modules['test_package.a.mod'].content)
+        # Extracted again on demand
+        self.assertIn('def', importer.get_source('test_package.a.mod'))
+        # Backwards compatible dict-style access
+        self.assertEqual(importer.modules['test_package.a.mod']['module'],
+                         test_package.a.mod)
+
+    def test_reload(self):
+        with httpimport.remote_repo(URL):
+            import test_package
+            reloaded = importlib.reload(test_package)
+        self.assertIs(reloaded, test_package)
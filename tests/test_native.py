@@ -0,0 +1,39 @@
+import _bisect
+import importlib.machinery
+import os
+import unittest
+import zipfile
+
+import httpimport
+from tests import HttpImportTest, PUBLISHED_DIRECTORY, PUBLISHED_PORT, URLS, servers
+
+URL = URLS['web_dir'] % PUBLISHED_PORT + 'native.zip'
+
+SUFFIX = importlib.machinery.EXTENSION_SUFFIXES[0]
+
+
+@unittest.skipUnless(hasattr(os, 'memfd_create'), 'needs memfd_create (Linux)')
+@unittest.skipUnless(getattr(_bisect, '__file__', '').endswith(SUFFIX),
+                     "needs '_bisect' as an extension module")
+class TestNativeExtensions(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_published')
+        with zipfile.ZipFile(os.path.join(PUBLISHED_DIRECTORY, 'native.zip'), 'w') as archive:
+            archive.write(_bisect.__file__, '_bisect' + SUFFIX)
+        httpimport.set_profile('''[DEFAULT]
+allow-plaintext: yes
+        ''')
+
+    def test_load_from_memory(self):
+        importer = httpimport.HttpImporter(URL, allow_plaintext=True)
+        self.assertIs(importer.find_module('_bisect'), importer)
+        module = importer._create_module('_bisect', sys_modules=False)
+        self.assertIsNot(module, _bisect)
+        self.assertEqual(module.bisect_left([1, 2, 3], 2), 1)
+        self.assertEqual(module.__file__, importer.url + '#_bisect' + SUFFIX)
+        self.assertIsNone(importer.get_source('_bisect'))
+
+    def test_not_python_module(self):
+        importer = httpimport.HttpImporter(URL, allow_plaintext=True)
+        self.assertIsNone(importer.find_module('_bisect.missing'))
@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+import time
+
+import httpimport
+from tests import (
+    HttpImportTest,
+    HTTP_PORT,
+    PYPI_PORT,
+    SLOW_DELAY,
+    SLOW_PORT,
+    URLS,
+    servers)
+
+URL = URLS['web_dir'] % HTTP_PORT
+SLOW_URL = URLS['web_dir'] % SLOW_PORT
+PYPI_URL = URLS['pypi'] % PYPI_PORT
+
+
+def no_network(*args, **kw):
+    raise AssertionError("Network used in offline mode")
+
+
+class TestOffline(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd')
+        servers.init('httpd_slow')
+        servers.init('httpd_pypi')
+        self.cache_dir = tempfile.mkdtemp()
+        httpimport.set_profile('''[DEFAULT]
+allow-plaintext: yes
+cache-dir: {cache_dir}
+offline: no
+
+[pypi_local]
+requirements:
+    test_package==1.0.0
+'''.format(cache_dir=self.cache_dir))
+        httpimport._RESPONSE_CACHE.clear()
+        httpimport._CONTENT_STORE.clear()
+        self.urllib_http = httpimport._urllib_http
+
+    def tearDown(self):
+        httpimport.OFFLINE = False
+        httpimport._urllib_http = self.urllib_http
+        shutil.rmtree(self.cache_dir)
+        HttpImportTest.tearDown(self)
+
+    def go_offline(self):
+        # A new process, that must not connect
+        httpimport._RESPONSE_CACHE.clear()
+        httpimport._CONTENT_STORE.clear()
+        httpimport._urllib_http = no_network
+        httpimport.set_profile('''[DEFAULT]
+offline: yes
+''')
+
+    def test_http_fails_fast(self):
+        httpimport.OFFLINE = True
+        start = time.monotonic()
+        with self.assertRaises(httpimport.OfflineError):
+            httpimport.http(SLOW_URL + 'test_module.py')
+        self.assertTrue(time.monotonic() - start < SLOW_DELAY)
+
+    def test_import_from_cache(self):
+        httpimport.load('test_package', URL)
+        self.go_offline()
+        mod = httpimport.load('test_package', URL)
+        self.assertEqual(mod.__url__, URL + 'test_package/__init__.py')
+
+    def test_miss_raises_import_error(self):
+        httpimport.load('test_package', URL)
+        self.go_offline()
+        with self.assertRaises(ImportError) as context:
+            httpimport.load('test_module', URL)
+        self.assertIn('offline', str(context.exception))
+
+    def test_uncached_url(self):
+        self.go_offline()
+        with self.assertRaises(ImportError):
+            httpimport.load('test_package', SLOW_URL)
+
+    def test_pypi_from_cache(self):
+        load = lambda: httpimport.load(
+            'test_package', PYPI_URL, profile='pypi_local',
+            importer_class=httpimport.PyPIImporter)
+        load()
+        self.go_offline()
+        self.assertEqual(load().__version__, '1.0.0')
@@ -0,0 +1,111 @@
+import mmap
+import os
+import sys
+import threading
+import time
+import unittest
+
+import httpimport
+from tests import HttpImportTest, HTTP_PORT, URLS, servers
+
+ZIP_URL = URLS['zip'] % HTTP_PORT
+
+
+def run_forked(function, timeout=10):
+    """ Runs 'function' in a forked child and returns its exit code """
+    pid = os.fork()
+    if pid == 0:
+        try:
+            code = 0 if function() else 1
+        except BaseException:
+            code = 2
+        os._exit(code)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        finished, status = os.waitpid(pid, os.WNOHANG)
+        if finished:
+            return os.waitstatus_to_exitcode(status)
+        time.sleep(0.05)
+    os.kill(pid, 9)
+    os.waitpid(pid, 0)
+    return None
+
+
+def import_offline():
+    """ Fails on any network activity, then imports the warmed modules """
+    def no_network(*args, **kw):
+        raise AssertionError("Network used after fork")
+    httpimport._urllib_http = no_network
+    import test_package.a.mod
+    return test_package.a.mod.module_name() == 'Module A'
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), "os.fork() is not available")
+class TestPrefork(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd')
+        httpimport.set_profile('''[{url}]
+allow-plaintext: yes
+        '''.format(url=ZIP_URL))
+
+    def tearDown(self):
+        httpimport.remove_remote_repo(ZIP_URL)
+        HttpImportTest.tearDown(self)
+
+    def test_warm(self):
+        importer = httpimport.warm(['test_package.a.mod'], url=ZIP_URL)
+        self.assertIn(importer, sys.meta_path)
+        self.assertIsNotNone(importer.modules['test_package.a'].code)
+        self.assertIsInstance(importer._archive_buffer, mmap.mmap)
+
+    def test_forked_child_imports_from_memory(self):
+        httpimport.warm(['test_package.a.mod'], url=ZIP_URL)
+        self.assertEqual(run_forked(import_offline), 0)
+
+    def test_locks_reset_after_fork(self):
+        importer = httpimport.warm(['test_package.a.mod'], url=ZIP_URL)
+        # A thread of the parent holds the importer's lock while forking
+        held, release = threading.Event(), threading.Event()
+
+        def hold():
+            with importer._lock:
+                held.set()
+                release.wait()
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait()
+        try:
+            self.assertEqual(run_forked(import_offline), 0)
+        finally:
+            release.set()
+            thread.join()
+
+    def test_locks_reset_before_hooks(self):
+        class Hooked(object):
+            """ Takes the lock of another owner after fork, like code run by warnings """
+
+            def __init__(self):
+                self._lock = httpimport._new_lock(self)
+
+            def _after_fork(self):
+                with self.importer._lock:
+                    pass
+
+        # Registered before the importer, so its hook runs first
+        hooked = Hooked()
+        hooked.importer = httpimport.warm(['test_package.a.mod'], url=ZIP_URL)
+        held, release = threading.Event(), threading.Event()
+
+        def hold():
+            with hooked.importer._lock, httpimport._CONFIG_LOCK:
+                held.set()
+                release.wait()
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait()
+        try:
+            self.assertEqual(run_forked(lambda: import_offline() and httpimport._config()), 0)
+        finally:
+            release.set()
+            thread.join()
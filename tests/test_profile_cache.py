@@ -0,0 +1,57 @@
+import os
+import tempfile
+from unittest import mock
+
+import httpimport
+from tests import HttpImportTest, HTTP_PORT, URLS, servers
+
+URL = URLS['web_dir'] % HTTP_PORT
+
+extract_profile_options = getattr(httpimport, '__extract_profile_options')
+
+
+class TestProfileCache(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd')
+        httpimport.set_profile('''[{url}]
+allow-plaintext: yes
+headers:
+    X-Test: yes
+        '''.format(url=URL))
+
+    def test_compiled_once(self):
+        with mock.patch.object(httpimport, '_get_options',
+                               wraps=httpimport._get_options) as get_options:
+            for _ in range(3):
+                mod = httpimport.load('test_module', URL)
+        self.assertTrue(mod)
+        self.assertEqual(get_options.call_count, 1)
+
+    def test_set_profile_invalidates(self):
+        self.assertEqual(extract_profile_options(URL)['headers'], {'X-Test': 'yes'})
+        httpimport.set_profile('''[{url}]
+headers:
+    X-Test: no
+        '''.format(url=URL))
+        self.assertEqual(extract_profile_options(URL)['headers'], {'X-Test': 'no'})
+
+    def test_requirements_file_read_once(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write('test_package==1.0.0\n')
+        try:
+            httpimport.set_profile('''[requirements_profile]
+requirements-file: {path}
+            '''.format(path=f.name))
+            first = extract_profile_options(profile='requirements_profile')
+            os.unlink(f.name)
+            second = extract_profile_options(profile='requirements_profile')
+        finally:
+            if os.path.exists(f.name):
+                os.unlink(f.name)
+        self.assertEqual(first['version_matrix'], second['version_matrix'])
+
+    def test_options_copied(self):
+        options = extract_profile_options(URL)
+        options['headers']['X-Other'] = 'yes'
+        self.assertNotIn('X-Other', extract_profile_options(URL)['headers'])
@@ -0,0 +1,113 @@
+import gzip
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import httpimport
+from tests import (
+    HttpImportTest,
+    PUBLISHED_DIRECTORY,
+    PUBLISHED_PORT,
+    URLS,
+    WEB_DIRECTORY,
+    servers)
+from tests.servers import RecordingHTTPHandler
+
+URL = URLS['web_dir'] % PUBLISHED_PORT
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestPublish(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_published')
+        for name in os.listdir(PUBLISHED_DIRECTORY):
+            path = os.path.join(PUBLISHED_DIRECTORY, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.unlink(path)
+        del RecordingHTTPHandler.requests[:]
+
+    def publish(self, **kw):
+        return httpimport.publish(WEB_DIRECTORY, PUBLISHED_DIRECTORY, **kw)
+
+    def importer(self, **kw):
+        return httpimport.HttpImporter(URL, allow_plaintext=True, **kw)
+
+    def test_manifest(self):
+        manifest = self.publish()
+        entry = manifest['modules']['test_package.b.mod']
+        self.assertEqual(entry['path'], 'test_package/b/mod.py')
+        self.assertIn(sys.implementation.cache_tag, entry['pyc'])
+        self.assertIn('gzip', manifest['encodings'])
+        with gzip.open(os.path.join(PUBLISHED_DIRECTORY, 'test_package', 'b', 'mod.py.gz')) as f:
+            self.assertIn(b'def', f.read())
+        with open(os.path.join(PUBLISHED_DIRECTORY, httpimport.MANIFEST)) as f:
+            self.assertEqual(json.load(f), manifest)
+
+    def test_import_without_probing(self):
+        self.publish()
+        importer = self.importer()
+        self.assertIsNone(importer.find_module('not_published'))
+        self.assertIs(importer.find_module('test_package'), importer)
+        self.assertEqual(RecordingHTTPHandler.requests, [
+            '/', '/' + httpimport.MANIFEST, '/test_package/__init__.py.gz'])
+
+    def test_allow_compiled(self):
+        self.publish()
+        importer = self.importer(allow_compiled=True)
+        importer.find_module('test_package.b.mod')
+        self.assertIn('__pycache__', RecordingHTTPHandler.requests[-1])
+        self.assertIsNotNone(importer.modules['test_package.b.mod'].code)
+
+        sys.meta_path.append(importer)
+        try:
+            import test_package.b.mod
+        finally:
+            sys.meta_path.remove(importer)
+        self.assertEqual(test_package.b.mod.__url__, URL + 'test_package/b/mod.py')
+        # Tracebacks and 'linecache' point to the module URL
+        self.assertEqual(test_package.b.mod.module_name.__code__.co_filename,
+                         URL + 'test_package/b/mod.py')
+
+    def test_manifest_not_advertised(self):
+        self.publish()
+        os.rename(os.path.join(PUBLISHED_DIRECTORY, httpimport.MANIFEST),
+                  os.path.join(PUBLISHED_DIRECTORY, 'hidden.json'))
+        self.assertIsNone(self.importer().manifest)
+        self.assertNotIn('/' + httpimport.MANIFEST, RecordingHTTPHandler.requests)
+        # Always fetched if enabled
+        self.assertIsNone(self.importer(manifest=True).manifest)
+        self.assertIn('/' + httpimport.MANIFEST, RecordingHTTPHandler.requests)
+
+    def test_bundles(self):
+        self.publish(bundles=True)
+        importer = self.importer()
+        sys.meta_path.append(importer)
+        try:
+            import test_package.b.mod
+        finally:
+            sys.meta_path.remove(importer)
+        self.assertIn('/test_package.zip', RecordingHTTPHandler.requests)
+        self.assertFalse([path for path in RecordingHTTPHandler.requests
+                          if path.startswith('/test_package/')])
+
+    def test_digest_mismatch(self):
+        self.publish(compress=False)
+        with open(os.path.join(PUBLISHED_DIRECTORY, 'test_module.py'), 'ab') as f:
+            f.write(b'tampered = True\n')
+        with self.assertRaises(ImportError):
+            self.importer().find_module('test_module')
+
+    def test_publish_command(self):
+        process = subprocess.run(
+            [sys.executable, '-m', 'httpimport', 'publish', '--bundles',
+             WEB_DIRECTORY, PUBLISHED_DIRECTORY],
+            cwd=ROOT, capture_output=True, text=True)
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertIn('test_package.b.mod', process.stdout.split())
+        self.assertTrue(os.path.exists(os.path.join(PUBLISHED_DIRECTORY, 'test_package.zip')))
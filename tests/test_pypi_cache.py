@@ -0,0 +1,60 @@
+import shutil
+import tempfile
+
+import httpimport
+from tests import HttpImportTest, PYPI_PORT, URLS, servers
+from tests.servers import PyPIHandler
+
+PYPI_URL = URLS['pypi'] % PYPI_PORT
+
+
+class TestPyPICache(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_pypi')
+        self.cache_dir = tempfile.mkdtemp()
+        httpimport.set_profile('''[pypi_local]
+allow-plaintext: yes
+cache-dir: {cache_dir}
+requirements:
+    test_package==1.0.0
+'''.format(cache_dir=self.cache_dir))
+        httpimport._RESPONSE_CACHE.clear()
+        del PyPIHandler.requests[:]
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        HttpImportTest.tearDown(self)
+
+    def api_requests(self):
+        return [request for request in PyPIHandler.requests
+                if request[0].startswith('/pypi/')]
+
+    def load(self):
+        return httpimport.load(
+            'test_package', PYPI_URL, profile='pypi_local',
+            importer_class=httpimport.PyPIImporter)
+
+    def test_version_endpoint(self):
+        mod = self.load()
+        self.assertEqual(mod.__version__, '1.0.0')
+        self.assertEqual(
+            self.api_requests(), [('/pypi/test_package/1.0.0/json', None)])
+
+    def test_cached_across_importers(self):
+        self.load()
+        self.load()
+        self.assertEqual(len(self.api_requests()), 1)
+
+    def test_disk_cache_revalidation(self):
+        self.load()
+        # A new process, after the TTL has passed
+        httpimport._RESPONSE_CACHE.clear()
+        httpimport.set_profile('''[pypi_local]
+pypi-cache-ttl: 0
+''')
+        mod = self.load()
+        self.assertEqual(mod.__version__, '1.0.0')
+        path, etag = self.api_requests()[-1]
+        self.assertEqual(path, '/pypi/test_package/1.0.0/json')
+        self.assertTrue(etag)
@@ -0,0 +1,104 @@
+import httpimport
+from tests import HttpImportTest, PYPI_PORT, URLS, servers
+from tests.servers import PyPIHandler
+
+PYPI_URL = URLS['pypi'] % PYPI_PORT
+
+
+class TestPyPIMetadata(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_pypi')
+        httpimport._RESPONSE_CACHE.clear()
+        httpimport._CONTENT_STORE.clear()
+        del PyPIHandler.requests[:]
+        self.importer = httpimport.PyPIImporter(
+            PYPI_URL, version_matrix={'dependent_package': (None, None)},
+            allow_plaintext=True)
+
+    def downloads(self):
+        return [path for path, _ in PyPIHandler.requests
+                if path.endswith('.whl')]
+
+    def test_resolve_without_downloads(self):
+        resolved = self.importer.resolve()
+        # 'test_package<2' is required and 'pytest' only for an extra
+        self.assertEqual(
+            resolved, {'dependent-package': '1.0.0', 'test-package': '1.0.0'})
+        self.assertEqual(self.downloads(), [])
+        self.assertIn(
+            '/packages/dependent_package-1.0.0-py3-none-any.whl.metadata',
+            [path for path, _ in PyPIHandler.requests])
+
+    def test_preload_dependencies(self):
+        preloaded = self.importer.preload(dependencies=True)
+        self.assertEqual(
+            sorted(preloaded), ['dependent_package', 'test_package'])
+        self.assertEqual(len(self.downloads()), 2)
+
+        mod = self.importer._create_module('test_package', sys_modules=False)
+        self.assertEqual(mod.__version__, '1.0.0')
+
+    def test_unresolvable_project(self):
+        self.importer.version_matrix['no-such-project'] = (None, None)
+        with self.assertLogs(httpimport.logger, 'WARNING') as logs:
+            preloaded = self.importer.preload(dependencies=True)
+        # The other projects are still resolved and preloaded
+        self.assertEqual(
+            sorted(preloaded), ['dependent_package', 'test_package'])
+        self.assertNotIn('no-such-project', self.importer.resolved)
+        self.assertIn("'no-such-project' could not be resolved", '\n'.join(logs.output))
+
+    def test_version_order(self):
+        versions = ['1.0.dev0', '1.0a1', '1.0a2.dev1', '1.0a2', '1.0b1', '1.0rc1', '1.0rc2',
+                    '1.0', '1.0+local', '1.0+local.2', '1.0.post1', '1.1', '1!0.1']
+        self.assertEqual(sorted(reversed(versions), key=httpimport._version_key), versions)
+        self.assertEqual(httpimport._version_key('1.0'), httpimport._version_key('1.0.0'))
+        self.assertFalse(httpimport._is_prerelease('1.0+local'))
+        self.assertTrue(httpimport._is_prerelease('1.0.dev0'))
+        self.assertTrue(httpimport._specifier_matches('1.0rc2', '>1.0rc1'))
+
+    def test_select_distribution(self):
+        files = [
+            {'filename': 'proj-2.0-cp27-cp27m-win32.whl', 'version': '2.0'},
+            {'filename': 'proj-1.5.tar.gz', 'version': '1.5'},
+            {'filename': 'proj-1.5-py3-none-any.whl', 'version': '1.5'},
+            {'filename': 'proj-1.6rc1-py3-none-any.whl', 'version': '1.6rc1'},
+            {'filename': 'proj-1.4-py3-none-any.whl', 'version': '1.4',
+             'requires-python': '<3'},
+        ]
+        self.assertEqual(
+            httpimport._select_distribution(files)['filename'],
+            'proj-1.5-py3-none-any.whl')
+        self.assertEqual(
+            httpimport._select_distribution(files, '<1.5'), None)
+
+    def test_markers(self):
+        environment = dict(httpimport._marker_environment(),
+                           python_version='3.11', sys_platform='linux', os_name='posix',
+                           platform_machine='x86_64')
+        for marker, expected in [
+                ('python_version >= "3.8" and (sys_platform == "win32" or os_name == "nt")',
+                 False),
+                ('(sys_platform == "linux" or os_name == "nt") and python_version >= "3.8"',
+                 True),
+                ('"3.12" > python_version', True),
+                ('sys_platform in "linux darwin" and platform_machine != "arm64"', True),
+                ('extra == "socks"', False),
+                ('python_version < "3" or extra == "socks"', False)]:
+            with self.subTest(marker=marker):
+                self.assertIs(httpimport._evaluate_marker(marker, environment), expected)
+        for marker in ['unknown_variable == "1"', 'python_version >= "3.8" and (',
+                       'python_version "3.8"']:
+            with self.subTest(marker=marker):
+                with self.assertRaises(ValueError):
+                    httpimport._evaluate_marker(marker, environment)
+                # Markers that cannot be evaluated do not match
+                self.assertFalse(httpimport._marker_matches(marker))
+
+    def test_wheel_not_found(self):
+        sha256 = 'ab' * 32
+        file_ = {'filename': 'missing-1.0-py3-none-any.whl', 'hashes': {'sha256': sha256},
+                 'url': 'http://localhost:%d/packages/missing-1.0-py3-none-any.whl' % PYPI_PORT}
+        self.assertIsNone(httpimport._fetch_core_metadata(file_))
+        self.assertIsNone(httpimport._CONTENT_STORE.get(sha256))
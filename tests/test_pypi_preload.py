@@ -0,0 +1,50 @@
+import httpimport
+from tests import HttpImportTest, PYPI_PORT, URLS, servers
+from tests.servers import PyPIHandler
+
+PYPI_URL = URLS['pypi'] % PYPI_PORT
+
+
+class TestPyPIPreload(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_pypi')
+        httpimport.set_profile('''[pypi_preload]
+allow-plaintext: yes
+preload: yes
+requirements:
+    test_package==2.0.0
+    dependent_package
+''')
+        httpimport._RESPONSE_CACHE.clear()
+        del PyPIHandler.requests[:]
+
+    def test_preload_profile(self):
+        importer = httpimport.add_remote_repo(
+            PYPI_URL, profile='pypi_preload',
+            importer_class=httpimport.PyPIImporter)
+        try:
+            self.assertEqual(
+                sorted(importer.module_importers),
+                ['dependent_package', 'test_package'])
+            downloads = [path for path, _ in PyPIHandler.requests
+                         if path.startswith('/packages/')]
+            self.assertEqual(len(downloads), 2)
+
+            # Imports do not reach PyPI anymore
+            del PyPIHandler.requests[:]
+            import dependent_package
+            import test_package.b
+            self.assertEqual(test_package.__version__, '2.0.0')
+            self.assertEqual(PyPIHandler.requests, [])
+        finally:
+            httpimport.remove_remote_repo(PYPI_URL)
+
+    def test_preload_method(self):
+        importer = httpimport.PyPIImporter(
+            PYPI_URL, version_matrix={'test_package': ('==', '1.0.0')},
+            allow_plaintext=True)
+        preloaded = importer.preload(workers=2)
+        self.assertEqual(list(preloaded), ['test_package'])
+        self.assertEqual(importer.find_module('test_package.a'),
+                         preloaded['test_package'])
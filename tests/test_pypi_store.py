@@ -0,0 +1,86 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+import httpimport
+from tests import HttpImportTest, PYPI_PORT, URLS, servers
+from tests.servers import PyPIHandler
+
+PYPI_URL = URLS['pypi'] % PYPI_PORT
+WHEEL = 'test_package-1.0.0-py3-none-any.whl'
+WHEEL_URL = 'http://localhost:%d/packages/%s' % (PYPI_PORT, WHEEL)
+
+
+class TestPyPIContentStore(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_pypi')
+        self.cache_dir = tempfile.mkdtemp()
+        httpimport.set_profile('''[pypi_store]
+allow-plaintext: yes
+cache-dir: {cache_dir}
+requirements:
+    test_package==1.0.0
+'''.format(cache_dir=self.cache_dir))
+        self.clear_memory()
+        self.sha256 = hashlib.sha256(PyPIHandler.files[WHEEL][2]).hexdigest()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+        HttpImportTest.tearDown(self)
+
+    def clear_memory(self):
+        # Simulates a new process
+        httpimport._RESPONSE_CACHE.clear()
+        httpimport._CONTENT_STORE.clear()
+        del PyPIHandler.requests[:]
+
+    def downloads(self):
+        return [path for path, _ in PyPIHandler.requests
+                if path.startswith('/packages/')]
+
+    def load(self):
+        return httpimport.load(
+            'test_package', PYPI_URL, profile='pypi_store',
+            importer_class=httpimport.PyPIImporter)
+
+    def test_served_from_store(self):
+        self.load()
+        self.assertEqual(self.downloads(), ['/packages/' + WHEEL])
+        self.assertTrue(os.path.isfile(os.path.join(
+            self.cache_dir, 'sha256', self.sha256[:2], self.sha256)))
+
+        self.clear_memory()
+        mod = self.load()
+        self.assertEqual(mod.__version__, '1.0.0')
+        self.assertEqual(self.downloads(), [])
+
+    def test_digest_mismatch(self):
+        with self.assertRaises(ImportError):
+            httpimport.HttpImporter(
+                WHEEL_URL, sha256='0' * 64, allow_plaintext=True)
+
+    def test_tampered_store(self):
+        self.load()
+        path = os.path.join(self.cache_dir, 'sha256', self.sha256[:2], self.sha256)
+        with open(path, 'ab') as f:
+            f.write(b'tampered')
+
+        self.clear_memory()
+        self.load()
+        self.assertEqual(self.downloads(), ['/packages/' + WHEEL])
+        with open(path, 'rb') as f:
+            self.assertEqual(hashlib.sha256(f.read()).hexdigest(), self.sha256)
+
+    def test_memory_bounded(self):
+        store = httpimport._ContentStore(max_bytes=10)
+        digests = []
+        for content in (b'first', b'second', b'third'):
+            digests.append(hashlib.sha256(content).hexdigest())
+            store.put(digests[-1], content, self.cache_dir)
+        # Only the most recent files fit in memory, the rest is read back from disk
+        self.assertEqual(list(store._memory), digests[2:])
+        self.assertEqual(store.get(digests[0], self.cache_dir), b'first')
+        self.assertEqual(list(store._memory), [digests[2], digests[0]])
+        self.assertIsNone(store.get(digests[1]))
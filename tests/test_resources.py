@@ -0,0 +1,134 @@
+import importlib.resources
+import io
+import json
+import os
+import shutil
+import sys
+import unittest
+import warnings
+
+import httpimport
+from tests import (
+    HttpImportTest,
+    HTTP_PORT,
+    PUBLISHED_DIRECTORY,
+    PUBLISHED_PORT,
+    TEST_MODULES,
+    URLS,
+    WEB_DIRECTORY,
+    servers)
+from tests.servers import RecordingHTTPHandler
+
+URL = URLS['web_dir'] % HTTP_PORT
+
+# 'importlib.resources.files()' only asks the loader for a resource reader since
+# Python 3.10. Earlier versions are covered through the older functions
+requires_files = unittest.skipUnless(
+    sys.version_info >= (3, 10),
+    "'importlib.resources.files()' ignores resource readers before Python 3.10")
+
+
+class TestResources(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd')
+        httpimport.set_profile('''[DEFAULT]
+allow-plaintext: yes
+        ''')
+
+    @requires_files
+    def test_web_directory(self):
+        with httpimport.remote_repo(URL):
+            import test_package
+        data = importlib.resources.files(test_package).joinpath('data/config.json')
+        self.assertTrue(data.is_file())
+        self.assertEqual(json.loads(data.read_text())['answer'], 42)
+        importer = test_package.__loader__
+        # Fetched once and kept
+        self.assertIn('test_package/data/config.json', importer._resources)
+        self.assertIn('data', [item.name for item in
+                               importlib.resources.files(test_package).iterdir()])
+        self.assertFalse(
+            importlib.resources.files(test_package).joinpath('missing.json').is_file())
+        with self.assertRaises(FileNotFoundError):
+            importlib.resources.files(test_package).joinpath('missing.json').read_bytes()
+
+    def test_legacy_functions(self):
+        with httpimport.remote_repo(URL):
+            import test_package.a
+        with warnings.catch_warnings():
+            # Deprecated on some Python versions
+            warnings.simplefilter('ignore', DeprecationWarning)
+            self.assertIn('mod.py', list(importlib.resources.contents(test_package.a)))
+            self.assertTrue(importlib.resources.is_resource(test_package.a, 'mod.py'))
+            self.assertFalse(importlib.resources.is_resource(test_package.a, 'missing.py'))
+            with importlib.resources.open_binary(test_package.a, 'mod.py') as f:
+                self.assertIn(b'def', f.read())
+            self.assertIn('Module A', importlib.resources.read_text(test_package.a, 'mod.py'))
+
+    def test_subdirectory(self):
+        for listing in (True, False):
+            with self.subTest(listing=listing):
+                importer = httpimport.HttpImporter(URL, allow_plaintext=True, listing=listing)
+                importer.find_module('test_package')
+                directory = importer.get_resource_reader('test_package').files() / 'a'
+                # Not its autoindex page, whether listed or reached through a redirect
+                self.assertEqual(directory.is_dir(), listing)
+                self.assertFalse(directory.is_file())
+                with self.assertRaises(OSError):
+                    directory.read_bytes()
+
+    def test_get_data(self):
+        with httpimport.remote_repo(URL):
+            import test_package.a
+        importer = test_package.__loader__
+        self.assertIn(b'import', importer.get_data(test_package.a.__file__))
+        self.assertIn(b'42', importer.get_data('test_package/data/config.json'))
+
+    @requires_files
+    def test_archives(self):
+        for archive in ('zip', 'tar', 'tar_gz'):
+            url = URLS[archive] % HTTP_PORT
+            with self.subTest(archive=archive):
+                with httpimport.remote_repo(url):
+                    import test_package
+                files = importlib.resources.files(test_package)
+                names = [item.name for item in files.iterdir()]
+                self.assertIn('__init__.py', names)
+                self.assertIn('a', names)
+                self.assertTrue(files.joinpath('a').is_dir())
+                # Streamed out of the archive buffer
+                with files.joinpath('a', 'mod.py').open('rb') as f:
+                    self.assertNotIsInstance(f, io.BytesIO)
+                    self.assertIn(b'def', f.read())
+                for module in TEST_MODULES:
+                    sys.modules.pop(module, None)
+
+
+class TestPublishedResources(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_published')
+        for name in os.listdir(PUBLISHED_DIRECTORY):
+            path = os.path.join(PUBLISHED_DIRECTORY, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.unlink(path)
+        self.manifest = httpimport.publish(WEB_DIRECTORY, PUBLISHED_DIRECTORY)
+        httpimport.set_profile('''[DEFAULT]
+allow-plaintext: yes
+        ''')
+        del RecordingHTTPHandler.requests[:]
+
+    @requires_files
+    def test_listed_in_manifest(self):
+        self.assertIn('test_package/data/config.json', self.manifest['resources'])
+        with httpimport.remote_repo(URLS['web_dir'] % PUBLISHED_PORT):
+            import test_package
+        data = importlib.resources.files(test_package) / 'data'
+        self.assertEqual([item.name for item in data.iterdir()], ['config.json'])
+        # Listed without fetching
+        self.assertNotIn('/test_package/data/config.json.gz', RecordingHTTPHandler.requests)
+        self.assertEqual(json.loads((data / 'config.json').read_bytes())['answer'], 42)
+        self.assertIn('/test_package/data/config.json.gz', RecordingHTTPHandler.requests)
@@ -0,0 +1,71 @@
+import gc
+import sys
+
+import httpimport
+from tests import HttpImportTest, HTTP_PORT, MIRROR_PORT, TEST_MODULES, URLS, servers
+
+URL = URLS['web_dir'] % HTTP_PORT
+MIRROR_URL = URLS['web_dir'] % MIRROR_PORT
+
+
+class TestSharedSources(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd')
+        servers.init('httpd_mirror')
+
+    def importers(self):
+        return [httpimport.HttpImporter(url, allow_plaintext=True)
+                for url in (URL, MIRROR_URL)]
+
+    def test_identical_sources_stored_once(self):
+        first, second = self.importers()
+        for importer in (first, second):
+            self.assertIs(importer.find_module('test_package.a.mod'), importer)
+        self.assertIs(first.modules['test_package.a.mod']._source,
+                      second.modules['test_package.a.mod']._source)
+        self.assertIs(first.find_module('test_package.b.mod'), first)
+        self.assertIsNot(first.modules['test_package.a.mod']._source,
+                         first.modules['test_package.b.mod']._source)
+
+    def test_compiled_once(self):
+        httpimport.set_profile('''[DEFAULT]
+allow-plaintext: yes
+        ''')
+        modules = []
+        for url in (URL, MIRROR_URL):
+            with httpimport.remote_repo(url):
+                import test_package.a.mod
+            modules.append(test_package.a.mod)
+            for module in TEST_MODULES:
+                sys.modules.pop(module, None)
+        self.assertIsNot(modules[0], modules[1])
+        source = modules[1].__loader__.modules['test_package.a.mod']._source
+        # Compiled for the first import only, and kept apart from the source
+        self.assertIn(source.sha256, httpimport._SOURCE_STORE._codes)
+        self.assertFalse(hasattr(source, 'code'))
+        # Each module keeps the URL it was imported from, nested code too
+        for url, module in zip((URL, MIRROR_URL), modules):
+            self.assertEqual(module.module_name(), 'Module A')
+            self.assertEqual(module.module_name.__code__.co_filename,
+                             url + 'test_package/a/mod.py')
+
+    def test_released_with_records(self):
+        httpimport._SOURCE_STORE.clear()
+        importer = httpimport.HttpImporter(URL, allow_plaintext=True)
+        importer.find_module('test_package.a.mod')
+        sha256 = importer.modules['test_package.a.mod']._source.sha256
+        self.assertIn(sha256, httpimport._SOURCE_STORE._sources)
+        del importer
+        gc.collect()
+        httpimport._SOURCE_STORE.clear()
+        self.assertNotIn(sha256, httpimport._SOURCE_STORE._sources)
+
+    def test_code_bounded(self):
+        store = httpimport._SourceStore(max_bytes=1)
+        first = store.compile(b'x = 1\n', 'first.py')
+        store.compile(b'y = 2\n', 'second.py')
+        # Only the most recently compiled code is kept
+        self.assertEqual(list(store._codes), [store.intern(b'y = 2\n').sha256])
+        self.assertIsNot(store.compile(b'x = 1\n', 'first.py'), first)
+        self.assertEqual(len(store._codes), 1)
@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+import time
+
+import httpimport
+from tests import (
+    HttpImportTest,
+    HTTP_PORT,
+    PYPI_PORT,
+    SLOW_DELAY,
+    SLOW_PORT,
+    URLS,
+    servers)
+from tests.servers import PyPIHandler, SlowHTTPHandler
+
+URL = URLS['web_dir'] % HTTP_PORT
+SLOW_URL = URLS['web_dir'] % SLOW_PORT
+PYPI_URL = URLS['pypi'] % PYPI_PORT
+
+
+class TestStaleWhileRevalidate(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd')
+        servers.init('httpd_slow')
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        httpimport._RESPONSE_CACHE.wait()
+        shutil.rmtree(self.cache_dir)
+        HttpImportTest.tearDown(self)
+
+    def cache(self, url, body, code=200, age=0):
+        httpimport._RESPONSE_CACHE.put(
+            url, {'code': code, 'body': body, 'headers': {}},
+            self.cache_dir, stored=time.time() - age, memory=False)
+
+    def importer(self, url, stale_while_revalidate):
+        return httpimport.HttpImporter(
+            url, allow_plaintext=True, cache_dir=self.cache_dir,
+            stale_while_revalidate=stale_while_revalidate)
+
+    def test_served_without_waiting(self):
+        self.cache(SLOW_URL, b'')
+        self.cache(SLOW_URL + httpimport.MANIFEST, b'', code=404)
+        self.cache(SLOW_URL + 'test_package.py', b'', code=404)
+        self.cache(SLOW_URL + 'test_package/__init__.py', b'STALE = True\n')
+        del SlowHTTPHandler.requests[:]
+        start = time.monotonic()
+        importer = self.importer(SLOW_URL, 600)
+        self.assertIs(importer.find_module('test_package'), importer)
+        self.assertLess(time.monotonic() - start, SLOW_DELAY)
+        self.assertEqual(importer.get_source('test_package'), 'STALE = True\n')
+        # Refreshed in the background, for the next run
+        httpimport._RESPONSE_CACHE.wait()
+        self.assertIn('/test_package/__init__.py', SlowHTTPHandler.requests)
+        entry = httpimport._RESPONSE_CACHE.get(
+            SLOW_URL + 'test_package/__init__.py', self.cache_dir, memory=False)
+        self.assertNotEqual(entry['resp']['body'], b'STALE = True\n')
+
+    def test_too_stale(self):
+        self.cache(URL + 'test_package/__init__.py', b'STALE = True\n', age=120)
+        importer = self.importer(URL, 60)
+        importer.find_module('test_package')
+        self.assertNotEqual(importer.get_source('test_package'), 'STALE = True\n')
+
+    def test_disabled(self):
+        self.cache(URL + 'test_package/__init__.py', b'STALE = True\n')
+        importer = self.importer(URL, 0)
+        importer.find_module('test_package')
+        self.assertNotEqual(importer.get_source('test_package'), 'STALE = True\n')
+
+
+class TestPyPIStaleWhileRevalidate(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_pypi')
+        self.cache_dir = tempfile.mkdtemp()
+        httpimport.set_profile('''[pypi_local]
+allow-plaintext: yes
+cache-dir: {cache_dir}
+pypi-cache-ttl: 0
+stale-while-revalidate: 600
+requirements:
+    test_package==1.0.0
+'''.format(cache_dir=self.cache_dir))
+        httpimport._RESPONSE_CACHE.clear()
+        del PyPIHandler.requests[:]
+
+    def tearDown(self):
+        httpimport._RESPONSE_CACHE.wait()
+        shutil.rmtree(self.cache_dir)
+        HttpImportTest.tearDown(self)
+
+    def api_requests(self):
+        return [request for request in PyPIHandler.requests
+                if request[0].startswith('/pypi/')]
+
+    def load(self):
+        return httpimport.load(
+            'test_package', PYPI_URL, profile='pypi_local',
+            importer_class=httpimport.PyPIImporter)
+
+    def test_revalidated_in_background(self):
+        self.load()
+        self.assertEqual(len(self.api_requests()), 1)
+        # A new process
+        httpimport._RESPONSE_CACHE.clear()
+        mod = self.load()
+        self.assertEqual(mod.__version__, '1.0.0')
+        httpimport._RESPONSE_CACHE.wait()
+        path, etag = self.api_requests()[-1]
+        self.assertEqual(len(self.api_requests()), 2)
+        self.assertTrue(etag)
@@ -0,0 +1,67 @@
+import threading
+
+import httpimport
+from tests import HttpImportTest, HTTP_PORT, SLOW_PORT, URLS, servers
+from tests.servers import SlowHTTPHandler
+
+URL = URLS['web_dir'] % HTTP_PORT
+SLOW_URL = URLS['web_dir'] % SLOW_PORT
+
+THREADS = 16
+
+
+def run_concurrently(function, threads=THREADS):
+    """ Runs 'function' from many threads released at once and returns the results """
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+
+    def target(index):
+        barrier.wait()
+        try:
+            results[index] = function()
+        except BaseException as e:
+            results[index] = e
+
+    workers = [threading.Thread(target=target, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+class TestThreads(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd')
+        servers.init('httpd_slow')
+        del SlowHTTPHandler.requests[:]
+        httpimport.set_profile('''[{url}]
+allow-plaintext: yes
+        '''.format(url=URL))
+
+    def test_single_flight_download(self):
+        # Separate importers, so only the single-flight layer deduplicates
+        results = run_concurrently(
+            lambda: httpimport.HttpImporter(
+                SLOW_URL, allow_plaintext=True).find_module('test_module'))
+        self.assertTrue(all(isinstance(result, httpimport.HttpImporter)
+                            for result in results))
+        # The base URL (archive detection) and the module, once each
+        self.assertEqual(sorted(SlowHTTPHandler.requests), ['/', '/test_module.py'])
+
+    def test_concurrent_imports(self):
+        importer = httpimport.HttpImporter(URL, allow_plaintext=True)
+        results = run_concurrently(
+            lambda: importer._create_module('test_package.b', sys_modules=False))
+        for result in results:
+            self.assertEqual(result.__name__, 'test_package.b')
+
+    def test_concurrent_import_statements(self):
+        def import_package():
+            import test_package.b.mod
+            return test_package.b.mod
+
+        with httpimport.remote_repo(URL):
+            results = run_concurrently(import_package)
+        self.assertTrue(all(result is results[0] for result in results))
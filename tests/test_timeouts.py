@@ -0,0 +1,60 @@
+import time
+from urllib.error import URLError
+
+import httpimport
+from tests import (
+    HttpImportTest,
+    DEAD_PORT,
+    SLOW_DELAY,
+    SLOW_PORT,
+    URLS,
+    servers)
+
+SLOW_URL = URLS['web_dir'] % SLOW_PORT
+DEAD_URL = URLS['web_dir'] % DEAD_PORT
+
+
+class TestTimeouts(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_slow')
+
+    def test_read_timeout(self):
+        start = time.monotonic()
+        with self.assertRaises(URLError):
+            httpimport.http(SLOW_URL + 'test_module.py', read_timeout=0.5)
+        self.assertTrue(time.monotonic() - start < SLOW_DELAY)
+
+    def test_import_deadline(self):
+        start = time.monotonic()
+        with self.assertRaises(URLError):
+            with httpimport._deadline(0.5):
+                httpimport.http(SLOW_URL + 'test_module.py',
+                                read_timeout=10, retries=3)
+        self.assertTrue(time.monotonic() - start < SLOW_DELAY)
+
+    def test_import_deadline_with_mirrors(self):
+        mirrors = httpimport._MirrorSet(
+            [SLOW_URL.rstrip('/'), SLOW_URL.rstrip('/').replace('localhost', '127.0.0.1')])
+        start = time.monotonic()
+        with self.assertRaises(URLError):
+            with httpimport._deadline(0.5):
+                httpimport._hedged_http(
+                    mirrors, lambda base: base + '/test_module.py', read_timeout=10)
+        # Neither the requests nor the wait for them outlive the deadline
+        self.assertLess(time.monotonic() - start, 1.5)
+
+    def test_circuit_breaker(self):
+        url = DEAD_URL + 'test_module.py'
+        for _ in range(2):
+            with self.assertRaises(URLError):
+                httpimport.http(url, breaker_threshold=2)
+        with self.assertRaises(httpimport.CircuitOpenError):
+            httpimport.http(url, breaker_threshold=2)
+        # Other hosts are not affected
+        self.assertNotIn(
+            SLOW_URL.split('/')[2], httpimport._CIRCUIT_BREAKERS)
+
+    def tearDown(self):
+        httpimport._CIRCUIT_BREAKERS.clear()
+        HttpImportTest.tearDown(self)
@@ -0,0 +1,189 @@
+import os
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+import unittest
+from urllib.parse import quote
+
+import httpimport
+from tests import HttpImportTest, HTTP_PORT, SERVER_HOST, URLS, WEB_DIRECTORY, servers
+from tests.servers import HTTPHandler
+
+URL = URLS['web_dir'] % HTTP_PORT
+FILE_URL = 'file://' + quote(os.path.abspath(WEB_DIRECTORY))
+
+
+def web_directory_files(base_url):
+    """ Maps the URLs of the files of WEB_DIRECTORY under 'base_url' to their content """
+    files = {}
+    for root, _, filenames in os.walk(WEB_DIRECTORY):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            with open(path, 'rb') as f:
+                files[base_url + os.path.relpath(path, WEB_DIRECTORY).replace(os.sep, '/')] = f.read()
+    return files
+
+
+class KeepAliveHTTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    base_path = WEB_DIRECTORY
+
+    def __init__(self, address):
+        socketserver.TCPServer.__init__(self, address, KeepAliveHTTPHandler)
+        self.connections = 0
+        self.requests = []
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        socketserver.ThreadingMixIn.process_request(self, request, client_address)
+
+
+class KeepAliveHTTPHandler(HTTPHandler):
+    # Keeps connections alive
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        HTTPHandler.do_GET(self)
+
+    def log_message(self, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    base_path = WEB_DIRECTORY
+
+    def __init__(self, path):
+        socketserver.UnixStreamServer.__init__(self, path, UnixHTTPHandler)
+        self.connections = 0
+        self.requests = []
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        socketserver.ThreadingMixIn.process_request(self, request, client_address)
+
+
+class UnixHTTPHandler(KeepAliveHTTPHandler):
+
+    def address_string(self):
+        return 'unix'
+
+
+class TestLocalTransports(HttpImportTest):
+
+    def test_file(self):
+        # Plaintext is not a hazard for local files
+        with httpimport.remote_repo(FILE_URL + '/'):
+            import test_package.a.mod
+        self.assertEqual(test_package.a.mod.module_name(), 'Module A')
+        self.assertEqual(test_package.a.mod.__file__,
+                         FILE_URL + '/test_package/a/mod.py')
+
+    def test_file_archive(self):
+        with httpimport.remote_repo(FILE_URL + '/test_package.zip'):
+            import test_package.b.mod
+        self.assertTrue(test_package.b.mod)
+
+    def test_file_conditional(self):
+        transport = httpimport.FileTransport()
+        url = FILE_URL + '/test_module.py'
+        resp = transport.request(url)
+        self.assertEqual(resp['code'], 200)
+        self.assertEqual(transport.request(url, headers=resp['headers'])['code'], 200)
+        conditional = httpimport._conditional_headers(resp['headers'])
+        self.assertEqual(transport.request(url, headers=conditional)['code'], 304)
+        self.assertEqual(transport.request(FILE_URL + '/missing.py')['code'], 404)
+
+    def test_memory(self):
+        transport = httpimport.MemoryTransport(web_directory_files('memory://packages/'))
+        httpimport.register_transport('memory', transport)
+        self.addCleanup(httpimport.register_transport, 'memory', None)
+        with httpimport.remote_repo('memory://packages/'):
+            import test_package.a.mod
+        self.assertEqual(test_package.a.mod.module_name(), 'Module A')
+        self.assertEqual(transport.request('memory://packages/missing.py')['code'], 404)
+
+
+class TestHTTPTransports(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd')
+
+    def test_pooled(self):
+        server = KeepAliveHTTPServer((SERVER_HOST, 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        httpimport.set_profile('''[DEFAULT]
+allow-plaintext: yes
+transport: pooled
+        ''')
+        with httpimport.remote_repo('http://%s:%d/' % server.server_address):
+            import test_package.a.mod
+            import test_package.b.mod
+        self.assertEqual(test_package.a.mod.module_name(), 'Module A')
+        self.assertIsInstance(httpimport._transport(URL, 'pooled'), httpimport.PooledTransport)
+        # Connections are kept alive, except after errors ('404')
+        self.assertGreater(len(server.requests), 2)
+        self.assertLess(server.connections, len(server.requests))
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "os.fork() is not available")
+    def test_pooled_after_fork(self):
+        from tests.test_prefork import run_forked
+
+        server = KeepAliveHTTPServer((SERVER_HOST, 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = 'http://%s:%d/test_module.py' % server.server_address
+        transport = httpimport.PooledTransport()
+        self.assertEqual(transport.request(url)['code'], 200)
+        conn = [conn for connections in transport._idle.values() for conn in connections][0]
+
+        def child():
+            # The inherited sockets are detached, not left to the GC
+            return transport._idle == {} and conn.sock is None
+        self.assertEqual(run_forked(child), 0)
+        # The parent's connection is still usable
+        self.assertEqual(transport.request(url)['code'], 200)
+        self.assertEqual(server.connections, 1)
+
+    def test_transport_object(self):
+        transport = httpimport.PooledTransport()
+        resp = httpimport.http(URL + 'test_module.py', transport=transport)
+        self.assertEqual(resp['code'], 200)
+        resp = httpimport.http(URL + 'missing.py', transport=transport)
+        self.assertEqual((resp['code'], resp['body']), (404, b''))
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            httpimport.http(URL, transport='carrier-pigeon')
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'needs Unix domain sockets')
+class TestUnixSocketTransport(HttpImportTest):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.server = UnixHTTPServer(os.path.join(directory, 'httpimport.sock'))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = 'http+unix://%s/' % quote(self.server.server_address, safe='')
+
+    def test_import(self):
+        with httpimport.remote_repo(self.url):
+            import test_package.a.mod
+            import test_package.b.mod
+        self.assertEqual(test_package.a.mod.module_name(), 'Module A')
+        # Connections are kept alive, except after errors ('404')
+        self.assertLess(self.server.connections, len(self.server.requests))
+
+    def test_missing_socket(self):
+        with self.assertRaises(httpimport.URLError):
+            httpimport.http('http+unix://%2Fmissing.sock/')
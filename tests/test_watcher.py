@@ -0,0 +1,118 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+import httpimport
+from tests import HttpImportTest, PUBLISHED_DIRECTORY, PUBLISHED_PORT, URLS, servers
+from tests.servers import RecordingHTTPHandler
+
+URL = URLS['web_dir'] % PUBLISHED_PORT
+
+
+class TestWatcher(HttpImportTest):
+
+    def setUp(self):
+        servers.init('httpd_published')
+        for name in os.listdir(PUBLISHED_DIRECTORY):
+            path = os.path.join(PUBLISHED_DIRECTORY, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.unlink(path)
+        httpimport.set_profile('''[DEFAULT]
+allow-plaintext: yes
+        ''')
+        self.mtime = time.time()
+
+    def write(self, value, directory=PUBLISHED_DIRECTORY):
+        path = os.path.join(directory, 'watched.py')
+        with open(path, 'w') as f:
+            f.write('VALUE = %d\n' % value)
+        # 'Last-Modified' has a resolution of seconds
+        self.mtime += 10
+        os.utime(path, (self.mtime, self.mtime))
+
+    def import_watched(self, url=URL):
+        importer = httpimport.add_remote_repo(url)
+        import watched
+        return importer, watched
+
+    def tearDown(self):
+        for importer in list(sys.meta_path):
+            if isinstance(importer, httpimport.HttpImporter):
+                sys.meta_path.remove(importer)
+        HttpImportTest.tearDown(self)
+
+    def test_unchanged(self):
+        self.write(1)
+        importer, _ = self.import_watched()
+        del RecordingHTTPHandler.requests[:]
+        self.assertEqual(importer.check_changes(), [])
+        # A conditional request
+        self.assertEqual(RecordingHTTPHandler.requests, ['/watched.py'])
+
+    def test_reload(self):
+        self.write(1)
+        _, watched = self.import_watched()
+        self.write(2)
+        self.assertEqual(httpimport.Watcher(reload=True).check(), ['watched'])
+        self.assertEqual(watched.VALUE, 2)
+
+    def test_report(self):
+        self.write(1)
+        _, watched = self.import_watched()
+        self.write(2)
+        reported = []
+        watcher = httpimport.Watcher(callback=reported.extend)
+        self.assertEqual(watcher.check(), ['watched'])
+        self.assertEqual(reported, ['watched'])
+        self.assertEqual(watched.VALUE, 1)
+        # Reported once, and reloaded without fetching again
+        self.assertEqual(watcher.check(), [])
+        del RecordingHTTPHandler.requests[:]
+        importlib.reload(watched)
+        self.assertEqual(watched.VALUE, 2)
+        self.assertEqual(RecordingHTTPHandler.requests, [])
+
+    def test_manifest(self):
+        source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, source)
+        self.write(1, source)
+        httpimport.publish(source, PUBLISHED_DIRECTORY, compress=False)
+        importer, watched = self.import_watched()
+        self.write(2, source)
+        httpimport.publish(source, PUBLISHED_DIRECTORY, compress=False)
+        os.utime(os.path.join(PUBLISHED_DIRECTORY, httpimport.MANIFEST),
+                 (self.mtime, self.mtime))
+        del RecordingHTTPHandler.requests[:]
+        self.assertEqual(importer.check_changes(), ['watched'])
+        self.assertEqual(RecordingHTTPHandler.requests,
+                         ['/' + httpimport.MANIFEST, '/watched.py'])
+
+    def test_archive(self):
+        path = os.path.join(PUBLISHED_DIRECTORY, 'watched.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('watched.py', 'VALUE = 1\n')
+        _, watched = self.import_watched(URL + 'watched.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            archive.writestr('watched.py', 'VALUE = 2\n')
+        self.mtime += 10
+        os.utime(path, (self.mtime, self.mtime))
+        httpimport.Watcher(reload=True).check()
+        self.assertEqual(watched.VALUE, 2)
+
+    def test_background(self):
+        self.write(1)
+        _, watched = self.import_watched()
+        self.write(2)
+        changed = threading.Event()
+        with httpimport.Watcher(interval=0.1, reload=True,
+                                callback=lambda names: changed.set()):
+            self.assertTrue(changed.wait(5))
+        self.assertEqual(watched.VALUE, 2)
+